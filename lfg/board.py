@@ -0,0 +1,286 @@
+import asyncio
+import contextlib
+import typing
+
+import discord
+
+from .rest import Priority, channel_route
+from .utils import BackgroundService, log
+
+if typing.TYPE_CHECKING:
+    from discord.types.embed import Embed as EmbedData
+
+    from . import types
+    from .main import LFG
+    from .objects import Request
+
+
+DEFAULT_BOARD_INTERVAL = 2.0
+"""Default time, in seconds, between two refreshes of the boards."""
+
+EMBEDS_PER_PAGE = 10
+"""Maximum number of embeds Discord accepts in a single message."""
+
+CHARACTERS_PER_PAGE = 6000
+"""Maximum number of characters Discord accepts across the embeds of a message."""
+
+
+class _BoardState:
+    __slots__ = ("channel_id", "message_ids", "rendered")
+
+    channel_id: "types.ChannelID"
+    """The channel the board pages are posted in."""
+
+    message_ids: list[int]
+    """The IDs of the board pages, first page first."""
+
+    rendered: list[list["EmbedData"]]
+    """The embeds last sent on each page, to skip identical edits."""
+
+    def __init__(self, channel_id: "types.ChannelID", message_ids: list[int]) -> None:
+        self.channel_id = channel_id
+        self.message_ids = message_ids
+        self.rendered = []
+
+
+class RequestBoard(BackgroundService):
+    """Show the requests of a guild on a few shared messages.
+
+    Requests posted on the board do not have their own message. When one changes, it
+    only marks its guild as dirty. Every ``interval`` seconds, the board of each dirty
+    guild is rebuilt and split into pages of up to ten embeds, and only the pages that
+    changed are edited. The number of REST calls thus depends on the number of pages,
+    not on the number of requests.
+    """
+
+    interval: float
+    """Time, in seconds, between two refreshes of the boards."""
+
+    def __init__(self, cog: "LFG", interval: float = DEFAULT_BOARD_INTERVAL) -> None:
+        self.cog = cog
+        self.interval = interval
+        self._boards: dict["types.GuildID", _BoardState] = {}
+        self._dirty: set["types.GuildID"] = set()
+
+    async def load(self, all_guilds: dict[int, dict] | None = None) -> None:
+        """Load the board pages of every guild from Config.
+
+        Parameters
+        ----------
+        all_guilds : dict[int, dict] | None
+            The guild data already read from Config, to avoid reading it again.
+        """
+        if all_guilds is None:
+            all_guilds = await self.cog.config.all_guilds()
+        for guild_id, data in all_guilds.items():
+            if data["board_channel_id"] and data["board_message_ids"]:
+                self._boards[guild_id] = _BoardState(
+                    data["board_channel_id"], list(data["board_message_ids"])
+                )
+                # Requests may have changed while the cog was unloaded.
+                self._dirty.add(guild_id)
+
+    def mark_dirty(self, guild_id: "types.GuildID") -> None:
+        """Schedule the board of a guild to be refreshed on the next tick.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild.
+        """
+        self._dirty.add(guild_id)
+
+    @staticmethod
+    def paginate(embeds: list[discord.Embed]) -> list[list[discord.Embed]]:
+        """Split embeds into pages that fit in a single message.
+
+        Parameters
+        ----------
+        embeds : list[discord.Embed]
+            The embeds to split.
+
+        Returns
+        -------
+        list[list[discord.Embed]]
+            The pages, each holding at most ten embeds and 6000 characters.
+        """
+        pages: list[list[discord.Embed]] = []
+        page: list[discord.Embed] = []
+        characters = 0
+        for embed in embeds:
+            size = len(embed)
+            if page and (
+                len(page) == EMBEDS_PER_PAGE or characters + size > CHARACTERS_PER_PAGE
+            ):
+                pages.append(page)
+                page = []
+                characters = 0
+            page.append(embed)
+            characters += size
+        if page:
+            pages.append(page)
+        return pages
+
+    def _board_requests(self, guild_id: "types.GuildID") -> list["Request"]:
+        requests = self.cog.requests.current_lfgs.get(guild_id, {})
+        return sorted(
+            (request for request in requests.values() if request.ctx.on_board),
+            key=lambda request: request.ctx.created_at,
+        )
+
+    async def refresh(self, guild_id: "types.GuildID") -> None:
+        """Rebuild the board of a guild and edit the pages that changed.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild.
+        """
+        guild = self.cog.bot.get_guild(guild_id)
+        if guild is None:
+            self._boards.pop(guild_id, None)
+            return
+        settings = self.cog.settings.get(guild_id)
+        embeds: list[discord.Embed] = []
+        for request in self._board_requests(guild_id):
+            try:
+                embeds.append(request.make_embed())
+            except LookupError:
+                # The author or the channel is gone, the request is being withdrawn.
+                continue
+        if not embeds:
+            if not settings.board_mode:
+                await self.clear(guild)
+                return
+            embeds = [
+                discord.Embed(
+                    title="No open LFG requests",
+                    description="Start one with `/lfg create`!",
+                )
+            ]
+
+        board = self._boards.get(guild_id)
+        if board is not None and settings.lfg_channel_id not in (
+            None,
+            board.channel_id,
+        ):
+            # The LFG channel was changed, move the board.
+            await self.clear(guild)
+            board = None
+        if board is None:
+            if settings.lfg_channel_id is None:
+                log.error("No LFG channel set for the board of guild %s.", guild_id)
+                return
+            board = self._boards[guild_id] = _BoardState(settings.lfg_channel_id, [])
+        channel = guild.get_channel(board.channel_id)
+        if not isinstance(channel, discord.TextChannel):
+            log.error("Couldn't find the LFG board channel of guild %s.", guild_id)
+            return
+
+        pages = self.paginate(embeds)
+        message_ids = list(board.message_ids)
+        try:
+            for index, page in enumerate(pages):
+                rendered = [embed.to_dict() for embed in page]
+                if index < len(board.rendered) and board.rendered[index] == rendered:
+                    continue
+                if index < len(message_ids):
+                    message = channel.get_partial_message(message_ids[index])
+                    try:
+                        await self.cog.rest.submit(
+                            Priority.UPDATE,
+                            channel_route(channel.id),
+                            lambda: message.edit(embeds=page),
+                            key=message.id,
+                            metric="rest_edit",
+                        )
+                    except discord.NotFound:
+                        # The page was deleted, post it again.
+                        message_ids[index] = await self._send_page(channel, page)
+                else:
+                    message_ids.append(await self._send_page(channel, page))
+                if index < len(board.rendered):
+                    board.rendered[index] = rendered
+                else:
+                    board.rendered.append(rendered)
+            for message_id in message_ids[len(pages) :]:
+                with contextlib.suppress(discord.HTTPException):
+                    await self._delete_page(channel, message_id)
+            del message_ids[len(pages) :]
+            del board.rendered[len(pages) :]
+        finally:
+            # Keep track of the pages sent, even if a later one failed.
+            if message_ids != board.message_ids:
+                board.message_ids = message_ids
+                await self._save(guild_id, board)
+
+    async def _send_page(
+        self, channel: discord.TextChannel, page: list[discord.Embed]
+    ) -> int:
+        message = await self.cog.rest.submit(
+            Priority.POST,
+            channel_route(channel.id),
+            lambda: channel.send(embeds=page),
+            metric="rest_send",
+        )
+        try:
+            await self.cog.rest.submit(
+                Priority.POST, channel_route(channel.id), message.pin
+            )
+        except discord.HTTPException:
+            log.warning("Could not pin the LFG board in channel %s.", channel.id)
+        return message.id
+
+    async def _delete_page(self, channel: discord.TextChannel, message_id: int) -> None:
+        await self.cog.rest.submit(
+            Priority.COMPLETION,
+            channel_route(channel.id),
+            channel.get_partial_message(message_id).delete,
+            key=message_id,
+            metric="rest_delete",
+        )
+
+    async def clear(self, guild: discord.Guild) -> None:
+        """Delete the board pages of a guild.
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The guild.
+        """
+        board = self._boards.pop(guild.id, None)
+        if board is None:
+            return
+        channel = guild.get_channel(board.channel_id)
+        if isinstance(channel, discord.TextChannel):
+            for message_id in board.message_ids:
+                with contextlib.suppress(discord.HTTPException):
+                    await self._delete_page(channel, message_id)
+        board.message_ids = []
+        await self._save(guild.id, board)
+
+    async def _save(self, guild_id: "types.GuildID", board: _BoardState) -> None:
+        group = self.cog.config.guild_from_id(guild_id)
+        if board.message_ids:
+            await group.board_channel_id.set(board.channel_id)
+            await group.board_message_ids.set(board.message_ids)
+        else:
+            await group.board_channel_id.clear()
+            await group.board_message_ids.clear()
+
+    async def _run(self) -> None:
+        await self.cog.bot.wait_until_red_ready()
+        while True:
+            await asyncio.sleep(self.interval)
+            dirty, self._dirty = self._dirty, set()
+            for guild_id in dirty:
+                try:
+                    await self.refresh(guild_id)
+                except discord.HTTPException:
+                    log.exception("Could not refresh the LFG board of %s.", guild_id)
+                    # Try again on the next tick.
+                    self._dirty.add(guild_id)
+                except Exception:
+                    log.exception(
+                        "Error while refreshing the LFG board of %s.", guild_id
+                    )
@@ -1,75 +1,317 @@
 import typing
 
 import discord
+from redbot.core import commands
 from redbot.core.commands import check
 
+from .utils import is_lfg_voice_channel
+
 if typing.TYPE_CHECKING:
     from redbot.core.commands import Context, GuildContext
 
     from lfg.objects import RequestCollection
+    from lfg.settings import GuildSettings
+    from lfg.squads import SquadQueue
+
+    from . import types
+
+_T = typing.TypeVar("_T")
+
+
+def is_owner() -> typing.Callable[[_T], _T]:
+    """:func:`redbot.core.commands.is_owner`, keeping the type of the decorated group.
+
+    Red types its privilege checks with a constrained type variable, so a decorated
+    group is seen as a plain command and its subcommands can't be declared.
+    """
+    return typing.cast("typing.Callable[[_T], _T]", commands.is_owner())
+
+
+def admin_or_permissions(**perms: bool) -> typing.Callable[[_T], _T]:
+    """:func:`redbot.core.commands.admin_or_permissions`, keeping the type of the
+    decorated coroutine."""
+    return typing.cast(
+        "typing.Callable[[_T], _T]", commands.admin_or_permissions(**perms)
+    )
 
 
 def is_in_voice_channel():
-    async def predicate(ctx: Context) -> bool:
-        if isinstance(ctx.author, "discord.Member"):
+    async def predicate(ctx: "Context") -> bool:
+        if isinstance(ctx.author, discord.Member):
             return ctx.author.voice is not None
         return False
 
     return check(predicate)
 
 
-async def check_can_start_request(
-    ctx: "GuildContext", players: int, requests: "RequestCollection"
-) -> bool:
-    if requests.has_request(ctx.guild.id, ctx.author.id):
-        await ctx.send(
-            "You already have an active LFG request. Complete it before creating a new one.",
-            ephemeral=True,
-            delete_after=10,
-        )
-        return False
+class GuildChannels(typing.NamedTuple):
+    """The LFG channels of a guild, resolved from its settings."""
+
+    guild: discord.Guild
+    """The guild the channels were resolved from."""
+
+    category_id: "types.ChannelID | None"
+    """The ID of the LFG category in the settings."""
+
+    lfg_channel_id: "types.ChannelID | None"
+    """The ID of the LFG channel in the settings."""
+
+    category: "discord.abc.GuildChannel | None"
+    """The LFG category, or None if it is not set or was not found."""
+
+    lfg_channel: discord.TextChannel | None
+    """The LFG channel, or None if it is not set or was not found."""
+
 
-    if players < 1 or players > 2:
-        await ctx.send(
-            "The number of players must be between 1 and 2.",
-            ephemeral=True,
-            delete_after=10,
+class ChannelLookupCache:
+    """Cache the LFG category and channel of each guild.
+
+    An entry is rebuilt when the guild's settings point to other channels, or when the
+    guild object was replaced after a reconnection. It must be invalidated when a
+    channel of the guild is deleted.
+    """
+
+    def __init__(self) -> None:
+        self._channels: dict["types.GuildID", GuildChannels] = {}
+
+    def get(self, guild: discord.Guild, settings: "GuildSettings") -> GuildChannels:
+        """Return the LFG channels of a guild.
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The guild.
+        settings : GuildSettings
+            The guild settings.
+
+        Returns
+        -------
+        GuildChannels
+            The resolved channels.
+        """
+        channels = self._channels.get(guild.id)
+        if (
+            channels is not None
+            and channels.guild is guild
+            and channels.category_id == settings.category_id
+            and channels.lfg_channel_id == settings.lfg_channel_id
+        ):
+            return channels
+        category = (
+            guild.get_channel(settings.category_id) if settings.category_id else None
         )
-        return False
-    if not ctx.author.voice:
-        await ctx.send(
-            "You're not in a voice channel.", ephemeral=True, delete_after=10
+        lfg_channel = (
+            guild.get_channel(settings.lfg_channel_id)
+            if settings.lfg_channel_id
+            else None
         )
-        return False
-    if not ctx.author.voice.channel:
-        await ctx.send(
-            "You're not in a voice channel, or I am not able to find your voice channel. If you are connected to a voice channel, please contact an administrator about this issue.",
-            ephemeral=True,
-            delete_after=10,
+        channels = self._channels[guild.id] = GuildChannels(
+            guild,
+            settings.category_id,
+            settings.lfg_channel_id,
+            category,
+            lfg_channel if isinstance(lfg_channel, discord.TextChannel) else None,
         )
-        return False
-    if ctx.author.voice.channel.category_id != 1364881154334789632:
-        await ctx.send(
-            "You're not connected to a LFG voice channel. Please connect to <#1364881155559784539> and retry.",
-            ephemeral=True,
-            delete_after=10,
+        return channels
+
+    def invalidate(self, guild_id: "types.GuildID") -> None:
+        """Drop the cached channels of a guild.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild.
+        """
+        self._channels.pop(guild_id, None)
+
+
+class Precheck(typing.NamedTuple):
+    """What a precheck needs to validate a new request."""
+
+    author: discord.Member
+    """The member creating the request."""
+
+    players: int
+    """The number of players looked for."""
+
+    requests: "RequestCollection"
+    """The current requests."""
+
+    queue: "SquadQueue"
+    """The matchmaking queue."""
+
+    settings: "GuildSettings"
+    """The guild settings."""
+
+    channels: GuildChannels
+    """The LFG channels of the guild."""
+
+
+def _check_players(precheck: Precheck) -> str | None:
+    if precheck.players < 1 or precheck.players > 2:
+        return "The number of players must be between 1 and 2."
+    return None
+
+
+def _check_setup(precheck: Precheck) -> str | None:
+    if precheck.channels.category is None:
+        return (
+            "LFG is not set up in this server yet. Please contact an administrator "
+            "about this issue."
         )
-        return False
-    if len(ctx.author.voice.channel.members) >= players + 1:
-        await ctx.send(
-            "It seems you're already playing with enough players.",
-            ephemeral=True,
-            delete_after=10,
+    return None
+
+
+def _check_voice(precheck: Precheck) -> str | None:
+    voice = precheck.author.voice
+    if voice is None:
+        return "You're not in a voice channel."
+    if voice.channel is None:
+        return (
+            "You're not in a voice channel, or I am not able to find your voice "
+            "channel. If you are connected to a voice channel, please contact an "
+            "administrator about this issue."
         )
-        return False
-    if request := requests.get_request_by_voice_channel_id(
-        ctx.guild.id, ctx.author.voice.channel.id
+    if not is_lfg_voice_channel(voice.channel, precheck.settings.category_id):
+        assert precheck.channels.category
+        return (
+            "You're not connected to a LFG voice channel. Please connect to a voice "
+            f"channel in **{precheck.channels.category.name}** and retry."
+        )
+    if len(voice.channel.voice_states) >= precheck.players + 1:
+        return "It seems you're already playing with enough players."
+    return None
+
+
+def _check_party(precheck: Precheck) -> str | None:
+    assert precheck.author.voice and precheck.author.voice.channel
+    request = precheck.requests.get_request_by_voice_channel_id(
+        precheck.author.guild.id, precheck.author.voice.channel.id
+    )
+    if request is not None:
+        return (
+            "It seems you're already in a party that is currently running a LFG "
+            f"request. (Led by <@{request.ctx.author_id}>)"
+        )
+    return None
+
+
+def _check_not_queued(precheck: Precheck) -> str | None:
+    if precheck.queue.get_ticket(precheck.author.guild.id, precheck.author.id):
+        return "You're in the queue. Use `/lfg dequeue` to leave it first."
+    return None
+
+
+def _check_party_not_queued(precheck: Precheck) -> str | None:
+    assert precheck.author.voice and precheck.author.voice.channel
+    guild_id = precheck.author.guild.id
+    if any(
+        precheck.queue.get_ticket(guild_id, member_id)
+        for member_id in precheck.author.voice.channel.voice_states
     ):
-        await ctx.send(
-            f"It seems you're already in a party that is currently running a LFG request. (Led by {request.ctx.author.mention})",
-            allowed_mentions=discord.AllowedMentions.none(),
-            ephemeral=True,
-            delete_after=10,
+        return "Someone in your voice channel is in the queue."
+    return None
+
+
+def _check_no_request(precheck: Precheck) -> str | None:
+    if precheck.requests.is_claimed(precheck.author.guild.id, precheck.author.id):
+        return (
+            "You already have an active LFG request. Complete it before creating a "
+            "new one."
         )
-        return False
-    return True
+    return None
+
+
+PrecheckFunc: typing.TypeAlias = typing.Callable[[Precheck], "str | None"]
+
+PRECHECKS: tuple[PrecheckFunc, ...] = (
+    _check_players,
+    _check_setup,
+    _check_voice,
+    _check_party,
+    _check_not_queued,
+    _check_party_not_queued,
+    # May query the shared registry, so it runs last.
+    _check_no_request,
+)
+"""The checks run before creating a request, in order. Each returns the message to
+send when it fails, or None."""
+
+MEMBER_PRECHECKS: tuple[PrecheckFunc, ...] = (
+    _check_players,
+    _check_setup,
+    _check_not_queued,
+    _check_no_request,
+)
+"""The checks that do not depend on the author's voice channel, run before the author
+is moved to a pooled channel."""
+
+
+def run_prechecks(
+    precheck: Precheck, prechecks: tuple[PrecheckFunc, ...] = PRECHECKS
+) -> str | None:
+    """Run the prechecks until one fails.
+
+    Parameters
+    ----------
+    precheck : Precheck
+        The request to validate.
+    prechecks : tuple[PrecheckFunc, ...]
+        The checks to run, every check by default.
+
+    Returns
+    -------
+    str | None
+        The message of the first failed check, or None if every check passed.
+    """
+    for check_request in prechecks:
+        if (message := check_request(precheck)) is not None:
+            return message
+    return None
+
+
+async def check_can_start_request(
+    ctx: "GuildContext",
+    players: int,
+    requests: "RequestCollection",
+    queue: "SquadQueue",
+    settings: "GuildSettings",
+    channels: GuildChannels,
+    prechecks: tuple[PrecheckFunc, ...] = PRECHECKS,
+) -> bool:
+    """Validate a new request, and tell the author why it was refused.
+
+    Parameters
+    ----------
+    ctx : GuildContext
+        The context of the command.
+    players : int
+        The number of players looked for.
+    requests : RequestCollection
+        The current requests.
+    queue : SquadQueue
+        The matchmaking queue.
+    settings : GuildSettings
+        The guild settings.
+    channels : GuildChannels
+        The LFG channels of the guild.
+    prechecks : tuple[PrecheckFunc, ...]
+        The checks to run, every check by default.
+
+    Returns
+    -------
+    bool
+        If the request can be created.
+    """
+    message = run_prechecks(
+        Precheck(ctx.author, players, requests, queue, settings, channels), prechecks
+    )
+    if message is None:
+        return True
+    await ctx.send(
+        message,
+        allowed_mentions=discord.AllowedMentions.none(),
+        ephemeral=True,
+        delete_after=10,
+    )
+    return False
@@ -0,0 +1,113 @@
+import abc
+import typing
+
+if typing.TYPE_CHECKING:
+    from . import types
+
+
+REGISTRY_FILE_NAME = "requests.sqlite3"
+"""Name of the shared registry database, in the cog's data folder by default."""
+
+ClaimKey: typing.TypeAlias = tuple["types.GuildID", "types.UserID"]
+
+
+CLAIM_RETRY_DELAYS = (0.01, 0.05, 0.2)
+"""Time, in seconds, to wait before each new claim attempt while the registry is busy."""
+
+
+class RegistryError(Exception):
+    """The shared registry could not be reached."""
+
+
+class RegistryBusy(RegistryError):
+    """The shared registry is being written by another process, retry shortly."""
+
+
+class RequestRegistry(abc.ABC):
+    """Claims on the request authors, shared by every process running the cog.
+
+    A process must claim an author before posting their request, so two shards or
+    processes never post a request for the same author. The requests themselves stay
+    in the :class:`~lfg.objects.RequestCollection` of the process owning the claim.
+    """
+
+    @abc.abstractmethod
+    def claim(
+        self,
+        guild_id: "types.GuildID",
+        user_id: "types.UserID",
+        voice_channel_id: "types.ChannelID",
+        expires_at: float,
+    ) -> bool:
+        """Atomically claim an author, if no other process holds a live claim.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild of the request.
+        user_id : types.UserID
+            The ID of the request's author.
+        voice_channel_id : types.ChannelID
+            The ID of the voice channel of the request.
+        expires_at : float
+            UNIX timestamp after which the claim is dropped, if it was not released.
+
+        Returns
+        -------
+        bool
+            If the claim was taken.
+
+        Raises
+        ------
+        RegistryBusy
+            Another process is writing to the registry, nothing was claimed.
+        RegistryError
+            The registry could not be reached, nothing was claimed.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def release(self, guild_id: "types.GuildID", user_id: "types.UserID") -> None:
+        """Release the claim of this process on an author, if any.
+
+        A claim that can't be released is left to expire.
+        """
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def is_claimed(self, guild_id: "types.GuildID", user_id: "types.UserID") -> bool:
+        """Check if any process holds a live claim on an author.
+
+        If the registry can't be reached, the author is considered unclaimed and the
+        claim taken on creation decides.
+        """
+        raise NotImplementedError()
+
+    def release_all(self) -> None:
+        """Release every claim of this process."""
+
+    def close(self) -> None:
+        """Release the resources of the backend."""
+
+
+class LocalRequestRegistry(RequestRegistry):
+    """Registry of a single process.
+
+    The request collection of the process already knows every request, so claims
+    always succeed and nothing is stored.
+    """
+
+    def claim(
+        self,
+        guild_id: "types.GuildID",
+        user_id: "types.UserID",
+        voice_channel_id: "types.ChannelID",
+        expires_at: float,
+    ) -> bool:
+        return True
+
+    def release(self, guild_id: "types.GuildID", user_id: "types.UserID") -> None:
+        pass
+
+    def is_claimed(self, guild_id: "types.GuildID", user_id: "types.UserID") -> bool:
+        return False
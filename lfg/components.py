@@ -0,0 +1,136 @@
+import typing
+
+import discord
+
+from .utils import log
+
+if typing.TYPE_CHECKING:
+    from redbot.core.bot import Red
+
+    from . import types
+    from .main import LFG
+    from .objects import Request
+
+
+BUTTONS: dict[str, tuple[str, discord.ButtonStyle]] = {
+    "join": ("Join squad", discord.ButtonStyle.success),
+    "cancel": ("Cancel", discord.ButtonStyle.secondary),
+}
+"""Label and style of the request buttons, by action."""
+
+
+class RequestButton(
+    discord.ui.DynamicItem[discord.ui.Button],
+    template=r"lfg:(?P<action>join|cancel):(?P<author_id>[0-9]+):(?P<request_id>[0-9]+)",
+):
+    """A button of a request message, bound to the request through its custom ID.
+
+    The custom ID holds the action, the request author's ID and the request ID, so a
+    click is resolved straight from the cog's requests, and a button left on the
+    message of a finished request never acts on a newer request of the same author.
+    A single dynamic item is registered for every message, and buttons keep working
+    after a restart.
+    """
+
+    def __init__(self, action: str, author_id: "types.UserID", request_id: int) -> None:
+        label, style = BUTTONS[action]
+        super().__init__(
+            discord.ui.Button(
+                label=label,
+                style=style,
+                custom_id=f"lfg:{action}:{author_id}:{request_id}",
+            )
+        )
+        self.action = action
+        self.author_id = author_id
+        self.request_id = request_id
+
+    @classmethod
+    async def from_custom_id(
+        cls,
+        interaction: discord.Interaction,
+        item: discord.ui.Item[typing.Any],
+        match: "typing.Match[str]",
+    ) -> "RequestButton":
+        return cls(match["action"], int(match["author_id"]), int(match["request_id"]))
+
+    async def callback(self, interaction: discord.Interaction) -> None:
+        client = typing.cast("Red", interaction.client)
+        cog = typing.cast("LFG | None", client.get_cog("LFG"))
+        if cog is None or interaction.guild is None:
+            return
+        request = cog.requests.get_request(interaction.guild.id, self.author_id)
+        if request is None or request.ctx.request_id != self.request_id:
+            await interaction.response.send_message(
+                "This LFG request is no longer open.", ephemeral=True
+            )
+            return
+        member = typing.cast(discord.Member, interaction.user)
+
+        if self.action == "cancel":
+            if member.id != self.author_id:
+                await interaction.response.send_message(
+                    "Only the author can cancel this LFG request.", ephemeral=True
+                )
+                return
+            await interaction.response.defer(ephemeral=True)
+            await cog.dispatcher.submit(
+                cog.dispatch_key(request), cog.withdraw_request, request
+            )
+            await interaction.followup.send(
+                "Your LFG request has been cancelled.", ephemeral=True
+            )
+            return
+
+        try:
+            channel = request.ctx.voice_channel
+        except LookupError:
+            # The voice channel was deleted, the reconciler will withdraw the request.
+            await interaction.response.send_message(
+                "This LFG request is no longer open.", ephemeral=True
+            )
+            return
+        if member.id == self.author_id:
+            message = "You are leading this squad."
+        elif member.voice and member.voice.channel == channel:
+            message = "You are already in this squad."
+        elif request.ctx.remaining_places <= 0:
+            message = "This squad is already full."
+        elif member.voice and member.voice.channel:
+            try:
+                await member.move_to(channel, reason="Joined a LFG squad")
+            except discord.HTTPException:
+                log.debug("Could not move %s to %s.", member.id, channel.id)
+                message = f"Join the squad in {channel.mention}!"
+            else:
+                message = f"Moved you to {channel.mention}. Good luck, runner!"
+        else:
+            message = f"Join the squad in {channel.mention}!"
+        await interaction.response.send_message(message, ephemeral=True)
+
+
+def request_view(request: "Request") -> discord.ui.View:
+    """Build the buttons sent with a request message.
+
+    The view is only used to send the message. Clicks are handled by the registered
+    :class:`RequestButton` dynamic item, so the view is stopped before it is sent:
+    discord.py does not store a finished view, which would otherwise keep an empty
+    entry for every request message.
+
+    Parameters
+    ----------
+    request : Request
+        The request.
+
+    Returns
+    -------
+    discord.ui.View
+        The view holding the request buttons.
+    """
+    view = discord.ui.View(timeout=None)
+    for action in BUTTONS:
+        view.add_item(
+            RequestButton(action, request.ctx.author_id, request.ctx.request_id)
+        )
+    view.stop()
+    return view
@@ -0,0 +1,181 @@
+import asyncio
+import contextlib
+import typing
+
+from .utils import log
+
+if typing.TYPE_CHECKING:
+    from . import types
+
+
+DEFAULT_QUEUE_DEPTH = 64
+"""Default maximum number of pending events per voice channel."""
+
+DEFAULT_IDLE_TIMEOUT = 30.0
+"""Default time, in seconds, after which an idle channel worker stops."""
+
+DispatchKey: typing.TypeAlias = tuple["types.GuildID", "types.ChannelID"]
+
+_Job: typing.TypeAlias = tuple[
+    typing.Callable[..., typing.Awaitable[typing.Any]],
+    tuple[typing.Any, ...],
+    "asyncio.Future[typing.Any] | None",
+]
+
+
+class DispatcherStats(typing.NamedTuple):
+    workers: int
+    """Number of running channel workers."""
+
+    pending: int
+    """Number of events waiting in the queues."""
+
+    processed: int
+    """Number of events handled since the cog was loaded."""
+
+    blocked: int
+    """Number of times a queue was full and the producer had to wait."""
+
+    max_depth: int
+    """Deepest a single queue has been since the cog was loaded."""
+
+
+class ChannelEventDispatcher:
+    """Run event handlers on ordered, per voice channel worker queues.
+
+    Handlers for the same channel run one at a time, in the order they were
+    dispatched, so a completion and an update of the same request can never interleave.
+    Handlers for different channels run concurrently, so a slow Discord call for one
+    channel does not delay the others. Queues are bounded: when one is full, the
+    producer waits for room (backpressure) and the wait is counted.
+    """
+
+    def __init__(
+        self,
+        max_depth: int = DEFAULT_QUEUE_DEPTH,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    ) -> None:
+        self.max_depth = max_depth
+        self.idle_timeout = idle_timeout
+        self._queues: dict[DispatchKey, asyncio.Queue[_Job]] = {}
+        self._workers: dict[DispatchKey, asyncio.Task[None]] = {}
+        self._processed = 0
+        self._blocked = 0
+        self._max_depth = 0
+
+    @property
+    def stats(self) -> DispatcherStats:
+        return DispatcherStats(
+            workers=len(self._workers),
+            pending=sum(queue.qsize() for queue in self._queues.values()),
+            processed=self._processed,
+            blocked=self._blocked,
+            max_depth=self._max_depth,
+        )
+
+    def _get_queue(self, key: DispatchKey) -> "asyncio.Queue[_Job]":
+        queue = self._queues.get(key)
+        if queue is None:
+            queue = self._queues[key] = asyncio.Queue(self.max_depth)
+            self._workers[key] = asyncio.create_task(self._work(key, queue))
+        return queue
+
+    async def _put(self, key: DispatchKey, job: _Job) -> None:
+        queue = self._get_queue(key)
+        if queue.full():
+            self._blocked += 1
+            log.warning("Event queue of channel %s is full, waiting.", key[1])
+            await queue.put(job)
+        else:
+            queue.put_nowait(job)
+        self._max_depth = max(self._max_depth, queue.qsize())
+
+    async def dispatch(
+        self,
+        key: DispatchKey,
+        handler: typing.Callable[..., typing.Awaitable[typing.Any]],
+        *args: typing.Any,
+    ) -> None:
+        """Queue a handler to run on a channel's worker, without waiting for it.
+
+        Parameters
+        ----------
+        key : DispatchKey
+            The guild ID and voice channel ID the event belongs to.
+        handler : typing.Callable[..., typing.Awaitable[typing.Any]]
+            The coroutine function to run.
+        *args : typing.Any
+            The arguments to call the handler with.
+        """
+        await self._put(key, (handler, args, None))
+
+    async def submit(
+        self,
+        key: DispatchKey,
+        handler: typing.Callable[..., typing.Awaitable[typing.Any]],
+        *args: typing.Any,
+    ) -> typing.Any:
+        """Queue a handler to run on a channel's worker, and wait for its result.
+
+        Must not be called from a handler running on the same channel's worker.
+
+        Parameters
+        ----------
+        key : DispatchKey
+            The guild ID and voice channel ID the event belongs to.
+        handler : typing.Callable[..., typing.Awaitable[typing.Any]]
+            The coroutine function to run.
+        *args : typing.Any
+            The arguments to call the handler with.
+
+        Returns
+        -------
+        typing.Any
+            The handler's result.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._put(key, (handler, args, future))
+        return await future
+
+    async def _work(self, key: DispatchKey, queue: "asyncio.Queue[_Job]") -> None:
+        while True:
+            try:
+                handler, args, future = await asyncio.wait_for(
+                    queue.get(), self.idle_timeout
+                )
+            except asyncio.TimeoutError:
+                if queue.empty():
+                    del self._queues[key]
+                    del self._workers[key]
+                    return
+                continue
+
+            try:
+                result = await handler(*args)
+            except Exception as e:
+                if future is None:
+                    log.exception("Error while handling a LFG event.")
+                elif not future.done():
+                    future.set_exception(e)
+            else:
+                if future is not None and not future.done():
+                    future.set_result(result)
+            finally:
+                self._processed += 1
+                queue.task_done()
+
+    async def stop(self) -> None:
+        """Stop every worker, dropping the pending events."""
+        workers = list(self._workers.values())
+        for worker in workers:
+            worker.cancel()
+        for worker in workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await worker
+        for queue in self._queues.values():
+            while not queue.empty():
+                _, _, future = queue.get_nowait()
+                if future is not None:
+                    future.cancel()
+        self._queues.clear()
+        self._workers.clear()
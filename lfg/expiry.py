@@ -0,0 +1,104 @@
+import asyncio
+import contextlib
+import datetime
+import heapq
+import itertools
+import typing
+
+from .utils import BackgroundService, log
+
+if typing.TYPE_CHECKING:
+    from . import types
+
+
+DEFAULT_REQUEST_TTL = datetime.timedelta(hours=2)
+"""Default lifetime of a request before it expires."""
+
+ExpiryKey: typing.TypeAlias = tuple["types.GuildID", "types.UserID"]
+
+
+class ExpiryScheduler(BackgroundService):
+    """Expire requests after their deadline, from a single background task.
+
+    Deadlines are kept in a binary heap, so scheduling is O(log n). Cancelling only
+    drops the deadline from a dictionary and leaves a stale heap entry behind, which is
+    skipped when it reaches the top of the heap. The heap is compacted when stale
+    entries outnumber the live ones, so cancelling stays O(log n) amortized and memory
+    stays bounded.
+    """
+
+    def __init__(
+        self, on_expire: typing.Callable[[ExpiryKey], typing.Awaitable[None]]
+    ) -> None:
+        self.on_expire = on_expire
+        self._heap: list[tuple[float, int, ExpiryKey]] = []
+        # Sequence number of the live heap entry of each key.
+        self._deadlines: dict[ExpiryKey, int] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key: ExpiryKey, delay: float) -> None:
+        """Schedule a key to expire, replacing its previous deadline if any.
+
+        Parameters
+        ----------
+        key : ExpiryKey
+            The guild ID and author ID of the request.
+        delay : float
+            Time, in seconds, before the request expires.
+        """
+        deadline = asyncio.get_running_loop().time() + delay
+        seq = next(self._counter)
+        self._deadlines[key] = seq
+        heapq.heappush(self._heap, (deadline, seq, key))
+        if self._heap[0][1] == seq:
+            # New earliest deadline, the runner must wake up sooner.
+            self._wakeup.set()
+
+    def cancel(self, key: ExpiryKey) -> None:
+        """Cancel the expiry of a key.
+
+        Parameters
+        ----------
+        key : ExpiryKey
+            The guild ID and author ID of the request.
+        """
+        if self._deadlines.pop(key, None) is None:
+            return
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [
+                entry
+                for entry in self._heap
+                if self._deadlines.get(entry[2]) == entry[1]
+            ]
+            heapq.heapify(self._heap)
+
+    def _pop_stale(self) -> None:
+        heap = self._heap
+        while heap and self._deadlines.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._pop_stale()
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            timeout = self._heap[0][0] - loop.time()
+            if timeout > 0:
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                continue
+
+            _, _, key = heapq.heappop(self._heap)
+            del self._deadlines[key]
+            try:
+                await self.on_expire(key)
+            except Exception:
+                log.exception("Could not expire LFG request.")
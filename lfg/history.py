@@ -0,0 +1,205 @@
+import asyncio
+import collections
+import contextlib
+import datetime
+import json
+import pathlib
+import time
+import typing
+
+from .utils import BackgroundService, log
+
+if typing.TYPE_CHECKING:
+    from .objects import Request
+
+
+DEFAULT_HISTORY_FLUSH_INTERVAL = 5.0
+"""Default time, in seconds, between two writes of the pending history events."""
+
+HISTORY_FILE_NAME = "history.jsonl"
+"""Name of the history log, in the cog's data folder."""
+
+TERMINAL_EVENTS = frozenset(("completed", "expired", "deleted"))
+"""The events ending a request."""
+
+
+class HistorySummary(typing.NamedTuple):
+    requests: int
+    """Number of finished requests."""
+
+    completed: collections.Counter[int]
+    """Number of completed requests, by number of players looked for."""
+
+    finished: collections.Counter[int]
+    """Number of finished requests, by number of players looked for."""
+
+    median_time_to_fill: dict[int | None, float | None]
+    """Median time, in seconds, to complete a request, by number of players looked for.
+    The None key holds the median of every request."""
+
+    fill_rate_by_hour: dict[int, float]
+    """Ratio of completed requests, by UTC hour of creation."""
+
+
+class _MedianCounter:
+    """Streaming median over whole seconds, using one counter per second."""
+
+    def __init__(self) -> None:
+        self.counts: collections.Counter[int] = collections.Counter()
+        self.total = 0
+
+    def add(self, seconds: float) -> None:
+        self.counts[int(seconds)] += 1
+        self.total += 1
+
+    def median(self) -> float | None:
+        if not self.total:
+            return None
+        middle = (self.total + 1) / 2
+        seen = 0
+        for seconds in sorted(self.counts):
+            seen += self.counts[seconds]
+            if seen >= middle:
+                return float(seconds)
+        return None
+
+
+class RequestHistory(BackgroundService):
+    """Append-only log of the request lifecycles.
+
+    Events are only queued in memory by :meth:`record`, and appended to a JSON lines
+    file by a background task, in a thread, so no event handler waits on the disk.
+    :meth:`summarize` streams the file line by line, so the log never has to fit in
+    memory.
+    """
+
+    path: pathlib.Path
+    """The history log file."""
+
+    flush_interval: float
+    """Time, in seconds, between two writes of the pending events."""
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        flush_interval: float = DEFAULT_HISTORY_FLUSH_INTERVAL,
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self._pending: list[str] = []
+
+    def record(self, event: str, request: "Request") -> None:
+        """Queue a lifecycle event of a request.
+
+        Parameters
+        ----------
+        event : str
+            The event: ``created``, ``update``, ``completed``, ``expired`` or
+            ``deleted``.
+        request : Request
+            The request.
+        """
+        ctx = request.ctx
+        self._pending.append(
+            json.dumps(
+                {
+                    "t": round(time.time(), 3),
+                    "e": event,
+                    "g": ctx.guild_id,
+                    "u": ctx.author_id,
+                    "n": ctx.looking_for,
+                    "m": len(ctx.member_ids),
+                    "c": round(ctx.created_at.timestamp(), 3),
+                },
+                separators=(",", ":"),
+            )
+        )
+
+    @staticmethod
+    def _append(path: pathlib.Path, lines: list[str]) -> None:
+        with path.open("a", encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    async def flush(self) -> None:
+        """Append the pending events to the log now."""
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        try:
+            await asyncio.to_thread(self._append, self.path, lines)
+        except OSError:
+            log.exception("Could not write the LFG history.")
+            # Keep them for the next flush.
+            self._pending[:0] = lines
+
+    @staticmethod
+    def _summarize(path: pathlib.Path, since: float) -> HistorySummary:
+        completed: collections.Counter[int] = collections.Counter()
+        finished: collections.Counter[int] = collections.Counter()
+        medians: collections.defaultdict[int | None, _MedianCounter] = (
+            collections.defaultdict(_MedianCounter)
+        )
+        completed_by_hour: collections.Counter[int] = collections.Counter()
+        finished_by_hour: collections.Counter[int] = collections.Counter()
+
+        with (
+            contextlib.suppress(FileNotFoundError),
+            path.open(encoding="utf-8") as file,
+        ):
+            for line in file:
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    continue
+                if event["e"] not in TERMINAL_EVENTS or event["c"] < since:
+                    continue
+                looking_for = event["n"]
+                hour = datetime.datetime.fromtimestamp(
+                    event["c"], datetime.timezone.utc
+                ).hour
+                finished[looking_for] += 1
+                finished_by_hour[hour] += 1
+                if event["e"] == "completed":
+                    completed[looking_for] += 1
+                    completed_by_hour[hour] += 1
+                    medians[looking_for].add(event["t"] - event["c"])
+                    medians[None].add(event["t"] - event["c"])
+
+        return HistorySummary(
+            requests=sum(finished.values()),
+            completed=completed,
+            finished=finished,
+            median_time_to_fill={
+                key: counter.median() for key, counter in medians.items()
+            },
+            fill_rate_by_hour={
+                hour: completed_by_hour[hour] / count
+                for hour, count in sorted(finished_by_hour.items())
+            },
+        )
+
+    async def summarize(self, since: float = 0) -> HistorySummary:
+        """Compute the aggregates of the finished requests, without blocking.
+
+        Parameters
+        ----------
+        since : float
+            Only count the requests created after this UNIX timestamp.
+
+        Returns
+        -------
+        HistorySummary
+            The aggregates.
+        """
+        await self.flush()
+        return await asyncio.to_thread(self._summarize, self.path, since)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def stop(self) -> None:
+        """Stop the background writer task, writing the pending events."""
+        await super().stop()
+        await self.flush()
@@ -1,40 +1,436 @@
+import asyncio
+import contextlib
+import datetime
+import os
+import pathlib
+import socket
 import typing
 
 import discord
-from redbot.core import app_commands, commands
+from redbot.core import app_commands, commands, data_manager
+from redbot.core.config import Config
+from redbot.core.data_manager import cog_data_path
 
 from lfg import checks
+from lfg.board import RequestBoard
+from lfg.checks import ChannelLookupCache
+from lfg.claims import (
+    REGISTRY_FILE_NAME,
+    LocalRequestRegistry,
+    RegistryError,
+    RequestRegistry,
+)
+from lfg.components import RequestButton, request_view
+from lfg.dispatch import ChannelEventDispatcher, DispatchKey
+from lfg.expiry import ExpiryKey, ExpiryScheduler
+from lfg.history import HISTORY_FILE_NAME, RequestHistory
+from lfg.matchmaking import MatchmakingIndex
+from lfg.metrics import PrometheusExporter, metrics
 from lfg.objects import Request, RequestCollection
+from lfg.pool import VoiceChannelPool
+from lfg.reconciler import VoiceReconciler
+from lfg.rest import Priority, RestDispatcher, channel_route
+from lfg.roles import registry
+from lfg.scheduler import DEFAULT_EDIT_DELAY, EmbedEditScheduler
+from lfg.settings import DEFAULT_SETTINGS, SettingsCache
+from lfg.squads import SquadQueue
+from lfg.store import RequestStore
 from lfg.utils import log
 
 from .utils import (
     has_joined_voice_channel,
     has_left_voice_channel,
+    has_moved_voice_channel,
+    is_lfg_voice_channel,
 )
 
-# from redbot.core.config import Config
-
-
 if typing.TYPE_CHECKING:
     from redbot.core.bot import Red
 
+    from . import types
+    from .utils import BackgroundService
+
 
 class LFG(commands.Cog):
     """LFG system for Marathon group-making."""
 
     requests: RequestCollection
+    matchmaking: MatchmakingIndex
+    edit_scheduler: EmbedEditScheduler
+    request_store: RequestStore
+    expiry: ExpiryScheduler
+    reconciler: VoiceReconciler
+    settings: SettingsCache
+    channel_lookups: ChannelLookupCache
+    dispatcher: ChannelEventDispatcher
+    rest: RestDispatcher
+    board: RequestBoard
+    voice_pool: VoiceChannelPool
+    squad_queue: SquadQueue
+    history: RequestHistory
+    metrics_exporter: PrometheusExporter
+
+    voice_events_filtered: int
+    """Number of voice state updates dropped by the pre-filter."""
+
+    voice_events_processed: int
+    """Number of voice state updates that went through the pre-filter."""
 
     def __init__(self, bot: "Red"):
         self.bot: "Red" = bot
 
-        # self.config: "Config" = Config.get_conf(self, identifier=55856177615, force_registration=True)
-        # self.config.register_guild()
+        self.config: "Config" = Config.get_conf(
+            self, identifier=55856177615, force_registration=True
+        )
+        self.config.register_global(
+            persist_requests=True,
+            edit_delay=DEFAULT_EDIT_DELAY,
+            metrics_export_path=None,
+            registry_backend="local",
+            registry_path=None,
+        )
+        self.config.register_guild(
+            requests={},
+            board_channel_id=None,
+            board_message_ids=[],
+            pool_channel_ids=[],
+            **DEFAULT_SETTINGS.to_config(),
+        )
 
         self.requests = RequestCollection()
+        self.matchmaking = MatchmakingIndex()
+        self.rest = RestDispatcher()
+        self.edit_scheduler = EmbedEditScheduler(self.rest)
+        self.request_store = RequestStore(self.config)
+        self.expiry = ExpiryScheduler(self.expire_request)
+        self.reconciler = VoiceReconciler(self)
+        self.settings = SettingsCache(self.config)
+        self.channel_lookups = ChannelLookupCache()
+        self.dispatcher = ChannelEventDispatcher()
+        self.board = RequestBoard(self)
+        self.voice_pool = VoiceChannelPool(self)
+        self.squad_queue = SquadQueue(self)
+        self.history = RequestHistory(cog_data_path(self) / HISTORY_FILE_NAME)
+        self.metrics_exporter = PrometheusExporter(metrics, self.metrics_gauges)
+        self.voice_events_filtered = 0
+        self.voice_events_processed = 0
+        self._rehydrate_task: asyncio.Task[None] | None = None
 
         super().__init__()
 
-    @commands.hybrid_command(name="lfg")
+    async def cog_load(self) -> None:
+        try:
+            await self._load()
+        except Exception:
+            # Red does not unload a cog that failed to load, stop what was started.
+            await self.cog_unload()
+            raise
+
+    async def _load(self) -> None:
+        # Read Config once, instead of once per service.
+        global_data = await self.config.all()
+        all_guilds = await self.config.all_guilds()
+        await self.settings.load(all_guilds)
+        await self.board.load(all_guilds)
+        await self.voice_pool.load(all_guilds)
+        self.requests.registry = self.open_registry(
+            global_data["registry_backend"], global_data["registry_path"]
+        )
+        # Claims left by a crash, the persisted requests claim their author again.
+        self.requests.registry.release_all()
+        self.edit_scheduler.delay = global_data["edit_delay"]
+        self.request_store.enabled = global_data["persist_requests"]
+        self.metrics_exporter.path = global_data["metrics_export_path"]
+
+        self.bot.add_dynamic_items(RequestButton)
+        metrics.watch_rate_limits()
+        for service in self._services():
+            service.start()
+        if self.request_store.enabled:
+            self._rehydrate_task = asyncio.create_task(self.rehydrate_requests())
+
+    def _services(self) -> tuple["BackgroundService | RestDispatcher", ...]:
+        """The background services, in the order they are started."""
+        return (
+            self.request_store,
+            self.history,
+            self.rest,
+            self.expiry,
+            self.reconciler,
+            self.board,
+            self.voice_pool,
+            self.squad_queue,
+            self.metrics_exporter,
+        )
+
+    async def cog_unload(self) -> None:
+        if self._rehydrate_task is not None:
+            self._rehydrate_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._rehydrate_task
+            self._rehydrate_task = None
+        metrics.unwatch_rate_limits()
+        self.bot.remove_dynamic_items(RequestButton)
+
+        # Stop in reverse order, so a service only stops after what feeds it.
+        for service in reversed(self._services()):
+            if service is self.rest:
+                # The event handlers still send through the REST dispatcher.
+                await self._stop_service(self.dispatcher)
+                self.edit_scheduler.cancel_all()
+            await self._stop_service(service)
+
+        self.requests.registry.release_all()
+        self.requests.registry.close()
+
+    @staticmethod
+    async def _stop_service(
+        service: "BackgroundService | RestDispatcher | ChannelEventDispatcher",
+    ) -> None:
+        # A failing service must not keep the others running.
+        try:
+            await service.stop()
+        except Exception:
+            log.exception("Error while stopping %s.", type(service).__name__)
+
+    def open_registry(self, backend: str, path: str | None) -> RequestRegistry:
+        """Open a request registry.
+
+        Parameters
+        ----------
+        backend : str
+            ``local`` or ``sqlite``.
+        path : str | None
+            The SQLite database, or None for the default one in the cog's data folder.
+
+        Returns
+        -------
+        RequestRegistry
+            The registry, or the in-process one if the shared one cannot be opened.
+        """
+        if backend != "sqlite":
+            return LocalRequestRegistry()
+        # Only imported when a shared registry is used.
+        import sqlite3
+
+        from lfg.sqlite_registry import SQLiteRequestRegistry
+
+        database = (
+            pathlib.Path(path) if path else cog_data_path(self) / REGISTRY_FILE_NAME
+        )
+        # Red runs a single process per instance, and the instance name is kept across
+        # restarts, so the claims persisted by the last run are released on load.
+        shard_ids = getattr(self.bot, "shard_ids", None)
+        owner = ":".join(
+            (
+                socket.gethostname(),
+                data_manager.instance_name() or str(os.getpid()),
+                ",".join(map(str, sorted(shard_ids))) if shard_ids else "all",
+            )
+        )
+        try:
+            return SQLiteRequestRegistry(database, owner)
+        except sqlite3.Error:
+            log.exception("Could not open the LFG registry at %s.", database)
+            return LocalRequestRegistry()
+
+    def metrics_gauges(self) -> dict[str, float]:
+        """Point-in-time values exported along with the metrics."""
+        return {
+            "live_requests": sum(
+                len(requests) for requests in self.requests.current_lfgs.values()
+            ),
+            "scheduled_expiries": len(self.expiry),
+            "matchmaking_entries": len(self.matchmaking),
+            "queued_members": len(self.squad_queue),
+            "pending_events": self.dispatcher.stats.pending,
+            "pending_rest_calls": len(self.rest),
+        }
+
+    async def rehydrate_requests(self) -> None:
+        """Restore the requests persisted before the last unload or restart.
+
+        Channels and members are resolved from the cache and notifications are
+        restored as partial messages, so no REST call is needed for live requests.
+        Stale notifications are deleted concurrently.
+        """
+        await self.bot.wait_until_red_ready()
+
+        stale: list[typing.Coroutine[typing.Any, typing.Any, None]] = []
+        restored = 0
+        for guild_id, stored_requests in (await self.request_store.load()).items():
+            guild = self.bot.get_guild(guild_id)
+            for user_id, stored in stored_requests.items():
+                if self.requests.has_request(guild_id, user_id):
+                    continue
+                notification = None
+                voice_channel = None
+                member = None
+                if guild is not None:
+                    member = guild.get_member(user_id)
+                    voice_channel = guild.get_channel(stored["voice_channel_id"])
+                    if stored["channel_id"] and stored["message_id"]:
+                        channel = guild.get_channel_or_thread(stored["channel_id"])
+                        if isinstance(channel, discord.abc.Messageable):
+                            notification = channel.get_partial_message(  # type: ignore
+                                stored["message_id"]
+                            )
+
+                if (
+                    member is None
+                    or not isinstance(voice_channel, discord.VoiceChannel)
+                    or member.voice is None
+                    or member.voice.channel != voice_channel
+                ):
+                    # The author left while we were not listening.
+                    self.request_store.remove(guild_id, user_id)
+                    if notification is not None:
+                        stale.append(self._delete_stale_notification(notification))
+                    continue
+
+                request = Request(
+                    self.bot, member, voice_channel, stored["looking_for"]
+                )
+                request.ctx.created_at = datetime.datetime.fromtimestamp(
+                    stored["created_at"], datetime.timezone.utc
+                )
+                request.ctx.notification = notification
+                request.ctx.on_board = stored.get("on_board", False)
+                try:
+                    pushed = await self.requests.claim_request(
+                        guild_id,
+                        user_id,
+                        request,
+                        self.settings.get(guild_id).request_ttl,
+                    )
+                except RegistryError:
+                    # Kept in the store, it is restored on the next load.
+                    log.exception("Could not restore the LFG request of %s.", user_id)
+                    continue
+                if not pushed:
+                    # Another process took over the author in the meantime.
+                    self.request_store.remove(guild_id, user_id)
+                    if notification is not None:
+                        stale.append(self._delete_stale_notification(notification))
+                    continue
+                self.matchmaking.add(request)
+                self.schedule_expiry(request)
+                # Members may have joined or left in the meantime.
+                await self.dispatcher.dispatch(
+                    self.dispatch_key(request), self.update_request_embed, request
+                )
+                restored += 1
+
+        await asyncio.gather(*stale, return_exceptions=True)
+        log.info("Restored %s LFG request(s).", restored)
+
+    async def _delete_stale_notification(self, message: "discord.PartialMessage"):
+        try:
+            await self.rest.submit(
+                Priority.COMPLETION,
+                channel_route(message.channel.id),
+                message.delete,
+                key=message.id,
+                metric="rest_delete",
+            )
+        except discord.HTTPException:
+            pass
+
+    def schedule_expiry(self, request: Request) -> None:
+        """Schedule the expiry of a request, based on its creation time.
+
+        Parameters
+        ----------
+        request : Request
+            The request to expire.
+        """
+        ttl = self.settings.get(request.ctx.guild_id).request_ttl
+        expires_at = request.ctx.created_at + datetime.timedelta(seconds=ttl)
+        delay = (
+            expires_at - datetime.datetime.now(datetime.timezone.utc)
+        ).total_seconds()
+        self.expiry.schedule(
+            (request.ctx.guild_id, request.ctx.author_id), max(delay, 0)
+        )
+
+    @staticmethod
+    def dispatch_key(request: Request) -> DispatchKey:
+        """Return the key of the worker queue handling a request's events.
+
+        Parameters
+        ----------
+        request : Request
+            The request.
+
+        Returns
+        -------
+        DispatchKey
+            The guild ID and voice channel ID of the request.
+        """
+        return (request.ctx.guild_id, request.ctx.voice_channel_id)
+
+    async def expire_request(self, key: ExpiryKey) -> None:
+        request = self.requests.get_request(*key)
+        if request is None:
+            return
+        await self.dispatcher.submit(
+            self.dispatch_key(request), self._expire_request, request
+        )
+
+    async def _expire_request(self, request: Request) -> None:
+        key = (request.ctx.guild_id, request.ctx.author_id)
+        if self.requests.get_request(*key) is not request:
+            return
+        self.history.record("expired", request)
+        await self.edit_scheduler.cancel(request)
+        if message := request.ctx.notification:
+            try:
+                embed = request.ctx.embed_builder.build_expired(request.ctx)
+            except LookupError:
+                # The author is gone, the message can't be rendered anymore.
+                await self._delete_stale_notification(message)
+            else:
+                try:
+                    await self.rest.submit(
+                        Priority.COMPLETION,
+                        channel_route(message.channel.id),
+                        lambda: message.edit(embed=embed, view=None, delete_after=10),
+                        key=message.id,
+                        metric="rest_edit",
+                    )
+                except discord.HTTPException:
+                    log.exception("Could not edit LFG request message on expiry.")
+        metrics.increment("requests_expired")
+        await self.forget_request(*key)
+
+    async def forget_request(
+        self, guild_id: "types.GuildID", user_id: "types.UserID"
+    ) -> typing.Optional[Request]:
+        """Remove a request from every place it is tracked.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild where the request is located.
+        user_id : types.UserID
+            The ID of the request's author.
+
+        Returns
+        -------
+        typing.Optional[Request]
+            The removed request, if any.
+        """
+        request = self.requests.pop_request(guild_id, user_id)
+        self.matchmaking.remove(guild_id, user_id)
+        self.request_store.remove(guild_id, user_id)
+        self.expiry.cancel((guild_id, user_id))
+        if request:
+            await self.edit_scheduler.cancel(request)
+            if request.ctx.on_board:
+                self.board.mark_dirty(guild_id)
+        return request
+
+    @commands.hybrid_group(name="lfg", fallback="create", invoke_without_command=True)
     @app_commands.choices(
         players=[
             app_commands.Choice(name="Duo", value=1),
@@ -42,9 +438,6 @@ class LFG(commands.Cog):
         ]
     )
     @app_commands.describe(players="The kind of squad you wish to create.")
-    @app_commands.guilds(
-        1279299830442627074, 1364692913438589098
-    )  # Remove after initial development.
     @app_commands.guild_only()
     async def lfg(self, ctx: "commands.GuildContext", players: int):
         """Create a new LFG post for group-making.
@@ -53,44 +446,616 @@ class LFG(commands.Cog):
         ``players``: The number of players you are looking for to make a group.
             Must be between 1 and 2.
         """
-        if not await checks.check_can_start_request(ctx, players, self.requests):
+        settings = self.settings.get(ctx.guild.id)
+        channels = self.channel_lookups.get(ctx.guild, settings)
+        deferred = False
+        if self.voice_pool.needs_provision(ctx.author, players + 1, settings):
+            # Only move the author once nothing but their voice channel can refuse them.
+            if not await checks.check_can_start_request(
+                ctx,
+                players,
+                self.requests,
+                self.squad_queue,
+                settings,
+                channels,
+                checks.MEMBER_PRECHECKS,
+            ):
+                return
+            if ctx.interaction is not None:
+                # Creating a channel and moving the author can take longer than the
+                # interaction allows for a response.
+                await ctx.defer(ephemeral=True)
+                deferred = True
+            await self.voice_pool.provision(ctx.author, players + 1, settings)
+        with metrics.timer("check_can_start_request"):
+            allowed = await checks.check_can_start_request(
+                ctx, players, self.requests, self.squad_queue, settings, channels
+            )
+        if not allowed:
             return
 
         assert ctx.author.voice
         assert ctx.author.voice.channel
 
-        request = Request(ctx.author, ctx.author.voice.channel, players)
-        self.requests.push_request(ctx.guild.id, ctx.author.id, request)
+        request = Request(self.bot, ctx.author, ctx.author.voice.channel, players)
+        request.ctx.on_board = settings.board_mode
+        try:
+            pushed = await self.requests.claim_request(
+                ctx.guild.id, ctx.author.id, request, settings.request_ttl
+            )
+        except RegistryError:
+            log.exception("Could not register the LFG request of %s.", ctx.author.id)
+            await ctx.send(
+                "I couldn't register your LFG request, please retry later.",
+                ephemeral=True,
+            )
+            return
+        if not pushed:
+            # Created concurrently, by another command or process.
+            await ctx.send(
+                "You already have an active LFG request. Complete it before creating a "
+                "new one.",
+                ephemeral=True,
+                delete_after=10,
+            )
+            return
+        self.matchmaking.add(request)
+        self.schedule_expiry(request)
+        self.history.record("created", request)
+
+        if request.ctx.on_board:
+            self.board.mark_dirty(ctx.guild.id)
+            self.request_store.save(request)
+            metrics.increment("requests_created")
+            await ctx.send("Your request was added to the LFG board.", ephemeral=True)
+            return
 
         e = request.make_embed()
 
-        lfg_channel = self.bot.get_channel(1364693332533575824)
-        if not lfg_channel:
+        lfg_channel = channels.lfg_channel
+        if lfg_channel is None:
             log.error("Couldn't find LFG channel")
             lfg_channel = ctx.channel
-        request_message = await lfg_channel.send(embed=e)
+        try:
+            request_message = await self.rest.submit(
+                Priority.POST,
+                channel_route(lfg_channel.id),
+                lambda: lfg_channel.send(embed=e, view=request_view(request)),
+                metric="rest_send",
+            )
+        except discord.HTTPException:
+            log.exception("Could not send LFG request message.")
+            self.history.record("deleted", request)
+            await self.forget_request(ctx.guild.id, ctx.author.id)
+            await ctx.send(
+                "I couldn't post your LFG request, please retry later.",
+                ephemeral=True,
+            )
+            return
+        if self.requests.get_request(ctx.guild.id, ctx.author.id) is not request:
+            # Completed or expired while the message was being sent.
+            await self._delete_stale_notification(request_message)
+            if deferred:
+                await ctx.send("Your LFG request was already closed.", ephemeral=True)
+            return
+        metrics.increment("requests_created")
         request.ctx.notification = request_message
+        self.edit_scheduler.record_sent(request, e)
+        self.request_store.save(request)
+        if deferred:
+            # The deferred response must be answered.
+            await ctx.send(
+                f"Your LFG request was posted in {lfg_channel.mention}.",
+                ephemeral=True,
+            )
+
+    @lfg.command(name="queue")
+    @app_commands.choices(
+        players=[
+            app_commands.Choice(name="Duo", value=1),
+            app_commands.Choice(name="Trio", value=2),
+        ]
+    )
+    @app_commands.describe(players="The kind of squad you wish to join.")
+    @commands.guild_only()
+    async def lfg_queue(self, ctx: "commands.GuildContext", players: int):
+        """Join the queue to be matched automatically with other runners.
+
+        If you are in a LFG voice channel, everyone in it is queued with you.
+
+        __Parameters__
+        ``players``: The number of players you are looking for to make a group.
+            Must be between 1 and 2.
+        """
+        if players < 1 or players > 2:
+            await ctx.send(
+                "The number of players must be between 1 and 2.", ephemeral=True
+            )
+            return
+        if self.squad_queue.get_ticket(ctx.guild.id, ctx.author.id):
+            await ctx.send(
+                "You're already in the queue. Use `/lfg dequeue` to leave it.",
+                ephemeral=True,
+            )
+            return
+        if self.requests.has_request(ctx.guild.id, ctx.author.id):
+            await ctx.send(
+                "You already have an active LFG request. Complete it before joining "
+                "the queue.",
+                ephemeral=True,
+            )
+            return
+
+        settings = self.settings.get(ctx.guild.id)
+        party = [ctx.author.id]
+        voice_channel = ctx.author.voice.channel if ctx.author.voice else None
+        if is_lfg_voice_channel(voice_channel, settings.category_id):
+            assert voice_channel
+            party = list(voice_channel.voice_states)
+        if len(party) > players:
+            await ctx.send(
+                "It seems you're already playing with enough players.", ephemeral=True
+            )
+            return
+        if any(self.squad_queue.get_ticket(ctx.guild.id, i) for i in party):
+            await ctx.send(
+                "Someone in your voice channel is already in the queue.",
+                ephemeral=True,
+            )
+            return
+        if any(self.requests.has_request(ctx.guild.id, i) for i in party) or (
+            voice_channel is not None
+            and self.requests.get_request_by_voice_channel_id(
+                ctx.guild.id, voice_channel.id
+            )
+        ):
+            await ctx.send(
+                "Your voice channel is already running a LFG request. Complete it "
+                "before joining the queue.",
+                ephemeral=True,
+            )
+            return
+
+        self.squad_queue.enqueue(ctx.author, party, players + 1)
+        waiting = self.squad_queue.waiting(ctx.guild.id, players + 1)
+        await ctx.send(
+            f"You joined the {'duo' if players == 1 else 'trio'} queue "
+            f"({waiting} waiting). You'll be pinged once matched!",
+            ephemeral=True,
+        )
+
+    @lfg.command(name="dequeue")
+    @commands.guild_only()
+    async def lfg_dequeue(self, ctx: "commands.GuildContext"):
+        """Leave the matchmaking queue."""
+        ticket = self.squad_queue.get_ticket(ctx.guild.id, ctx.author.id)
+        if ticket is None:
+            await ctx.send("You're not in the queue.", ephemeral=True)
+            return
+        self.squad_queue.dequeue(ticket)
+        await ctx.send("You left the queue.", ephemeral=True)
+
+    @lfg.command(name="find")
+    @commands.guild_only()
+    async def lfg_find(self, ctx: "commands.GuildContext"):
+        """Find the open squads that best match your runners and playstyle.
+
+        If you are in a LFG voice channel, the squad must have room for everyone in it.
+        """
+        party_size = 1
+        voice = ctx.author.voice
+        if voice and is_lfg_voice_channel(
+            voice.channel, self.settings.get(ctx.guild.id).category_id
+        ):
+            # Only an LFG channel is a party, not a general or AFK channel.
+            assert voice.channel
+            party_size = max(len(voice.channel.voice_states), 1)
+
+        matches = self.matchmaking.find(ctx.author, party_size)
+        if not matches:
+            await ctx.send(
+                "No open squad matches you right now. Why not start your own with `/lfg create`?",
+                ephemeral=True,
+            )
+            return
+
+        embed = discord.Embed(title="Open squads for you")
+        embed.description = "\n".join(
+            f"- <@{request.ctx.author_id}> in <#{request.ctx.voice_channel_id}>: "
+            f"{request.ctx.remaining_places} place(s) left"
+            + (
+                f" ([post]({request.ctx.notification.jump_url}))"
+                if request.ctx.notification
+                else ""
+            )
+            for request in matches
+        )
+        await ctx.send(
+            embed=embed,
+            ephemeral=True,
+            allowed_mentions=discord.AllowedMentions.none(),
+        )
 
     @commands.is_owner()
     @commands.command(aliases=["lfginfo"])
     async def lfgkowalskyanalysis(self, ctx: "commands.GuildContext"):
         """Kaboom......??"""
+        voice_events = (
+            f"Voice events: {self.voice_events_processed} processed, "
+            f"{self.voice_events_filtered} filtered"
+        )
+        stats = self.dispatcher.stats
+        voice_events += (
+            f"\nQueues: {stats.workers} worker(s), {stats.pending} pending, "
+            f"max depth {stats.max_depth}, blocked {stats.blocked} time(s)"
+        )
+        if report := self.reconciler.last_report:
+            voice_events += (
+                f"\nLast reconciliation: {report.checked} checked in "
+                f"{report.duration * 1000:.2f}ms, {report.repairs} repaired"
+            )
         requests = self.requests.current_lfgs.get(ctx.guild.id)
         if not requests:
-            await ctx.send("No active LFG requests.")
+            await ctx.send(f"No active LFG requests.\n{voice_events}")
             return
 
+        def describe(request: Request) -> str:
+            # The author may have left the guild since the request was created.
+            author = ctx.guild.get_member(request.ctx.author_id)
+            voice = author.voice.channel if author and author.voice else None
+            return f"- <@{request.ctx.author_id}> | VC: {voice}"
+
         description = "Current requests:\n"
-        description += "\n".join(
-            f"- {req.ctx.author.mention} | VC: {req.ctx.author.voice.channel if req.ctx.author.voice else None}"
-            for req in requests.values()
-        )
+        description += "\n".join(describe(req) for req in requests.values())
 
         embed = discord.Embed(
             title="Current LFG Requests Analysis", description=description
         )
+        embed.set_footer(text=voice_events)
         await ctx.send("Yes Rico... Kaboom!", embed=embed)
 
+    @commands.group(invoke_without_command=True)
+    @checks.is_owner()
+    async def lfgmetrics(self, ctx: "commands.Context"):
+        """Show the latency percentiles and event rates of the LFG system."""
+        latencies = "\n".join(
+            f"{name}: "
+            + " / ".join(
+                f"{value * 1000:.2f}ms"
+                for value in histogram.percentiles(*metrics.QUANTILES)
+            )
+            + f" ({histogram.count} samples)"
+            for name, histogram in sorted(metrics.histograms.items())
+        )
+        rates = "\n".join(
+            f"{name}: {count} ({metrics.rate(name) * 60:.2f}/min)"
+            for name, count in sorted(metrics.counters.items())
+        )
+        gauges = "\n".join(
+            f"{name}: {value}" for name, value in self.metrics_gauges().items()
+        )
+
+        embed = discord.Embed(title="LFG metrics")
+        embed.add_field(
+            name="Latency (p50 / p95 / p99)",
+            value=latencies or "No samples yet.",
+            inline=False,
+        )
+        embed.add_field(name="Events", value=rates or "No events yet.", inline=False)
+        embed.add_field(name="Live", value=gauges, inline=False)
+        embed.set_footer(
+            text=(
+                f"Uptime {metrics.uptime / 60:.0f} minutes. "
+                "Rate limit hits are counted for the whole bot."
+            )
+        )
+        await ctx.send(embed=embed)
+
+    @lfgmetrics.command(name="export")
+    async def lfgmetrics_export(
+        self, ctx: "commands.Context", path: typing.Optional[str] = None
+    ):
+        """Write the metrics to a local file in the Prometheus text format.
+
+        The file is rewritten every 30 seconds, for a node exporter to scrape.
+
+        __Parameters__
+        ``path``: The file to write. Leave empty to stop exporting.
+        """
+        await self.config.metrics_export_path.set(path)
+        self.metrics_exporter.path = path
+        if path is None:
+            await ctx.send("LFG metrics will no longer be exported.")
+            return
+        try:
+            await self.metrics_exporter.export()
+        except OSError as e:
+            await ctx.send(f"Metrics export path set, but the first write failed: {e}")
+            return
+        await ctx.send(f"LFG metrics will now be exported to `{path}`.")
+
+    @commands.is_owner()
+    @commands.command()
+    async def lfghistory(self, ctx: "commands.Context", days: int = 30):
+        """Show statistics on the finished LFG requests.
+
+        __Parameters__
+        ``days``: Only count the requests created in the last days.
+        """
+        since = (
+            datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=days)
+        ).timestamp()
+        async with ctx.typing():
+            summary = await self.history.summarize(since)
+        if not summary.requests:
+            await ctx.send(f"No LFG request finished in the last {days} days.")
+            return
+
+        def median(players: int | None) -> str:
+            value = summary.median_time_to_fill.get(players)
+            return "n/a" if value is None else f"{value / 60:.1f} min"
+
+        embed = discord.Embed(title=f"LFG history, last {days} days")
+        embed.add_field(
+            name="Requests",
+            value=(
+                f"{summary.requests} finished, "
+                f"{sum(summary.completed.values())} completed\n"
+                f"Median time to fill: {median(None)}"
+            ),
+            inline=False,
+        )
+        for players, name in ((1, "Duo"), (2, "Trio")):
+            finished = summary.finished[players]
+            completed = summary.completed[players]
+            embed.add_field(
+                name=name,
+                value=(
+                    f"{completed}/{finished} completed"
+                    + (f" ({completed / finished:.0%})" if finished else "")
+                    + f"\nMedian time to fill: {median(players)}"
+                ),
+            )
+        embed.add_field(
+            name="Fill rate by hour (UTC)",
+            value="\n".join(
+                f"{hour:02}h: {rate:.0%}"
+                for hour, rate in summary.fill_rate_by_hour.items()
+            ),
+            inline=False,
+        )
+        await ctx.send(embed=embed)
+
+    @commands.is_owner()
+    @commands.command()
+    async def lfgpersistence(self, ctx: "commands.Context", enabled: bool):
+        """Enable or disable the persistence of the LFG requests across restarts.
+
+        __Parameters__
+        ``enabled``: If the requests should be persisted.
+        """
+        await self.config.persist_requests.set(enabled)
+        self.request_store.enabled = enabled
+        if enabled:
+            for guild_requests in self.requests.current_lfgs.values():
+                for request in guild_requests.values():
+                    self.request_store.save(request)
+            await ctx.send("LFG requests will now be persisted.")
+        else:
+            await self.request_store.clear()
+            await ctx.send("LFG requests will no longer be persisted.")
+
+    @commands.is_owner()
+    @commands.command()
+    async def lfgregistry(
+        self,
+        ctx: "commands.Context",
+        backend: typing.Literal["local", "sqlite"],
+        path: typing.Optional[str] = None,
+    ):
+        """Set where the LFG requests are registered, to share them across processes.
+
+        With `local`, each process only knows its own requests. With `sqlite`, every
+        process using the same database file refuses a request whose author already
+        has one in another process. Applied on the next load of the cog.
+
+        __Parameters__
+        ``backend``: `local` or `sqlite`.
+        ``path``: The SQLite database shared by the processes. Defaults to a file in
+            the cog's data folder.
+        """
+        await self.config.registry_backend.set(backend)
+        await self.config.registry_path.set(path if backend == "sqlite" else None)
+        await ctx.send(
+            f"LFG requests will be registered with the `{backend}` backend after the "
+            "cog is reloaded."
+        )
+
+    @commands.group()
+    @commands.guild_only()
+    @checks.admin_or_permissions(manage_guild=True)
+    async def lfgset(self, ctx: "commands.GuildContext"):
+        """Configure the LFG system for this server."""
+
+    @lfgset.command(name="show")
+    async def lfgset_show(self, ctx: "commands.GuildContext"):
+        """Show the LFG settings of this server."""
+        settings = self.settings.get(ctx.guild.id)
+
+        def roles(role_ids: frozenset[int]) -> str:
+            return ", ".join(f"<@&{role_id}>" for role_id in role_ids) or "None"
+
+        embed = discord.Embed(title="LFG settings")
+        embed.add_field(
+            name="Category",
+            value=f"<#{settings.category_id}>" if settings.category_id else "Not set",
+        )
+        embed.add_field(
+            name="LFG channel",
+            value=(
+                f"<#{settings.lfg_channel_id}>"
+                if settings.lfg_channel_id
+                else "Not set"
+            ),
+        )
+        embed.add_field(
+            name="Request lifetime", value=f"{settings.request_ttl // 60} minutes"
+        )
+        embed.add_field(
+            name="Board mode", value="Enabled" if settings.board_mode else "Disabled"
+        )
+        embed.add_field(
+            name="Channel pool",
+            value=(
+                f"{settings.pool_low_watermark} to {settings.pool_high_watermark} "
+                "idle channels per squad size"
+                if settings.pool_enabled
+                else "Disabled"
+            ),
+        )
+        embed.add_field(name="Runner roles", value=roles(settings.runner_role_ids))
+        embed.add_field(
+            name="Playstyle roles", value=roles(settings.playstyle_role_ids)
+        )
+        await ctx.send(embed=embed, allowed_mentions=discord.AllowedMentions.none())
+
+    @lfgset.command(name="category")
+    async def lfgset_category(
+        self, ctx: "commands.GuildContext", category: discord.CategoryChannel
+    ):
+        """Set the category containing the LFG voice channels.
+
+        __Parameters__
+        ``category``: The LFG category.
+        """
+        await self.settings.update(ctx.guild.id, category_id=category.id)
+        await ctx.send(f"LFG category set to **{category.name}**.")
+
+    @lfgset.command(name="channel")
+    async def lfgset_channel(
+        self, ctx: "commands.GuildContext", channel: discord.TextChannel
+    ):
+        """Set the channel the LFG requests are posted in.
+
+        __Parameters__
+        ``channel``: The LFG channel.
+        """
+        await self.settings.update(ctx.guild.id, lfg_channel_id=channel.id)
+        await ctx.send(f"LFG requests will now be posted in {channel.mention}.")
+
+    @lfgset.command(name="runners")
+    async def lfgset_runners(self, ctx: "commands.GuildContext", *roles: discord.Role):
+        """Set the runner roles shown on the LFG requests.
+
+        __Parameters__
+        ``roles``: The runner roles. Leave empty to clear.
+        """
+        await self.settings.update(
+            ctx.guild.id, runner_role_ids=frozenset(role.id for role in roles)
+        )
+        await self.refresh_guild_requests(ctx.guild.id)
+        await ctx.send("Runner roles updated.")
+
+    @lfgset.command(name="playstyles")
+    async def lfgset_playstyles(
+        self, ctx: "commands.GuildContext", *roles: discord.Role
+    ):
+        """Set the playstyle roles shown on the LFG requests.
+
+        __Parameters__
+        ``roles``: The playstyle roles. Leave empty to clear.
+        """
+        await self.settings.update(
+            ctx.guild.id, playstyle_role_ids=frozenset(role.id for role in roles)
+        )
+        await self.refresh_guild_requests(ctx.guild.id)
+        await ctx.send("Playstyle roles updated.")
+
+    @lfgset.command(name="ttl")
+    async def lfgset_ttl(self, ctx: "commands.GuildContext", minutes: int):
+        """Set how long a LFG request lives before it expires.
+
+        Only applies to new requests.
+
+        __Parameters__
+        ``minutes``: The lifetime of a request, in minutes.
+        """
+        if minutes < 1:
+            await ctx.send("The lifetime must be at least one minute.")
+            return
+        await self.settings.update(ctx.guild.id, request_ttl=minutes * 60)
+        await ctx.send(f"LFG requests will now expire after {minutes} minutes.")
+
+    @lfgset.command(name="board")
+    async def lfgset_board(self, ctx: "commands.GuildContext", enabled: bool):
+        """List the LFG requests on a shared board instead of one message each.
+
+        The board is posted and pinned in the LFG channel, and split over several
+        messages when needed. Only applies to new requests.
+
+        __Parameters__
+        ``enabled``: If the board should be used.
+        """
+        await self.settings.update(ctx.guild.id, board_mode=enabled)
+        self.board.mark_dirty(ctx.guild.id)
+        if enabled:
+            await ctx.send("New LFG requests will now be listed on the board.")
+        else:
+            await ctx.send("New LFG requests will now be posted in their own message.")
+
+    @lfgset.command(name="pool")
+    async def lfgset_pool(
+        self,
+        ctx: "commands.GuildContext",
+        enabled: bool,
+        low: int = DEFAULT_SETTINGS.pool_low_watermark,
+        high: int = DEFAULT_SETTINGS.pool_high_watermark,
+    ):
+        """Keep empty voice channels ready in the LFG category for new requests.
+
+        Members creating a request from another voice channel are moved to a ready
+        channel of the right size. The number of ready channels follows the demand,
+        between the low and high watermarks.
+
+        __Parameters__
+        ``enabled``: If the channel pool should be used.
+        ``low``: Minimum number of ready channels for each squad size.
+        ``high``: Maximum number of ready channels for each squad size.
+        """
+        if low < 0 or high < low:
+            await ctx.send("The watermarks must satisfy 0 <= low <= high.")
+            return
+        await self.settings.update(
+            ctx.guild.id,
+            pool_enabled=enabled,
+            pool_low_watermark=low,
+            pool_high_watermark=high,
+        )
+        if enabled:
+            await ctx.send(
+                f"Between {low} and {high} voice channels will be kept ready for "
+                "each squad size."
+            )
+        else:
+            await ctx.send("Ready voice channels will be removed once empty.")
+
+    @commands.is_owner()
+    @lfgset.command(name="editdelay")
+    async def lfgset_editdelay(self, ctx: "commands.GuildContext", seconds: float):
+        """Set the window during which LFG message updates are merged together.
+
+        This setting applies to every server.
+
+        __Parameters__
+        ``seconds``: The window, in seconds.
+        """
+        if seconds < 0:
+            await ctx.send("The window can't be negative.")
+            return
+        await self.config.edit_delay.set(seconds)
+        self.edit_scheduler.delay = seconds
+        await ctx.send(f"LFG message updates will now be merged over {seconds}s.")
+
     @commands.command(name="lfgdelete")
     @commands.mod_or_can_manage_channel()
     @commands.guild_only()
@@ -108,29 +1073,85 @@ class LFG(commands.Cog):
             )
             return
 
-        self.requests.pop_request(ctx.guild.id, member.id)
+        request = self.requests.get_request(ctx.guild.id, member.id)
+        assert request
+        await self.dispatcher.submit(
+            self.dispatch_key(request), self.delete_request, request
+        )
         await ctx.send(
             f"{member.display_name}'s LFG request has been deleted.", ephemeral=True
         )
 
+    async def delete_request(self, request: Request) -> None:
+        """Remove a request on a moderator's demand, leaving its message as is.
+
+        Parameters
+        ----------
+        request : Request
+            The request to delete.
+        """
+        key = (request.ctx.guild_id, request.ctx.author_id)
+        if self.requests.get_request(*key) is not request:
+            # Completed, expired or withdrawn while the deletion was queued.
+            return
+        self.history.record("deleted", request)
+        await self.forget_request(*key)
+
     async def complete_request(self, request: Request):
-        if request.ctx.notification:
-            await request.ctx.notification.edit(
-                embed=request.ctx.embed_builder.build_completed(request.ctx),
-                delete_after=10,
-            )
+        key = (request.ctx.guild_id, request.ctx.author_id)
+        if self.requests.get_request(*key) is not request:
+            # Already completed, expired or deleted.
+            return
+        self.history.record("completed", request)
+        # Completion must win over any pending update.
+        await self.edit_scheduler.cancel(request)
+        if message := request.ctx.notification:
+            try:
+                embed = request.ctx.embed_builder.build_completed(request.ctx)
+            except LookupError:
+                # The author is gone, the message can't be rendered anymore.
+                await self._delete_stale_notification(message)
+            else:
+                try:
+                    await self.rest.submit(
+                        Priority.COMPLETION,
+                        channel_route(message.channel.id),
+                        lambda: message.edit(embed=embed, view=None, delete_after=10),
+                        key=message.id,
+                        metric="rest_edit",
+                    )
+                except discord.HTTPException:
+                    log.exception("Could not edit LFG request message on completion.")
             # await request.ctx.notification.channel.send(
             #     f"{request.ctx.author.display_name}'s LFG request has been completed and removed.",
             #     delete_after=10,
             # )
-        self.requests.pop_request(request.ctx.author.guild.id, request.ctx.author.id)
+        metrics.increment("requests_completed")
+        await self.forget_request(*key)
 
-    async def update_request_embed(self, request: Request):
-        message = request.ctx.notification
-        if not message:
-            log.error("No notification message found for request. Cannot update embed.")
-            return
+    async def update_request_embed(
+        self, request: Request, fill_changed: bool = False
+    ) -> None:
+        """Complete a full request, or schedule the update of its embed.
 
+        Parameters
+        ----------
+        request : Request
+            The request to update.
+        fill_changed : bool
+            If members joined or left the request's voice channel. Only these updates
+            are recorded in the history, not the refreshes of the author or of a
+            restored request.
+        """
+        if (
+            self.requests.get_request(request.ctx.guild_id, request.ctx.author_id)
+            is not request
+        ):
+            # Completed, expired or deleted while the update was queued.
+            return
+        self.matchmaking.update(request)
+        if fill_changed:
+            self.history.record("update", request)
         remaining_places = request.ctx.remaining_places
         if remaining_places is None:
             log.error(
@@ -141,8 +1162,15 @@ class LFG(commands.Cog):
             await self.complete_request(request)
             return
 
-        embed = request.make_embed()
-        await message.edit(embed=embed)
+        if request.ctx.on_board:
+            self.board.mark_dirty(request.ctx.guild_id)
+            return
+        message = request.ctx.notification
+        if not message:
+            log.error("No notification message found for request. Cannot update embed.")
+            return
+
+        self.edit_scheduler.schedule(request)
 
     async def on_voice_leave(
         self, member: "discord.Member", channel: "discord.guild.VocalGuildChannel"
@@ -152,10 +1180,12 @@ class LFG(commands.Cog):
         )
         if not request:
             log.info("No request found for leave.")
-            return
-        if request.ctx.author == member:
-            return await self.complete_request(request)
-        await self.update_request_embed(request)
+        elif request.ctx.author_id == member.id:
+            await self.complete_request(request)
+        else:
+            request.ctx.member_left(member.id)
+            await self.update_request_embed(request, fill_changed=True)
+        await self.voice_pool.recycle(channel)
 
     async def on_voice_join(
         self, member: "discord.Member", channel: "discord.guild.VocalGuildChannel"
@@ -166,9 +1196,138 @@ class LFG(commands.Cog):
 
         if request:
             log.info("Request found: update embed")
-            return await self.update_request_embed(request)
+            request.ctx.member_joined(member.id)
+            return await self.update_request_embed(request, fill_changed=True)
         log.info("No request found for join")
 
+    async def refresh_request_author(self, author: "discord.Member") -> None:
+        request = self.requests.get_request(author.guild.id, author.id)
+        if request is None:
+            return
+        request.ctx.invalidate_static_parts()
+        await self.dispatcher.dispatch(
+            self.dispatch_key(request), self.update_request_embed, request
+        )
+
+    async def refresh_guild_requests(self, guild_id: "types.GuildID") -> None:
+        """Rebuild the embeds of the live requests of a guild after its roles changed.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild whose runner or playstyle roles were changed.
+        """
+        for request in list(self.requests.current_lfgs.get(guild_id, {}).values()):
+            request.ctx.invalidate_static_parts()
+            await self.dispatcher.dispatch(
+                self.dispatch_key(request), self.update_request_embed, request
+            )
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: "discord.Member", after: "discord.Member"):
+        if not self.requests.has_request(after.guild.id, after.id):
+            return
+        if before.roles != after.roles or before.display_avatar != after.display_avatar:
+            await self.refresh_request_author(after)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: "discord.Member"):
+        request = self.requests.get_request(member.guild.id, member.id)
+        if request is None:
+            return
+        # The author is no longer cached, so the notification can't be rendered.
+        await self.dispatcher.dispatch(
+            self.dispatch_key(request), self.withdraw_request, request
+        )
+
+    async def withdraw_request(self, request: Request) -> None:
+        """Remove a request and delete its notification, without any message.
+
+        Parameters
+        ----------
+        request : Request
+            The request to withdraw.
+        """
+        key = (request.ctx.guild_id, request.ctx.author_id)
+        if self.requests.get_request(*key) is not request:
+            return
+        self.history.record("deleted", request)
+        await self.edit_scheduler.cancel(request)
+        if notification := request.ctx.notification:
+            await self._delete_stale_notification(notification)
+        await self.forget_request(*key)
+
+    @commands.Cog.listener()
+    async def on_guild_role_update(self, before: "discord.Role", after: "discord.Role"):
+        if before.name == after.name:
+            return
+        registry.invalidate_role(after)
+        guild_requests = self.requests.current_lfgs.get(after.guild.id, {})
+        for request in list(guild_requests.values()):
+            author = after.guild.get_member(request.ctx.author_id)
+            if author is not None and author.get_role(after.id) is not None:
+                await self.refresh_request_author(author)
+
+    @commands.Cog.listener()
+    async def on_guild_role_delete(self, role: "discord.Role"):
+        registry.invalidate_role(role)
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild: "discord.Guild"):
+        # Roles renamed while the guild was unavailable were never announced.
+        registry.invalidate_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: "discord.Guild"):
+        registry.invalidate_guild(guild.id)
+        self.channel_lookups.invalidate(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: "discord.abc.GuildChannel"):
+        self.channel_lookups.invalidate(channel.guild.id)
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: "discord.User", after: "discord.User"):
+        if before.display_avatar == after.display_avatar:
+            return
+        for guild_id in list(self.requests.current_lfgs):
+            if not self.requests.has_request(guild_id, after.id):
+                continue
+            guild = self.bot.get_guild(guild_id)
+            member = guild and guild.get_member(after.id)
+            if member:
+                await self.refresh_request_author(member)
+
+    def should_ignore_voice_update(
+        self,
+        guild_id: "types.GuildID",
+        before: "discord.VoiceState",
+        after: "discord.VoiceState",
+    ) -> bool:
+        """Cheap pre-filter dropping voice events that cannot affect any request.
+
+        Mute, deafen and stream toggles, events in guilds without live requests and
+        events outside of the LFG category are all ignored. Leaving a pooled channel is
+        never ignored, so the channel goes back to its pool once empty.
+        """
+        before_channel = before.channel
+        after_channel = after.channel
+        if before_channel is after_channel or (
+            before_channel is not None
+            and after_channel is not None
+            and before_channel.id == after_channel.id
+        ):
+            return True
+        if not self.requests.has_guild_requests(guild_id):
+            return before_channel is None or not self.voice_pool.owns(
+                guild_id, before_channel.id
+            )
+        category_id = self.settings.get(guild_id).category_id
+        return not (
+            is_lfg_voice_channel(before_channel, category_id)
+            or is_lfg_voice_channel(after_channel, category_id)
+        )
+
     @commands.Cog.listener()
     async def on_voice_state_update(
         self,
@@ -176,28 +1335,44 @@ class LFG(commands.Cog):
         before: "discord.VoiceState",
         after: "discord.VoiceState",
     ):
-        log.debug(
-            f"Voice state update for {member.display_name}: {before.channel} -> {after.channel}"
-        )
-        check_against = None
-        if before.channel:
-            check_against = before.channel
-        if after.channel:
-            check_against = after.channel
-        if not check_against:
-            log.error(
-                "No before or after channel found for voice status update. Event ignored."
-            )
+        metrics.increment("voice_events")
+        if self.should_ignore_voice_update(member.guild.id, before, after):
+            self.voice_events_filtered += 1
             return
+        self.voice_events_processed += 1
+        with metrics.timer("voice_state_update"):
+            await self._on_voice_state_update(member, before, after)
 
-        if has_joined_voice_channel(before, after):
-            channel = after.channel
-            assert channel
-            log.debug("Voice channel joined: %s", channel.name)
-            await self.on_voice_join(member, channel)
+    async def _on_voice_state_update(
+        self,
+        member: "discord.Member",
+        before: "discord.VoiceState",
+        after: "discord.VoiceState",
+    ):
 
-        if has_left_voice_channel(before, after):
+        log.debug(
+            "Voice state update for %s: %s -> %s",
+            member.display_name,
+            before.channel,
+            after.channel,
+        )
+        moved = has_moved_voice_channel(before, after)
+        category_id = self.settings.get(member.guild.id).category_id
+
+        if moved or has_left_voice_channel(before, after):
             channel = before.channel
             assert channel
-            log.debug("Voice channel left: %s", channel.name)
-            await self.on_voice_leave(member, channel)
+            if is_lfg_voice_channel(channel, category_id):
+                log.debug("Voice channel left: %s", channel.name)
+                await self.dispatcher.dispatch(
+                    (member.guild.id, channel.id), self.on_voice_leave, member, channel
+                )
+
+        if moved or has_joined_voice_channel(before, after):
+            channel = after.channel
+            assert channel
+            if is_lfg_voice_channel(channel, category_id):
+                log.debug("Voice channel joined: %s", channel.name)
+                await self.dispatcher.dispatch(
+                    (member.guild.id, channel.id), self.on_voice_join, member, channel
+                )
@@ -0,0 +1,200 @@
+import itertools
+import typing
+
+from .roles import registry
+
+if typing.TYPE_CHECKING:
+    import discord
+
+    from . import types
+    from .objects import Request
+
+
+class _Entry(typing.NamedTuple):
+    request: "Request"
+    remaining: int
+    playstyle_ids: frozenset[int]
+    runner_ids: frozenset[int]
+
+
+class MatchmakingIndex:
+    """Index of the open requests, bucketed by remaining slots and playstyle.
+
+    Each request is stored once per playstyle role of its author (or in the ``None``
+    bucket if the author has none), inside the bucket of its remaining slots. Buckets
+    keep insertion order, so the oldest requests are always visited first. A query
+    visits the buckets that can fit the party from the best fit down, and only scores
+    a handful of candidates, so its cost does not depend on the number of open
+    requests.
+    """
+
+    CANDIDATES_PER_RESULT = 4
+    """How many candidates are scored for each result returned by :meth:`find`."""
+
+    def __init__(self) -> None:
+        self._buckets: dict[
+            "types.GuildID", dict[int, dict[int | None, dict["types.UserID", _Entry]]]
+        ] = {}
+        self._entries: dict[tuple["types.GuildID", "types.UserID"], _Entry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _insert(
+        self, guild_id: "types.GuildID", user_id: "types.UserID", entry: _Entry
+    ) -> None:
+        by_remaining = self._buckets.setdefault(guild_id, {})
+        by_playstyle = by_remaining.setdefault(entry.remaining, {})
+        for playstyle_id in entry.playstyle_ids or (None,):
+            by_playstyle.setdefault(playstyle_id, {})[user_id] = entry
+        self._entries[(guild_id, user_id)] = entry
+
+    def _discard(self, guild_id: "types.GuildID", user_id: "types.UserID") -> None:
+        entry = self._entries.pop((guild_id, user_id), None)
+        if entry is None:
+            return
+        by_remaining = self._buckets[guild_id]
+        by_playstyle = by_remaining[entry.remaining]
+        for playstyle_id in entry.playstyle_ids or (None,):
+            bucket = by_playstyle[playstyle_id]
+            del bucket[user_id]
+            if not bucket:
+                del by_playstyle[playstyle_id]
+        if not by_playstyle:
+            del by_remaining[entry.remaining]
+        if not by_remaining:
+            del self._buckets[guild_id]
+
+    def add(self, request: "Request") -> None:
+        """Add or refresh a request in the index.
+
+        Parameters
+        ----------
+        request : Request
+            The request to index.
+        """
+        key = (request.ctx.guild_id, request.ctx.author_id)
+        remaining = request.ctx.remaining_places
+        current = self._entries.get(key)
+        if current is not None:
+            if current.request is request and current.remaining == remaining:
+                return
+            self._discard(*key)
+        if remaining <= 0:
+            return
+
+        roles = registry.classify(request.ctx.author)
+        self._insert(
+            *key,
+            _Entry(
+                request,
+                remaining,
+                frozenset(role.id for role in roles.playstyles),
+                frozenset(role.id for role in roles.runners),
+            ),
+        )
+
+    def update(self, request: "Request") -> None:
+        """Move a request to the bucket matching its remaining slots.
+
+        Parameters
+        ----------
+        request : Request
+            The updated request.
+        """
+        key = (request.ctx.guild_id, request.ctx.author_id)
+        entry = self._entries.get(key)
+        if entry is None or entry.request is not request:
+            return
+        remaining = request.ctx.remaining_places
+        if remaining == entry.remaining:
+            return
+        self._discard(*key)
+        if remaining > 0:
+            self._insert(*key, entry._replace(remaining=remaining))
+
+    def remove(self, guild_id: "types.GuildID", user_id: "types.UserID") -> None:
+        """Remove a request from the index.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild where the request is located.
+        user_id : types.UserID
+            The ID of the request's author.
+        """
+        self._discard(guild_id, user_id)
+
+    def find(
+        self,
+        member: "discord.Member",
+        party_size: int = 1,
+        limit: int = 5,
+    ) -> list["Request"]:
+        """Find the open requests best matching a member and their party.
+
+        Requests are ranked by how well they fit the party (a request completed by the
+        party first), then by shared playstyle, then by runner diversity (fewest
+        runners in common), then by age.
+
+        Parameters
+        ----------
+        member : discord.Member
+            The member looking for a squad.
+        party_size : int
+            The number of players joining together, including the member.
+        limit : int
+            The maximum number of requests to return.
+
+        Returns
+        -------
+        list[Request]
+            The best matching requests, best first.
+        """
+        by_remaining = self._buckets.get(member.guild.id)
+        if not by_remaining:
+            return []
+        voice_channel_id = (
+            member.voice.channel.id if member.voice and member.voice.channel else None
+        )
+        roles = registry.classify(member)
+        playstyle_ids = [role.id for role in roles.playstyles]
+        runner_ids = frozenset(role.id for role in roles.runners)
+        wanted = limit * self.CANDIDATES_PER_RESULT
+
+        remaining_slots = sorted(
+            remaining for remaining in by_remaining if remaining >= party_size
+        )
+        candidates: dict["types.UserID", tuple[tuple, "Request"]] = {}
+        for remaining in remaining_slots:
+            by_playstyle = by_remaining[remaining]
+            if playstyle_ids:
+                # Shared playstyles first, then authors without any playstyle.
+                keys: list[int | None] = [*playstyle_ids, None]
+                shared = set(playstyle_ids)
+            else:
+                keys = list(by_playstyle)
+                shared = set()
+            for playstyle_id in keys:
+                bucket = by_playstyle.get(playstyle_id)
+                if not bucket:
+                    continue
+                for user_id, entry in itertools.islice(bucket.items(), wanted):
+                    if user_id == member.id or user_id in candidates:
+                        continue
+                    if entry.request.ctx.voice_channel_id == voice_channel_id:
+                        continue
+                    candidates[user_id] = (
+                        (
+                            remaining - party_size,
+                            not (entry.playstyle_ids & shared),
+                            len(entry.runner_ids & runner_ids),
+                            entry.request.ctx.created_at,
+                        ),
+                        entry.request,
+                    )
+            if len(candidates) >= wanted:
+                break
+
+        ranked = sorted(candidates.values(), key=lambda candidate: candidate[0])
+        return [request for _, request in ranked[:limit]]
@@ -0,0 +1,232 @@
+import asyncio
+import collections
+import contextlib
+import logging
+import os
+import time
+import typing
+
+from .utils import BackgroundService, log
+
+DEFAULT_SAMPLE_SIZE = 1024
+"""Default number of latest samples kept by each histogram."""
+
+DEFAULT_EXPORT_INTERVAL = 30.0
+"""Default time, in seconds, between two writes of the exported metrics."""
+
+
+class Histogram:
+    """Fixed-size window over the latest samples of a measurement.
+
+    Recording a sample is a single append to a bounded deque, percentiles are only
+    computed when they are read.
+    """
+
+    samples: collections.deque[float]
+    """The latest samples."""
+
+    count: int
+    """Total number of samples recorded."""
+
+    total: float
+    """Sum of every sample recorded."""
+
+    def __init__(self, size: int = DEFAULT_SAMPLE_SIZE) -> None:
+        self.samples = collections.deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def percentiles(self, *quantiles: float) -> list[float]:
+        """Compute percentiles over the window of latest samples.
+
+        Parameters
+        ----------
+        *quantiles : float
+            The quantiles to compute, between 0 and 1.
+
+        Returns
+        -------
+        list[float]
+            The percentiles, in the same order. All zeros if there are no samples.
+        """
+        if not self.samples:
+            return [0.0 for _ in quantiles]
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return [ordered[round(q * last)] for q in quantiles]
+
+
+class RateLimitCounter(logging.Handler):
+    """Count the rate limits reported by discord.py's HTTP client logger."""
+
+    def __init__(self, metrics: "Metrics") -> None:
+        super().__init__(logging.WARNING)
+        self.metrics = metrics
+
+    def emit(self, record: logging.LogRecord) -> None:
+        if "rate limit" in record.getMessage():
+            self.metrics.increment("rate_limit_hits")
+
+
+class Metrics:
+    """Latency histograms and event counters of the cog."""
+
+    QUANTILES = (0.5, 0.95, 0.99)
+    """The quantiles reported by the metrics command and exporter."""
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.histograms: dict[str, Histogram] = {}
+        self.counters: collections.Counter[str] = collections.Counter()
+        self._rate_limit_counter: RateLimitCounter | None = None
+
+    def observe(self, name: str, seconds: float) -> None:
+        """Record a duration.
+
+        Parameters
+        ----------
+        name : str
+            The name of the measurement.
+        seconds : float
+            The duration, in seconds.
+        """
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Increment a counter.
+
+        Parameters
+        ----------
+        name : str
+            The name of the counter.
+        value : int
+            The value to add.
+        """
+        self.counters[name] += value
+
+    @contextlib.contextmanager
+    def timer(self, name: str) -> typing.Iterator[None]:
+        """Time the wrapped block, including any await inside it.
+
+        Parameters
+        ----------
+        name : str
+            The name of the measurement.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    @property
+    def uptime(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def rate(self, name: str) -> float:
+        """Return the average rate of a counter since startup, per second."""
+        return self.counters[name] / max(self.uptime, 1.0)
+
+    def watch_rate_limits(self) -> None:
+        """Start counting the rate limits reported by discord.py."""
+        if self._rate_limit_counter is None:
+            self._rate_limit_counter = RateLimitCounter(self)
+            logging.getLogger("discord.http").addHandler(self._rate_limit_counter)
+
+    def unwatch_rate_limits(self) -> None:
+        """Stop counting the rate limits reported by discord.py."""
+        if self._rate_limit_counter is not None:
+            logging.getLogger("discord.http").removeHandler(self._rate_limit_counter)
+            self._rate_limit_counter = None
+
+    def render_prometheus(self, gauges: dict[str, float]) -> str:
+        """Render the metrics in the Prometheus text exposition format.
+
+        Parameters
+        ----------
+        gauges : dict[str, float]
+            Point-in-time values to export along with the metrics.
+
+        Returns
+        -------
+        str
+            The metrics, ready to be written to a file.
+        """
+        lines: list[str] = []
+        for name, histogram in sorted(self.histograms.items()):
+            metric = f"lfg_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for quantile, value in zip(
+                self.QUANTILES, histogram.percentiles(*self.QUANTILES)
+            ):
+                lines.append(f'{metric}{{quantile="{quantile}"}} {value:.6f}')
+            lines.append(f"{metric}_sum {histogram.total:.6f}")
+            lines.append(f"{metric}_count {histogram.count}")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE lfg_{name}_total counter")
+            lines.append(f"lfg_{name}_total {value}")
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE lfg_{name} gauge")
+            lines.append(f"lfg_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def write_file(path: str, content: str) -> None:
+        """Atomically replace a file's content. Blocking, run it in a thread.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+        content : str
+            The new content.
+        """
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.write(content)
+        os.replace(tmp_path, path)
+
+
+class PrometheusExporter(BackgroundService):
+    """Periodically write the metrics to a local file, for a node exporter to scrape."""
+
+    path: str | None
+    """The file to write the metrics to, or None to disable the export."""
+
+    def __init__(
+        self,
+        metrics: Metrics,
+        gauges: typing.Callable[[], dict[str, float]],
+        interval: float = DEFAULT_EXPORT_INTERVAL,
+    ) -> None:
+        self.metrics = metrics
+        self.gauges = gauges
+        self.interval = interval
+        self.path = None
+
+    async def export(self) -> None:
+        """Write the metrics to the file now, without blocking the event loop."""
+        if self.path is None:
+            return
+        content = self.metrics.render_prometheus(self.gauges())
+        await asyncio.to_thread(Metrics.write_file, self.path, content)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.export()
+            except OSError:
+                log.exception("Could not export LFG metrics to %s.", self.path)
+
+
+metrics = Metrics()
+"""The metrics shared by the cog."""
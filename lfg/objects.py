@@ -1,51 +1,167 @@
 import abc
+import asyncio
 import datetime
 import enum
+import json
+import pathlib
 import string
 import typing
 
 import discord
 from redbot.core.utils.chat_formatting import humanize_list
 
-from .utils import (
-    calculate_remaining_places,
-    get_playstyle_roles_from_member,
-    get_runners_roles_from_member,
-    playstyle_role_names,
-    runner_role_names,
+from .claims import (
+    CLAIM_RETRY_DELAYS,
+    LocalRequestRegistry,
+    RegistryBusy,
+    RequestRegistry,
 )
+from .metrics import metrics
+from .roles import Roles, registry
 
 if typing.TYPE_CHECKING:
     from . import types
 
 
-class Roles(enum.Enum):
-    CYBERACME = 1367066118266556416
-    NUCALORIC = 1367066155591925810
-    TRAXUS = 1367066328057249833
-    SEKIGUCHI = 1367066427542077530
-    MIDA = 1367066480407216240
+class Colors(enum.IntEnum):
+    MARATHON = 0xC4FF0E
+    CYBERACME = 0x6DCA09
+    NUCALORIC = 0xCC0D58
+    TRAXUS = 0xE06822
+    SEKIGUCHI = 0x93F4C3
+    MIDA = 0x8EDFE9
 
+    @property
+    def color(self) -> discord.Color:
+        return discord.Color(self.value)
+
+
+class StaticEmbedParts(typing.NamedTuple):
+    """Parts of a request embed that do not depend on the voice channel state."""
+
+    runners: str | None
+    """The author's runner roles, or None if they have none."""
+
+    focus: str | None
+    """The author's playstyle roles, or None if they have none."""
+
+    since: str
+    """The formatted creation time of the request."""
+
+    thumbnail_url: str
+    """The author's avatar URL."""
+
+    color: discord.Color
+    """The embed color."""
+
+
+TEMPLATES_PATH = pathlib.Path(__file__).parent / "data" / "templates.json"
+"""The embed templates of the default builder and of each faction."""
+
+
+class CompiledTemplate:
+    """A ``string.Template`` parsed once into literal text and placeholders.
+
+    Rendering joins the parts, without running the template regex again. Like
+    :meth:`string.Template.safe_substitute`, unknown placeholders are kept as is.
+    """
+
+    __slots__ = ("parts", "names")
 
-class Colors(enum.Enum):
-    MARATHON = discord.Color.from_str("#c4ff0e")
-    CYBERACME = discord.Color.from_str("#6dca09")
-    NUCALORIC = discord.Color.from_str("#cc0d58")
-    TRAXUS = discord.Color.from_str("#e06822")
-    SEKIGUCHI = discord.Color.from_str("#93f4c3")
-    MIDA = discord.Color.from_str("#8edfe9")
+    parts: tuple[tuple[str, str | None], ...]
+    """The literal text and placeholder names, in order. Literal parts have no name,
+    placeholders hold their original text to render it when they have no value."""
+
+    names: frozenset[str]
+    """The placeholder names used by the template."""
+
+    def __init__(self, template: str) -> None:
+        parts: list[tuple[str, str | None]] = []
+        position = 0
+        for match in string.Template.pattern.finditer(template):
+            if match.start() > position:
+                parts.append((template[position : match.start()], None))
+            name = match["named"] or match["braced"]
+            if name is not None:
+                parts.append((match[0], name))
+            elif match["escaped"] is not None:
+                parts.append(("$", None))
+            else:
+                parts.append((match[0], None))
+            position = match.end()
+        if position < len(template):
+            parts.append((template[position:], None))
+        self.parts = tuple(parts)
+        self.names = frozenset(name for _, name in parts if name is not None)
+
+    def render(self, values: typing.Mapping[str, str]) -> str:
+        if not self.names:
+            return "".join(text for text, _ in self.parts)
+        return "".join(
+            text if name is None else values.get(name, text)
+            for text, name in self.parts
+        )
+
+
+def _runners_left(ctx: "RequestContext") -> str:
+    remaining = ctx.remaining_places
+    return f"{remaining} runners left" if remaining > 1 else f"{remaining} runner left"
+
+
+SUBSTITUTES: dict[str, typing.Callable[["RequestContext"], str]] = {
+    "user_name": lambda ctx: f"<@{ctx.author_id}>",
+    "author_name": lambda ctx: ctx.author.display_name,
+    "request_players": lambda ctx: str(ctx.looking_for),
+    "voice_channel": lambda ctx: f"<#{ctx.voice_channel_id}>",
+    "remaining_room": lambda ctx: str(ctx.remaining_room),
+    "currently_connected": lambda ctx: str(len(ctx.member_ids)),
+    "remaining_places": lambda ctx: str(ctx.remaining_places),
+    "runners_left": _runners_left,
+}
+"""The values available to the templates, computed from the request context."""
 
 
 class RequestEmbedBuilder(abc.ABC):
-    @staticmethod
-    def get_substitutes(ctx: "RequestContext") -> dict[str, str]:
-        return {
-            "user_name": ctx.author.mention,
-            "request_players": str(ctx.looking_for),
-            "voice_channel": ctx.voice_channel.mention,
-            "remaining_room": str(calculate_remaining_places(ctx.voice_channel)),
-            "currently_connected": str(len(ctx.voice_channel.members)),
-        }
+    color: discord.Color
+    """The embed color."""
+
+    def get_static_parts(self, ctx: "RequestContext") -> StaticEmbedParts:
+        """Return the static parts of the embed, cached on the request context.
+
+        The cache is dropped with :meth:`RequestContext.invalidate_static_parts` when
+        the author's roles or avatar change.
+
+        Parameters
+        ----------
+        ctx : RequestContext
+            The request context.
+
+        Returns
+        -------
+        StaticEmbedParts
+            The static parts of the embed.
+        """
+        if ctx.static_parts is None:
+            ctx.static_parts = self.build_static_parts(ctx)
+        return ctx.static_parts
+
+    def build_static_parts(self, ctx: "RequestContext") -> StaticEmbedParts:
+        roles = registry.classify(ctx.author)
+        return StaticEmbedParts(
+            runners=(
+                humanize_list(registry.display_names(roles.runners))
+                if roles.runners
+                else None
+            ),
+            focus=(
+                humanize_list(registry.display_names(roles.playstyles))
+                if roles.playstyles
+                else None
+            ),
+            since=discord.utils.format_dt(ctx.created_at, "R"),
+            thumbnail_url=ctx.author.display_avatar.url,
+            color=self.color,
+        )
 
     @abc.abstractmethod
     def build(
@@ -61,292 +177,547 @@ class RequestEmbedBuilder(abc.ABC):
     ) -> discord.Embed:
         raise NotImplementedError()
 
+    @abc.abstractmethod
+    def build_expired(
+        self,
+        ctx: "RequestContext",
+    ) -> discord.Embed:
+        raise NotImplementedError()
 
-class DefaultEmbedBuilder(RequestEmbedBuilder):
-    DEFAULT_MESSAGE = string.Template(
-        (
-            "Runner **$user_name** is looking to play with **$request_players** other "
-            "player(s)!"
-        )
-    )
+
+class TemplateEmbedBuilder(RequestEmbedBuilder):
+    """Build the request embeds from a set of compiled templates."""
+
+    def __init__(self, template: dict[str, str]) -> None:
+        self.color = Colors[template["color"]].color
+        self.title = CompiledTemplate(template["title"])
+        self.description = CompiledTemplate(template["description"])
+        self.completed_title = CompiledTemplate(template["completed_title"])
+        self.completed_description = CompiledTemplate(template["completed_description"])
+        self.expired_title = CompiledTemplate(template["expired_title"])
+        self.expired_description = CompiledTemplate(template["expired_description"])
+
+    @staticmethod
+    def get_substitutes(
+        ctx: "RequestContext", *templates: CompiledTemplate
+    ) -> dict[str, str]:
+        """Compute the values used by templates, and only those."""
+        return {
+            name: SUBSTITUTES[name](ctx)
+            for template in templates
+            for name in template.names
+            if name in SUBSTITUTES
+        }
 
     def build(self, ctx: "RequestContext"):
+        values = self.get_substitutes(ctx, self.title, self.description)
         embed = discord.Embed(
-            title=(
-                f"LFG request: {ctx.remaining_places} runners left"
-                if ctx.remaining_places > 1
-                else f"LFG request: {ctx.remaining_places} runner left"
-            )
-        )
-        embed.description = self.DEFAULT_MESSAGE.safe_substitute(
-            self.get_substitutes(ctx)
+            title=self.title.render(values),
+            description=self.description.render(values),
         )
 
         # Currently connected members
         embed.add_field(
             name="Current runners",
-            value="\n".join(member.mention for member in ctx.voice_channel.members)
-            or "No one???",
+            value=ctx.member_mentions or "No one???",
         )
         embed.add_field(
             name="Channel",
-            value=ctx.voice_channel.mention,
+            value=f"<#{ctx.voice_channel_id}>",
         )
         embed.add_field(name="\u200b", value="\u200b")
-        if roles := get_runners_roles_from_member(ctx.author):
-            embed.add_field(
-                name="Runner",
-                value=humanize_list(runner_role_names(roles)),
-                inline=True,
-            )
+        static = self.get_static_parts(ctx)
+        if static.runners:
+            embed.add_field(name="Runner", value=static.runners, inline=True)
         # embed.add_field(
         #     name="Language",
         #     value="To set"
         # )
-        if focus := get_playstyle_roles_from_member(ctx.author):
-            embed.add_field(
-                name="Focus",
-                value=humanize_list(playstyle_role_names(focus)),
-                inline=True,
-            )
-        embed.add_field(
-            name="LFG since...",
-            value=discord.utils.format_dt(datetime.datetime.now(), "R"),
-        )
+        if static.focus:
+            embed.add_field(name="Focus", value=static.focus, inline=True)
+        embed.add_field(name="LFG since...", value=static.since)
 
-        embed.set_thumbnail(url=ctx.author.display_avatar.url)
-        embed.color = Colors.MARATHON.value
+        embed.set_thumbnail(url=static.thumbnail_url)
+        embed.color = static.color
 
         return embed
 
-    def build_completed(self, ctx: "RequestContext"):
+    def _build_final(
+        self,
+        ctx: "RequestContext",
+        title: CompiledTemplate,
+        description: CompiledTemplate,
+    ) -> discord.Embed:
+        values = self.get_substitutes(ctx, title, description)
         embed = discord.Embed(
-            title="LFG request: Complete",
-            description=f"{ctx.author.display_name} has found all runners for his game. Wish you luck, runners!",
+            title=title.render(values), description=description.render(values)
         )
 
-        embed.set_thumbnail(url=ctx.author.display_avatar.url)
-        embed.color = Colors.MARATHON.value
-
-        return embed
-
+        static = self.get_static_parts(ctx)
+        embed.set_thumbnail(url=static.thumbnail_url)
+        embed.color = static.color
 
-class CyberAcmeEmbedBuilder(RequestEmbedBuilder):
-    def build(self, ctx: "RequestContext"):
-        DEFAULT_MESSAGE = string.Template(
-            (
-                "User **$user_name** is looking to play with **$request_players** other "
-                "player(s)!\n"
-                "Currently connected to $voice_channel ($currently_connected/$remaining_room)"
-            )
-        )
-        embed = discord.Embed(
-            title=(
-                f"LFG request: {ctx.looking_for} runners"
-                if ctx.looking_for > 1
-                else f"LFG request: {ctx.looking_for} runner"
-            )
-        )
-        embed.description = DEFAULT_MESSAGE.safe_substitute(
-            {
-                "user_name": ctx.author.mention,
-                "request_players": str(ctx.looking_for),
-                "voice_channel": ctx.voice_channel.mention,
-                "remaining_room": calculate_remaining_places(ctx.voice_channel),
-                "currently_connected": len(ctx.voice_channel.members),
-            }
-        )
-        embed.add_field(
-            name="Runner",
-            value=humanize_list(
-                runner_role_names(get_runners_roles_from_member(ctx.author))
-            ),
-        )
-        # embed.add_field(
-        #     name="Language",
-        #     value="To set"
-        # )
-        embed.add_field(
-            name="Focus",
-            value=humanize_list(
-                playstyle_role_names(get_playstyle_roles_from_member(ctx.author))
-            ),
-        )
-        embed.color = ctx.author.color
         return embed
 
     def build_completed(self, ctx: "RequestContext"):
-        raise NotImplementedError()
-
-
-class NuCaloricEmbedBuilder(RequestEmbedBuilder):
-    def build(self, ctx: "RequestContext"):
-        return discord.Embed(title="NuCaloric")
-
-    def build_completed(self, ctx: "RequestContext"):
-        raise NotImplementedError()
+        return self._build_final(ctx, self.completed_title, self.completed_description)
 
-
-class TraxusEmbedBuilder(RequestEmbedBuilder):
-    def build(self, ctx: "RequestContext"):
-        return discord.Embed(title="Traxus")
-
-    def build_completed(self, ctx: "RequestContext"):
-        raise NotImplementedError()
-
-
-class SekiguchiGeneticsEmbedBuilder(RequestEmbedBuilder):
-    def build(self, ctx: "RequestContext"):
-        return discord.Embed(title="Sekiguchi Genetics")
-
-    def build_completed(self, ctx: "RequestContext"):
-        raise NotImplementedError()
-
-
-class MIDAEmbedBuilder(RequestEmbedBuilder):
-    def build(self, ctx: "RequestContext"):
-        return discord.Embed(title="MIDA")
-
-    def build_completed(self, ctx: "RequestContext"):
-        raise NotImplementedError()
+    def build_expired(self, ctx: "RequestContext"):
+        return self._build_final(ctx, self.expired_title, self.expired_description)
 
 
 class EmbedBuilderFactory:
-    builders: dict[str, type[RequestEmbedBuilder]] = {
-        "default": DefaultEmbedBuilder,
-        "cyberacme": CyberAcmeEmbedBuilder,
-        "nucaloric": NuCaloricEmbedBuilder,
-        "traxus": TraxusEmbedBuilder,
-        "sekiguchi_genetics": SekiguchiGeneticsEmbedBuilder,
-        "MIDA": MIDAEmbedBuilder,
-    }
-
-    def selected_builder_string(self, roles: "list[discord.Role]"):
-        """Get the string key of the selected builder based on the user's roles.
+    """Select the embed builder of a request from its author's faction."""
+
+    default: RequestEmbedBuilder
+    """The builder of the authors without a faction."""
+
+    builders: dict[int, RequestEmbedBuilder]
+    """The builders by faction role ID. Builders are stateless, so one instance is
+    shared by every request."""
+
+    def __init__(self, templates: dict[str, dict[str, str]]) -> None:
+        default = templates["default"]
+        self.default = TemplateEmbedBuilder(default)
+        # Faction templates only override some of the default template.
+        self.builders = {
+            Roles[name].value: TemplateEmbedBuilder({**default, **template})
+            for name, template in templates.items()
+            if name != "default"
+        }
+        self._faction_role_ids = frozenset(self.builders)
+        self._priority = {role_id: i for i, role_id in enumerate(self.builders)}
+
+    @classmethod
+    def from_file(cls, path: pathlib.Path) -> "EmbedBuilderFactory":
+        """Load and compile the templates of a JSON file.
 
         Parameters
         ----------
-        roles : list[discord.Role]
-            The member's roles list.
+        path : pathlib.Path
+            The templates file.
+
+        Returns
+        -------
+        EmbedBuilderFactory
+            The factory using the templates.
         """
-        match [r.id for r in roles]:
-            case [Roles.CYBERACME.value, *_]:
-                return "cyberacme"
-            case [Roles.NUCALORIC.value, *_]:
-                return "nucaloric"
-            case [Roles.TRAXUS.value, *_]:
-                return "traxus"
-            case [Roles.SEKIGUCHI.value, *_]:
-                return "sekiguchi_genetics"
-            case [Roles.MIDA.value, *_]:
-                return "MIDA"
-            case _:
-                return "default"
-
-    def get_builder_class(
-        self, roles: "list[discord.Role]"
-    ) -> type[RequestEmbedBuilder]:
-        """Returns a non-instantiated builder class based on the user's roles.
+        with path.open(encoding="utf-8") as file:
+            return cls(json.load(file))
+
+    def select_builder(self, role_ids: typing.Iterable[int]) -> RequestEmbedBuilder:
+        """Returns the shared builder based on the user's roles.
 
         Parameters
         ----------
-        user : discord.Member
-            The member's roles list.
+        role_ids : typing.Iterable[int]
+            The IDs of the member's roles.
 
         Returns
         -------
-        type[RequestEmbedBuilder]
-            The builder class to instantiate.
+        RequestEmbedBuilder
+            The embed builder.
         """
-        str_version = self.selected_builder_string(roles)
-        return self.builders["default"]
-        # TODO: Once templates are completed, remove this
-        # return self.builders[str_version]
+        factions = self._faction_role_ids.intersection(role_ids)
+        if not factions:
+            return self.default
+        # Members should only have one faction, the template order breaks ties.
+        return self.builders[min(factions, key=self._priority.__getitem__)]
 
-    def get_builder(self, ctx: "RequestContext") -> RequestEmbedBuilder:
-        """Returns the instanciated builder.
+    def get_builder(self, author: "discord.Member") -> RequestEmbedBuilder:
+        """Returns the builder to use for a request.
 
         Parameters
         ----------
-        ctx : RequestContext
-            The request context.
+        author : discord.Member
+            The author of the request.
 
         Returns
         -------
         RequestEmbedBuilder
             The embed builder.
         """
-        builder_class = self.get_builder_class(ctx.author.roles)
-        return builder_class()
+        return self.select_builder(role.id for role in author.roles)
+
+
+builder_factory = EmbedBuilderFactory.from_file(TEMPLATES_PATH)
+"""The embed builder factory shared by the requests."""
 
 
 class RequestContext:
-    author: discord.Member
-    """The author of the request."""
+    """The state of a request.
+
+    Only IDs and small values are stored. The guild, author, voice channel and
+    notification are resolved from the client cache when accessed, so a request never
+    keeps a stale guild, member, channel or message alive.
+    """
+
+    __slots__ = (
+        "client",
+        "guild_id",
+        "author_id",
+        "voice_channel_id",
+        "looking_for",
+        "notification_channel_id",
+        "notification_id",
+        "on_board",
+        "embed_builder",
+        "created_at",
+        "member_ids",
+        "_member_mentions",
+        "static_parts",
+    )
+
+    client: discord.Client
+    """The client whose cache the request's objects are resolved from."""
+
+    guild_id: "types.GuildID"
+    """The ID of the guild of the request."""
+
+    author_id: "types.UserID"
+    """The ID of the author of the request."""
 
-    voice_channel: discord.VoiceChannel
-    """The voice channel the author is associated to."""
+    voice_channel_id: "types.ChannelID"
+    """The ID of the voice channel the author is associated to."""
 
     looking_for: int
     """The number of players the author is looking for."""
 
-    notification: discord.Message | None
-    """The notification message sent to the LFG channel."""
+    notification_channel_id: "types.ChannelID | None"
+    """The ID of the channel the notification was sent to."""
+
+    notification_id: int | None
+    """The ID of the notification message, or None if it was not sent yet."""
+
+    on_board: bool
+    """If the request is listed on the guild's board instead of its own message."""
 
     embed_builder: RequestEmbedBuilder
     """The embed builder to use for this request."""
 
+    created_at: datetime.datetime
+    """When the request was created."""
+
+    member_ids: dict[int, None]
+    """IDs of the members of the voice channel, in the order they joined. Kept up to
+    date from the voice events with :meth:`member_joined` and :meth:`member_left`."""
+
+    static_parts: StaticEmbedParts | None
+    """Cached static parts of the embed, or None if they must be rebuilt."""
+
     def __init__(
         self,
+        client: discord.Client,
         author: "discord.Member",
         voice_channel: "discord.guild.VocalGuildChannel",
         looking_for: int,
     ) -> None:
-        self.author = author
-        self.voice_channel = author.voice.channel  # type: ignore
+        self.client = client
+        self.guild_id = author.guild.id
+        self.author_id = author.id
+        self.voice_channel_id = voice_channel.id
         self.looking_for = looking_for
-        self.notification = None
-        self.embed_builder = EmbedBuilderFactory().get_builder(self)
+        self.notification_channel_id = None
+        self.notification_id = None
+        self.on_board = False
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.member_ids = dict.fromkeys(voice_channel.voice_states)
+        self._member_mentions: str | None = None
+        self.static_parts = None
+        self.embed_builder = builder_factory.get_builder(author)
+
+    @property
+    def request_id(self) -> int:
+        """Tell this request apart from the other requests of its author.
+
+        It is the creation time of the request, in milliseconds, which is persisted
+        with the request.
+        """
+        return round(self.created_at.timestamp() * 1000)
+
+    @property
+    def guild(self) -> discord.Guild:
+        """The guild of the request, from the client cache.
+
+        The client replaces its guilds after a non-resumable reconnection, so the guild
+        is looked up again on each access.
+        """
+        guild = self.client.get_guild(self.guild_id)
+        if guild is None:
+            raise LookupError(f"Request guild {self.guild_id} is not cached.")
+        return guild
+
+    @property
+    def author(self) -> discord.Member:
+        """The author of the request, from the member cache."""
+        member = self.guild.get_member(self.author_id)
+        if member is None:
+            raise LookupError(f"Request author {self.author_id} is not cached.")
+        return member
+
+    @property
+    def voice_channel(self) -> discord.VoiceChannel:
+        """The voice channel of the request, from the channel cache."""
+        channel = self.guild.get_channel(self.voice_channel_id)
+        if channel is None:
+            raise LookupError(f"Request channel {self.voice_channel_id} is not cached.")
+        return channel  # type: ignore
+
+    @property
+    def notification(self) -> discord.PartialMessage | None:
+        """The notification message sent to the LFG channel.
+
+        Setting a message only keeps its IDs, the message is returned as a partial
+        message.
+        """
+        if self.notification_id is None or self.notification_channel_id is None:
+            return None
+        guild = self.client.get_guild(self.guild_id)
+        if guild is None:
+            return None
+        channel = guild.get_channel_or_thread(self.notification_channel_id)
+        if channel is None:
+            return None
+        return channel.get_partial_message(self.notification_id)  # type: ignore
+
+    @notification.setter
+    def notification(
+        self, message: discord.Message | discord.PartialMessage | None
+    ) -> None:
+        if message is None:
+            self.notification_channel_id = self.notification_id = None
+        else:
+            self.notification_channel_id = message.channel.id
+            self.notification_id = message.id
+
+    def invalidate_static_parts(self) -> None:
+        """Drop the cached static parts of the embed after the author or the guild's
+        runner or playstyle roles were updated."""
+        self.static_parts = None
+
+    def member_joined(self, member_id: int) -> None:
+        """Add a member to the voice channel members of the request."""
+        if member_id not in self.member_ids:
+            self.member_ids[member_id] = None
+            self._member_mentions = None
+
+    def member_left(self, member_id: int) -> None:
+        """Remove a member from the voice channel members of the request."""
+        if member_id in self.member_ids:
+            del self.member_ids[member_id]
+            self._member_mentions = None
+
+    def sync_members(self, member_ids: typing.Iterable[int]) -> None:
+        """Replace the voice channel members, after voice events were missed.
+
+        Parameters
+        ----------
+        member_ids : typing.Iterable[int]
+            The IDs of the members in the voice channel.
+        """
+        self.member_ids = dict.fromkeys(member_ids)
+        self._member_mentions = None
+
+    @property
+    def member_mentions(self) -> str:
+        """The mentions of the voice channel members, one per line.
+
+        Only rebuilt after the members changed.
+        """
+        if self._member_mentions is None:
+            self._member_mentions = "\n".join(
+                f"<@{member_id}>" for member_id in self.member_ids
+            )
+        return self._member_mentions
 
     @property
     def remaining_places(self) -> int:
-        return self.looking_for - len(self.voice_channel.members) + 1
+        return self.looking_for - len(self.member_ids) + 1
+
+    @property
+    def remaining_room(self) -> int | None:
+        """The places left in the voice channel, or None if it has no user limit."""
+        user_limit = self.voice_channel.user_limit
+        if user_limit == 0:
+            return None
+        return user_limit - len(self.member_ids)
 
 
 class Request:
+    __slots__ = ("ctx",)
+
     def __init__(
         self,
+        client: discord.Client,
         author: discord.Member,
         voice_channel: "discord.guild.VocalGuildChannel",
         looking_for: int,
     ):
-        self.ctx = RequestContext(author, voice_channel, looking_for)
+        self.ctx = RequestContext(client, author, voice_channel, looking_for)
 
     def make_embed(self):
-        return self.ctx.embed_builder.build(self.ctx)
+        with metrics.timer("embed_build"):
+            return self.ctx.embed_builder.build(self.ctx)
 
 
 class RequestCollection:
-    current_requests: dict[int, dict[int, Request]]
-    """Contains the list of current LFG requests by guild_id and user_id."""
     current_lfgs: dict["types.GuildID", dict["types.UserID", Request]]
+    """Contains the list of current LFG requests by guild_id and user_id."""
+
+    requests_by_voice_channel: dict[tuple["types.GuildID", "types.ChannelID"], Request]
+    """Secondary index of the current requests by guild_id and voice channel ID."""
+
+    voice_channel_by_author: dict[
+        tuple["types.GuildID", "types.UserID"], "types.ChannelID"
+    ]
+    """Reverse index giving the voice channel ID a request author is indexed under."""
+
+    registry: RequestRegistry
+    """The claims on the request authors, shared with the other processes."""
 
-    def __init__(self):
+    def __init__(self, registry: RequestRegistry | None = None):
         self.current_lfgs = {}
+        self.requests_by_voice_channel = {}
+        self.voice_channel_by_author = {}
+        self.registry = registry or LocalRequestRegistry()
 
     def push_request(
-        self, guild_id: "types.GuildID", user_id: "types.UserID", request: Request
-    ) -> None:
+        self,
+        guild_id: "types.GuildID",
+        user_id: "types.UserID",
+        request: Request,
+        ttl: float,
+    ) -> bool:
+        """Add a request, unless its author already has one in any process.
+
+        The check and the claim are atomic, so concurrent commands of the same author
+        cannot both add a request.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild where the request is located.
+        user_id : types.UserID
+            The ID of the request's author.
+        request : Request
+            The request to add.
+        ttl : float
+            Lifetime of the request, in seconds, after which its claim is dropped.
+
+        Returns
+        -------
+        bool
+            If the request was added.
+
+        Raises
+        ------
+        RegistryError
+            The shared registry could not be reached, the request was not added.
+        """
+        if self.has_request(guild_id, user_id):
+            return False
+        voice_channel_id = request.ctx.voice_channel_id
+        if not self.registry.claim(
+            guild_id,
+            user_id,
+            voice_channel_id,
+            request.ctx.created_at.timestamp() + ttl,
+        ):
+            return False
+
         guild_requests = self.current_lfgs.get(guild_id)
         if guild_requests is None:
             guild_requests = {}
             self.current_lfgs[guild_id] = guild_requests
         guild_requests[user_id] = request
 
+        self.requests_by_voice_channel[(guild_id, voice_channel_id)] = request
+        self.voice_channel_by_author[(guild_id, user_id)] = voice_channel_id
+        return True
+
+    async def claim_request(
+        self,
+        guild_id: "types.GuildID",
+        user_id: "types.UserID",
+        request: Request,
+        ttl: float,
+    ) -> bool:
+        """Add a request like :meth:`push_request`, retrying while the registry is busy.
+
+        The registry never waits for other processes on the event loop, the claim is
+        retried after each of :data:`~lfg.claims.CLAIM_RETRY_DELAYS` instead.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild where the request is located.
+        user_id : types.UserID
+            The ID of the request's author.
+        request : Request
+            The request to add.
+        ttl : float
+            Lifetime of the request, in seconds, after which its claim is dropped.
+
+        Returns
+        -------
+        bool
+            If the request was added.
+
+        Raises
+        ------
+        RegistryError
+            The shared registry could not be reached, or stayed busy, the request was
+            not added.
+        """
+        for delay in CLAIM_RETRY_DELAYS:
+            try:
+                return self.push_request(guild_id, user_id, request, ttl)
+            except RegistryBusy:
+                metrics.increment("registry_busy")
+                await asyncio.sleep(delay)
+        return self.push_request(guild_id, user_id, request, ttl)
+
     def has_request(self, guild_id: "types.GuildID", user_id: "types.UserID") -> bool:
         guild_requests = self.current_lfgs.get(guild_id)
         return guild_requests is not None and guild_requests.get(user_id) is not None
 
+    def is_claimed(self, guild_id: "types.GuildID", user_id: "types.UserID") -> bool:
+        """Check if an author has a request, in this process or in another one.
+
+        :meth:`has_request` only checks the requests of this process, which are the
+        only ones its event handlers can act on.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild to check.
+        user_id : types.UserID
+            The ID of the author to check.
+
+        Returns
+        -------
+        bool
+            If the author has a live request.
+        """
+        return self.has_request(guild_id, user_id) or self.registry.is_claimed(
+            guild_id, user_id
+        )
+
+    def has_guild_requests(self, guild_id: "types.GuildID") -> bool:
+        """Check if a guild has at least one live request.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild to check.
+
+        Returns
+        -------
+        bool
+            If the guild has at least one live request.
+        """
+        return bool(self.current_lfgs.get(guild_id))
+
     def get_request(
         self, guild_id: "types.GuildID", user_id: "types.UserID"
     ) -> typing.Optional[Request]:
@@ -356,7 +727,7 @@ class RequestCollection:
         return guild_requests.get(user_id)
 
     def get_request_by_voice_channel_id(
-        self, guild_id: "types.GuildID", voice_channel_id: int
+        self, guild_id: "types.GuildID", voice_channel_id: "types.ChannelID"
     ) -> typing.Optional[Request]:
         """Get a request by its voice channel ID.
 
@@ -364,7 +735,7 @@ class RequestCollection:
         ----------
         guild_id : types.GuildID
             The ID of the guild where the request is located.
-        voice_channel : int
+        voice_channel : types.ChannelID
             The ID of the voice channel where the request is located.
 
         Returns
@@ -372,13 +743,7 @@ class RequestCollection:
         typing.Optional[Request]
             The request object if found, otherwise None.
         """
-        guild_requests = self.current_lfgs.get(guild_id)
-        if guild_requests is None:
-            return None
-        for request in guild_requests.values():
-            if request.ctx.voice_channel.id == voice_channel_id:
-                return request
-        return None
+        return self.requests_by_voice_channel.get((guild_id, voice_channel_id))
 
     def pop_request(
         self, guild_id: "types.GuildID", user_id: "types.UserID"
@@ -386,4 +751,18 @@ class RequestCollection:
         guild_requests = self.current_lfgs.get(guild_id)
         if guild_requests is None:
             return None
-        return guild_requests.pop(user_id, None)
+        request = guild_requests.pop(user_id, None)
+        if not guild_requests:
+            del self.current_lfgs[guild_id]
+
+        voice_channel_id = self.voice_channel_by_author.pop((guild_id, user_id), None)
+        if voice_channel_id is not None:
+            key = (guild_id, voice_channel_id)
+            # Only drop the voice index if it still points to this request.
+            if self.requests_by_voice_channel.get(key) is request:
+                del self.requests_by_voice_channel[key]
+
+        # Released last, the local indexes must be clean even if it fails.
+        if request is not None:
+            self.registry.release(guild_id, user_id)
+        return request
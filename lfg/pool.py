@@ -0,0 +1,356 @@
+import asyncio
+import math
+import typing
+
+import discord
+
+from .metrics import metrics
+from .rest import Priority, guild_route
+from .utils import BackgroundService, is_lfg_voice_channel, log
+
+if typing.TYPE_CHECKING:
+    from . import types
+    from .main import LFG
+    from .settings import GuildSettings
+
+
+DEFAULT_POOL_INTERVAL = 30.0
+"""Default time, in seconds, between two resizings of the pools."""
+
+DEMAND_SMOOTHING = 0.3
+"""Weight of the last interval in the moving average of the demand."""
+
+MOVE_TIMEOUT = 5.0
+"""Time, in seconds, to wait for the gateway to confirm a member was moved."""
+
+SQUAD_NAMES = {2: "Duo squad", 3: "Trio squad"}
+"""Name of the pooled channels, by user limit."""
+
+PoolKey: typing.TypeAlias = tuple["types.GuildID", int]
+
+
+class VoiceChannelPool(BackgroundService):
+    """Keep warm, empty LFG voice channels ready for new requests.
+
+    Each guild has one pool of idle channels per squad size (the channel's user limit).
+    Creating a request from outside the LFG category moves the author to an idle
+    channel of the right size instead of waiting on a channel creation. Channels go
+    back to the pool when they are empty again.
+
+    The demand for each pool is tracked with a moving average of the channels taken
+    every ``interval`` seconds. The pool is then grown or shrunk towards that demand,
+    but never below the guild's low watermark nor above its high watermark.
+    """
+
+    interval: float
+    """Time, in seconds, between two resizings of the pools."""
+
+    def __init__(self, cog: "LFG", interval: float = DEFAULT_POOL_INTERVAL) -> None:
+        self.cog = cog
+        self.interval = interval
+        self._owned: dict["types.GuildID", set["types.ChannelID"]] = {}
+        self._idle: dict[PoolKey, dict["types.ChannelID", None]] = {}
+        self._taken: dict[PoolKey, int] = {}
+        self._demand: dict[PoolKey, float] = {}
+
+    async def load(self, all_guilds: dict[int, dict] | None = None) -> None:
+        """Load the pooled channels of every guild from Config.
+
+        Parameters
+        ----------
+        all_guilds : dict[int, dict] | None
+            The guild data already read from Config, to avoid reading it again.
+        """
+        if all_guilds is None:
+            all_guilds = await self.cog.config.all_guilds()
+        for guild_id, data in all_guilds.items():
+            if data["pool_channel_ids"]:
+                self._owned[guild_id] = set(data["pool_channel_ids"])
+
+    def owns(self, guild_id: "types.GuildID", channel_id: "types.ChannelID") -> bool:
+        """Check if a channel belongs to the pool of a guild."""
+        owned = self._owned.get(guild_id)
+        return owned is not None and channel_id in owned
+
+    def idle_count(self, guild_id: "types.GuildID", size: int) -> int:
+        """Return the number of idle channels of a pool."""
+        return len(self._idle.get((guild_id, size), ()))
+
+    def acquire(
+        self, guild: discord.Guild, size: int
+    ) -> typing.Optional[discord.VoiceChannel]:
+        """Take an idle channel out of a pool.
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The guild.
+        size : int
+            The user limit of the channel.
+
+        Returns
+        -------
+        typing.Optional[discord.VoiceChannel]
+            An empty channel, or None if the pool is empty.
+        """
+        key = (guild.id, size)
+        self._taken[key] = self._taken.get(key, 0) + 1
+        idle = self._idle.get(key)
+        while idle:
+            channel_id = next(iter(idle))
+            del idle[channel_id]
+            channel = guild.get_channel(channel_id)
+            if not isinstance(channel, discord.VoiceChannel):
+                self._owned.get(guild.id, set()).discard(channel_id)
+                continue
+            if channel.voice_states:
+                # Someone joined it by hand, it comes back once empty.
+                continue
+            metrics.increment("pool_hits")
+            return channel
+        metrics.increment("pool_misses")
+        return None
+
+    async def take(
+        self, guild: discord.Guild, size: int, settings: "GuildSettings"
+    ) -> typing.Optional[discord.VoiceChannel]:
+        """Take an idle channel out of a pool, or create one if the pool is empty.
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The guild.
+        size : int
+            The user limit of the channel.
+        settings : GuildSettings
+            The guild settings.
+
+        Returns
+        -------
+        typing.Optional[discord.VoiceChannel]
+            An empty channel, or None if it could not be created.
+        """
+        channel = self.acquire(guild, size)
+        if channel is None:
+            channel = await self._create(guild, size, settings)
+        return channel
+
+    def needs_provision(
+        self, member: discord.Member, size: int, settings: "GuildSettings"
+    ) -> bool:
+        """Check if a member creating a request would be moved to a pooled channel.
+
+        Parameters
+        ----------
+        member : discord.Member
+            The member creating a request.
+        size : int
+            The user limit of the channel.
+        settings : GuildSettings
+            The guild settings.
+
+        Returns
+        -------
+        bool
+            If the pool is enabled and the member is in voice outside LFG.
+        """
+        if not settings.pool_enabled or size not in SQUAD_NAMES:
+            return False
+        voice = member.voice
+        return (
+            voice is not None
+            and voice.channel is not None
+            and not is_lfg_voice_channel(voice.channel, settings.category_id)
+        )
+
+    async def provision(
+        self, member: discord.Member, size: int, settings: "GuildSettings"
+    ) -> None:
+        """Move a member to a pooled channel, if they are in voice outside LFG.
+
+        The channel goes back to the pool if the member could not be moved to it.
+
+        Parameters
+        ----------
+        member : discord.Member
+            The member creating a request.
+        size : int
+            The user limit of the channel.
+        settings : GuildSettings
+            The guild settings.
+        """
+        if not self.needs_provision(member, size, settings):
+            return
+
+        channel = await self.take(member.guild, size, settings)
+        if channel is None:
+            return
+
+        moved = asyncio.ensure_future(
+            self.cog.bot.wait_for(
+                "voice_state_update",
+                check=lambda m, _, after: m.id == member.id
+                and after.channel is not None
+                and after.channel.id == channel.id,
+                timeout=MOVE_TIMEOUT,
+            )
+        )
+        try:
+            await self.cog.rest.submit(
+                Priority.POST,
+                guild_route(member.guild.id),
+                lambda: member.move_to(channel, reason="New LFG request"),
+                metric="rest_move",
+            )
+        except discord.HTTPException:
+            log.exception("Could not move %s to a pooled channel.", member.id)
+            moved.cancel()
+            self._idle.setdefault((member.guild.id, size), {})[channel.id] = None
+            return
+        # The checks read the member's voice state, wait for the gateway to update it.
+        try:
+            await moved
+        except asyncio.TimeoutError:
+            log.warning(
+                "%s was not seen joining pooled channel %s.", member.id, channel.id
+            )
+            # Left voice in the meantime, nobody will leave the channel to recycle it.
+            await self.recycle(channel)
+
+    async def recycle(self, channel: "discord.guild.VocalGuildChannel") -> None:
+        """Put a pooled channel back in its pool once it is empty.
+
+        Parameters
+        ----------
+        channel : discord.guild.VocalGuildChannel
+            A channel someone just left.
+        """
+        guild_id = channel.guild.id
+        if not self.owns(guild_id, channel.id) or channel.voice_states:
+            return
+        settings = self.cog.settings.get(guild_id)
+        key = (guild_id, channel.user_limit)
+        idle = self._idle.setdefault(key, {})
+        if channel.id in idle:
+            return
+        if settings.pool_enabled and len(idle) < settings.pool_high_watermark:
+            idle[channel.id] = None
+            return
+        await self._delete(channel)
+
+    async def _create(
+        self, guild: discord.Guild, size: int, settings: "GuildSettings"
+    ) -> typing.Optional[discord.VoiceChannel]:
+        category = (
+            guild.get_channel(settings.category_id) if settings.category_id else None
+        )
+        if not isinstance(category, discord.CategoryChannel):
+            log.error("Couldn't find the LFG category of guild %s.", guild.id)
+            return None
+        try:
+            channel = await self.cog.rest.submit(
+                Priority.POST,
+                guild_route(guild.id),
+                lambda: category.create_voice_channel(
+                    SQUAD_NAMES[size], user_limit=size, reason="LFG channel pool"
+                ),
+                metric="rest_create",
+            )
+        except discord.HTTPException:
+            log.exception("Could not create a pooled channel in guild %s.", guild.id)
+            return None
+        self._owned.setdefault(guild.id, set()).add(channel.id)
+        await self._save(guild.id)
+        return channel
+
+    async def _delete(self, channel: "discord.guild.VocalGuildChannel") -> None:
+        guild_id = channel.guild.id
+        self._idle.get((guild_id, channel.user_limit), {}).pop(channel.id, None)
+        self._owned.get(guild_id, set()).discard(channel.id)
+        try:
+            await self.cog.rest.submit(
+                Priority.UPDATE,
+                guild_route(guild_id),
+                lambda: channel.delete(reason="LFG channel pool"),
+                metric="rest_delete",
+            )
+        except discord.NotFound:
+            pass
+        except discord.HTTPException:
+            log.exception("Could not delete pooled channel %s.", channel.id)
+        await self._save(guild_id)
+
+    async def _save(self, guild_id: "types.GuildID") -> None:
+        await self.cog.config.guild_from_id(guild_id).pool_channel_ids.set(
+            sorted(self._owned.get(guild_id, ()))
+        )
+
+    def _sync(self, guild: discord.Guild) -> None:
+        """Drop the deleted channels and put the empty ones back, after a restart."""
+        owned = self._owned.get(guild.id)
+        if not owned:
+            return
+        for channel_id in list(owned):
+            channel = guild.get_channel(channel_id)
+            if not isinstance(channel, discord.VoiceChannel):
+                owned.discard(channel_id)
+                continue
+            if not channel.voice_states:
+                self._idle.setdefault((guild.id, channel.user_limit), {})[
+                    channel_id
+                ] = None
+
+    async def resize(self, guild: discord.Guild) -> None:
+        """Grow or shrink the pools of a guild towards their demand.
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The guild.
+        """
+        settings = self.cog.settings.get(guild.id)
+        for size in SQUAD_NAMES:
+            key = (guild.id, size)
+            demand = self._demand[key] = DEMAND_SMOOTHING * self._taken.pop(key, 0) + (
+                1 - DEMAND_SMOOTHING
+            ) * self._demand.get(key, 0.0)
+            if settings.pool_enabled:
+                target = min(
+                    max(math.ceil(demand), settings.pool_low_watermark),
+                    settings.pool_high_watermark,
+                )
+            else:
+                target = 0
+
+            idle = self._idle.setdefault(key, {})
+            for _ in range(target - len(idle)):
+                channel = await self._create(guild, size, settings)
+                if channel is None:
+                    break
+                idle[channel.id] = None
+            if len(idle) > target:
+                # Shrink one channel at a time, demand often comes back.
+                channel_id = next(iter(idle))
+                channel = guild.get_channel(channel_id)
+                if isinstance(channel, discord.VoiceChannel):
+                    await self._delete(channel)
+                else:
+                    del idle[channel_id]
+                    self._owned.get(guild.id, set()).discard(channel_id)
+
+    async def _run(self) -> None:
+        await self.cog.bot.wait_until_red_ready()
+        for guild in self.cog.bot.guilds:
+            self._sync(guild)
+        while True:
+            for guild in self.cog.bot.guilds:
+                if (
+                    not self._owned.get(guild.id)
+                    and not self.cog.settings.get(guild.id).pool_enabled
+                ):
+                    continue
+                try:
+                    await self.resize(guild)
+                except Exception:
+                    log.exception("Error while resizing the LFG pool of %s.", guild.id)
+            await asyncio.sleep(self.interval)
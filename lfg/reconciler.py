@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+import typing
+
+from .utils import BackgroundService, log
+
+if typing.TYPE_CHECKING:
+    from .main import LFG
+    from .objects import Request
+
+
+DEFAULT_RECONCILE_INTERVAL = 60.0
+"""Default time, in seconds, between two reconciliation passes."""
+
+DEFAULT_TIME_SLICE = 0.002
+"""Default time, in seconds, a pass may run before yielding to the event loop."""
+
+
+class ReconciliationReport(typing.NamedTuple):
+    checked: int
+    """Number of requests checked."""
+
+    completed: int
+    """Number of requests completed because their author left the voice channel."""
+
+    refreshed: int
+    """Number of requests whose embed was out of date."""
+
+    withdrawn: int
+    """Number of requests withdrawn because their voice channel no longer exists."""
+
+    duration: float
+    """Total duration of the pass, in seconds."""
+
+    longest_slice: float
+    """Longest time, in seconds, the pass held the event loop."""
+
+    @property
+    def repairs(self) -> int:
+        return self.completed + self.refreshed + self.withdrawn
+
+
+class VoiceReconciler(BackgroundService):
+    """Periodically diff the live requests against the gateway voice cache.
+
+    Voice events missed during a reconnect leave requests behind whose author left, or
+    whose embed shows outdated members. A pass checks every live request against its
+    channel's voice states, then completes or refreshes the stale ones through the cog.
+    Requests whose voice channel can no longer be found are withdrawn.
+    The pass yields to the event loop every ``time_slice`` seconds, so it never blocks
+    other events for long, even with thousands of requests.
+    """
+
+    interval: float
+    """Time, in seconds, between two passes."""
+
+    time_slice: float
+    """Time, in seconds, a pass may run before yielding to the event loop."""
+
+    last_report: ReconciliationReport | None
+    """The report of the last pass."""
+
+    def __init__(
+        self,
+        cog: "LFG",
+        interval: float = DEFAULT_RECONCILE_INTERVAL,
+        time_slice: float = DEFAULT_TIME_SLICE,
+    ) -> None:
+        self.cog = cog
+        self.interval = interval
+        self.time_slice = time_slice
+        self.last_report = None
+
+    def _is_stale(self, request: "Request") -> tuple[bool, bool]:
+        """Return if a request must be completed, and if its embed must be refreshed.
+
+        Members missed by the voice events are synced back into the request.
+        """
+        ctx = request.ctx
+        voice_states = ctx.voice_channel.voice_states
+        if ctx.author_id not in voice_states:
+            return True, False
+        if ctx.member_ids.keys() != voice_states.keys():
+            ctx.sync_members(voice_states)
+            return False, True
+        return False, False
+
+    async def run_pass(self) -> ReconciliationReport:
+        """Run a single reconciliation pass.
+
+        Returns
+        -------
+        ReconciliationReport
+            The timings and repairs of the pass.
+        """
+        requests = self.cog.requests
+        start = slice_start = time.perf_counter()
+        longest_slice = 0.0
+
+        snapshot = [
+            request
+            for guild_requests in requests.current_lfgs.values()
+            for request in guild_requests.values()
+        ]
+        to_complete: list["Request"] = []
+        to_refresh: list["Request"] = []
+        to_withdraw: list["Request"] = []
+        for request in snapshot:
+            # The request may have been removed while we yielded.
+            if (
+                requests.get_request(request.ctx.guild_id, request.ctx.author_id)
+                is not request
+            ):
+                continue
+            try:
+                complete, refresh = self._is_stale(request)
+            except LookupError:
+                # The voice channel was deleted, the request can't be checked anymore.
+                to_withdraw.append(request)
+                continue
+            if complete:
+                to_complete.append(request)
+            elif refresh:
+                to_refresh.append(request)
+
+            now = time.perf_counter()
+            if now - slice_start >= self.time_slice:
+                longest_slice = max(longest_slice, now - slice_start)
+                await asyncio.sleep(0)
+                slice_start = time.perf_counter()
+        longest_slice = max(longest_slice, time.perf_counter() - slice_start)
+
+        # Repairs go through the channel queues, so they can't race with live events.
+        dispatcher = self.cog.dispatcher
+        for request in to_refresh:
+            # The members were synced, so the fill changed.
+            await dispatcher.dispatch(
+                self.cog.dispatch_key(request),
+                self.cog.update_request_embed,
+                request,
+                True,
+            )
+        await asyncio.gather(
+            *(
+                dispatcher.submit(
+                    self.cog.dispatch_key(request), self.cog.complete_request, request
+                )
+                for request in to_complete
+            ),
+            *(
+                dispatcher.submit(
+                    self.cog.dispatch_key(request), self.cog.withdraw_request, request
+                )
+                for request in to_withdraw
+            ),
+            return_exceptions=True,
+        )
+
+        report = ReconciliationReport(
+            checked=len(snapshot),
+            completed=len(to_complete),
+            refreshed=len(to_refresh),
+            withdrawn=len(to_withdraw),
+            duration=time.perf_counter() - start,
+            longest_slice=longest_slice,
+        )
+        self.last_report = report
+        log.log(
+            logging.INFO if report.repairs else logging.DEBUG,
+            "Reconciled %s LFG request(s) in %.2fms (longest slice %.2fms): "
+            "%s completed, %s refreshed, %s withdrawn.",
+            report.checked,
+            report.duration * 1000,
+            report.longest_slice * 1000,
+            report.completed,
+            report.refreshed,
+            report.withdrawn,
+        )
+        return report
+
+    async def _run(self) -> None:
+        await self.cog.bot.wait_until_red_ready()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_pass()
+            except Exception:
+                log.exception("LFG reconciliation pass failed.")
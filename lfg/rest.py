@@ -0,0 +1,341 @@
+import asyncio
+import contextlib
+import enum
+import heapq
+import itertools
+import random
+import typing
+
+import discord
+
+from .metrics import metrics
+from .utils import log
+
+if typing.TYPE_CHECKING:
+    from . import types
+
+
+DEFAULT_ROUTE_RATE = 1.0
+"""Default number of calls per second allowed on a route, on average."""
+
+DEFAULT_ROUTE_BURST = 5
+"""Default number of calls a route allows in a burst. Discord allows 5 messages per
+5 seconds in a channel."""
+
+DEFAULT_CONCURRENCY = 4
+"""Default number of calls running at the same time, on different routes."""
+
+DEFAULT_MAX_RETRIES = 3
+"""Default number of retries of a call failing with a Discord server error."""
+
+RETRY_BASE_DELAY = 1.0
+"""Delay, in seconds, before the first retry. It doubles with each retry."""
+
+Route: typing.TypeAlias = tuple[str, int]
+"""The rate limit bucket of a call: a kind of resource and its ID."""
+
+T = typing.TypeVar("T")
+
+
+class Priority(enum.IntEnum):
+    """The order calls are sent in, lowest first."""
+
+    COMPLETION = 0
+    """Final edits and deletions, which must land before the request is forgotten."""
+
+    POST = 1
+    """New messages, which the author waits for."""
+
+    UPDATE = 2
+    """Cosmetic edits, which can be delayed and superseded."""
+
+
+class Superseded(Exception):
+    """A pending call was replaced by a newer one with the same key."""
+
+
+def channel_route(channel_id: "types.ChannelID") -> Route:
+    """Return the route of the message calls in a channel."""
+    return ("channel", channel_id)
+
+
+def guild_route(guild_id: "types.GuildID") -> Route:
+    """Return the route of the guild-wide calls, such as moving members."""
+    return ("guild", guild_id)
+
+
+class _Job:
+    __slots__ = ("priority", "seq", "route", "call", "key", "metric", "future", "tries")
+
+    def __init__(
+        self,
+        priority: Priority,
+        seq: int,
+        route: Route,
+        call: typing.Callable[[], typing.Awaitable[typing.Any]],
+        key: typing.Hashable | None,
+        metric: str | None,
+        future: "asyncio.Future[typing.Any]",
+    ) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.route = route
+        self.call = call
+        self.key = key
+        self.metric = metric
+        self.future = future
+        self.tries = 0
+
+    def __lt__(self, other: "_Job") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _RouteBucket:
+    __slots__ = ("jobs", "tokens", "updated_at", "timer")
+
+    def __init__(self, burst: float, now: float) -> None:
+        self.jobs: list[_Job] = []
+        self.tokens = burst
+        self.updated_at = now
+        self.timer: asyncio.TimerHandle | None = None
+
+
+class RestDispatcher:
+    """Send the Discord REST calls of the cog by priority, within a budget per route.
+
+    Each route (a channel or a guild) has a token bucket, so a busy channel is
+    throttled before Discord rate limits it, without delaying the other channels.
+    Within a route, completions go first, then new posts, then cosmetic updates.
+    A call with a key supersedes the pending cosmetic update with the same key, which
+    is dropped without being sent. Calls failing with a Discord server error are
+    retried with an exponential, jittered delay.
+    """
+
+    rate: float
+    """Number of calls per second allowed on a route, on average."""
+
+    burst: float
+    """Number of calls a route allows in a burst."""
+
+    max_retries: int
+    """Number of retries of a call failing with a Discord server error."""
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_ROUTE_RATE,
+        burst: float = DEFAULT_ROUTE_BURST,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+    ) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self._routes: dict[Route, _RouteBucket] = {}
+        # Routes with a job ready to run, by priority of their first job. Entries are
+        # not removed when a route changes, they are checked when popped.
+        self._ready: list[tuple[Priority, int, Route]] = []
+        self._updates: dict[typing.Hashable, _Job] = {}
+        self._retrying: set[_Job] = set()
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._workers: list[asyncio.Task[None]] = []
+
+    def __len__(self) -> int:
+        return sum(len(bucket.jobs) for bucket in self._routes.values()) + len(
+            self._retrying
+        )
+
+    async def submit(
+        self,
+        priority: Priority,
+        route: Route,
+        call: typing.Callable[[], typing.Awaitable[T]],
+        *,
+        key: typing.Hashable | None = None,
+        metric: str | None = None,
+    ) -> T:
+        """Queue a REST call and wait for its result.
+
+        Parameters
+        ----------
+        priority : Priority
+            The priority of the call.
+        route : Route
+            The rate limit bucket of the call.
+        call : typing.Callable[[], typing.Awaitable[T]]
+            Make the call. It is called again on each retry.
+        key : typing.Hashable | None
+            What the call updates. A new call with the same key supersedes the pending
+            update of that key.
+        metric : str | None
+            The timer the duration of the call is recorded under.
+
+        Returns
+        -------
+        T
+            The call's result.
+
+        Raises
+        ------
+        Superseded
+            The update was replaced by a newer call before it was sent.
+        discord.HTTPException
+            The call failed.
+        """
+        if key is not None:
+            pending = self._updates.pop(key, None)
+            if pending is not None and not pending.future.done():
+                metrics.increment("rest_superseded")
+                pending.future.set_exception(Superseded())
+        job = _Job(
+            priority,
+            next(self._counter),
+            route,
+            call,
+            key,
+            metric,
+            asyncio.get_running_loop().create_future(),
+        )
+        if key is not None and priority is Priority.UPDATE:
+            self._updates[key] = job
+        self._push(job)
+        return await job.future
+
+    def _push(self, job: _Job) -> None:
+        bucket = self._routes.get(job.route)
+        if bucket is None:
+            bucket = self._routes[job.route] = _RouteBucket(
+                self.burst, asyncio.get_running_loop().time()
+            )
+        heapq.heappush(bucket.jobs, job)
+        if bucket.timer is None:
+            heapq.heappush(self._ready, (job.priority, job.seq, job.route))
+            self._wakeup.set()
+
+    def _refill(self, bucket: _RouteBucket, now: float) -> None:
+        bucket.tokens = min(
+            self.burst, bucket.tokens + (now - bucket.updated_at) * self.rate
+        )
+        bucket.updated_at = now
+
+    def _discard_idle(self, route: Route, bucket: _RouteBucket) -> None:
+        # Keep the bucket until it is full again, or its budget would be reset.
+        self._refill(bucket, asyncio.get_running_loop().time())
+        if bucket.tokens >= self.burst:
+            del self._routes[route]
+
+    def _arm(self, route: Route) -> None:
+        bucket = self._routes.get(route)
+        if bucket is None:
+            return
+        bucket.timer = None
+        while bucket.jobs and bucket.jobs[0].future.done():
+            # Superseded or cancelled while waiting.
+            heapq.heappop(bucket.jobs)
+        if not bucket.jobs:
+            self._discard_idle(route, bucket)
+            return
+        job = bucket.jobs[0]
+        heapq.heappush(self._ready, (job.priority, job.seq, route))
+        self._wakeup.set()
+
+    def _take(self) -> _Job | None:
+        """Pop the most urgent job of a route with a token, if any."""
+        now = asyncio.get_running_loop().time()
+        while self._ready:
+            _, _, route = heapq.heappop(self._ready)
+            bucket = self._routes.get(route)
+            if bucket is None or bucket.timer is not None:
+                continue
+            while bucket.jobs and bucket.jobs[0].future.done():
+                heapq.heappop(bucket.jobs)
+            if not bucket.jobs:
+                self._discard_idle(route, bucket)
+                continue
+            self._refill(bucket, now)
+            if bucket.tokens < 1:
+                # Wait for the next token, the other routes go on.
+                bucket.timer = asyncio.get_running_loop().call_later(
+                    (1 - bucket.tokens) / self.rate, self._arm, route
+                )
+                continue
+            bucket.tokens -= 1
+            job = heapq.heappop(bucket.jobs)
+            if bucket.jobs:
+                heapq.heappush(
+                    self._ready, (bucket.jobs[0].priority, bucket.jobs[0].seq, route)
+                )
+            return job
+        return None
+
+    def _retry(self, job: _Job) -> None:
+        self._retrying.discard(job)
+        if not job.future.done():
+            self._push(job)
+
+    async def _run(self, job: _Job) -> None:
+        if self._updates.get(job.key) is job:
+            # It is being sent, newer calls no longer supersede it.
+            del self._updates[job.key]
+        job.tries += 1
+        try:
+            if job.metric is None:
+                result = await job.call()
+            else:
+                with metrics.timer(job.metric):
+                    result = await job.call()
+        except discord.DiscordServerError as e:
+            if job.tries > self.max_retries:
+                job.future.set_exception(e)
+                return
+            metrics.increment("rest_retries")
+            delay = RETRY_BASE_DELAY * 2 ** (job.tries - 1) * random.uniform(0.5, 1.5)
+            log.warning(
+                "Discord server error on %s, retrying in %.1fs.", job.route, delay
+            )
+            self._retrying.add(job)
+            asyncio.get_running_loop().call_later(delay, self._retry, job)
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+        else:
+            if not job.future.done():
+                job.future.set_result(result)
+
+    async def _work(self) -> None:
+        while True:
+            job = self._take()
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            if job.future.done():
+                continue
+            await self._run(job)
+
+    def start(self) -> None:
+        """Start the workers sending the calls."""
+        self._workers = [w for w in self._workers if not w.done()]
+        for _ in range(self.concurrency - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._work()))
+
+    async def stop(self) -> None:
+        """Stop the workers, cancelling the pending calls."""
+        for worker in self._workers:
+            worker.cancel()
+        for worker in self._workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await worker
+        self._workers.clear()
+        for bucket in self._routes.values():
+            if bucket.timer is not None:
+                bucket.timer.cancel()
+            for job in bucket.jobs:
+                job.future.cancel()
+        for job in self._retrying:
+            job.future.cancel()
+        self._retrying.clear()
+        self._routes.clear()
+        self._ready.clear()
+        self._updates.clear()
@@ -0,0 +1,180 @@
+import enum
+import typing
+
+if typing.TYPE_CHECKING:
+    import discord
+
+    from . import types
+
+
+class Roles(enum.Enum):
+    CYBERACME = 1367066118266556416
+    NUCALORIC = 1367066155591925810
+    TRAXUS = 1367066328057249833
+    SEKIGUCHI = 1367066427542077530
+    MIDA = 1367066480407216240
+
+
+RUNNER_ROLE_IDS = frozenset(
+    (
+        1365736777704276118,  # Locus
+        1365736778467901550,  # Glitch (my beloved)
+        1365736779134664704,  # Blackbird
+        1365736780078252257,  # Void, my second beloved
+    )
+)
+
+PLAYSTYLE_ROLE_IDS = frozenset(
+    (
+        1365736951323557980,  # PvP
+        1365736953676300388,  # PvE
+    )
+)
+
+ROLE_NAME_PREFIXES = ("RUNNER://", "FOCUS://")
+"""The cool-looking prefixes removed from the role names when displayed."""
+
+
+class MemberRoles(typing.NamedTuple):
+    runners: list["discord.Role"]
+    """The member's runner roles."""
+
+    playstyles: list["discord.Role"]
+    """The member's playstyle roles."""
+
+
+class RoleRegistry:
+    """Classify member roles and cache the roles' display names.
+
+    Runner and playstyle roles can be configured per guild with :meth:`configure`,
+    guilds that are not configured use the default roles. Display names are cached per
+    guild and must be invalidated when a role is updated or deleted.
+    """
+
+    runner_role_ids: frozenset[int]
+    """IDs of the default runner roles."""
+
+    playstyle_role_ids: frozenset[int]
+    """IDs of the default playstyle roles."""
+
+    def __init__(
+        self,
+        runner_role_ids: frozenset[int] = RUNNER_ROLE_IDS,
+        playstyle_role_ids: frozenset[int] = PLAYSTYLE_ROLE_IDS,
+    ) -> None:
+        self.runner_role_ids = runner_role_ids
+        self.playstyle_role_ids = playstyle_role_ids
+        self._guild_role_ids: dict[
+            "types.GuildID", tuple[frozenset[int], frozenset[int]]
+        ] = {}
+        self._names: dict["types.GuildID", dict[int, str]] = {}
+
+    def configure(
+        self,
+        guild_id: "types.GuildID",
+        runner_role_ids: frozenset[int],
+        playstyle_role_ids: frozenset[int],
+    ) -> None:
+        """Set the runner and playstyle roles of a guild.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild.
+        runner_role_ids : frozenset[int]
+            IDs of the guild's runner roles.
+        playstyle_role_ids : frozenset[int]
+            IDs of the guild's playstyle roles.
+        """
+        self._guild_role_ids[guild_id] = (runner_role_ids, playstyle_role_ids)
+
+    def classify(self, member: "discord.Member") -> MemberRoles:
+        """Sort the runner and playstyle roles of a member in a single pass.
+
+        Parameters
+        ----------
+        member : discord.Member
+            The member to classify.
+
+        Returns
+        -------
+        MemberRoles
+            The member's runner and playstyle roles.
+        """
+        runners: list["discord.Role"] = []
+        playstyles: list["discord.Role"] = []
+        runner_ids, playstyle_ids = self._guild_role_ids.get(
+            member.guild.id, (self.runner_role_ids, self.playstyle_role_ids)
+        )
+        for role in member.roles:
+            role_id = role.id
+            if role_id in runner_ids:
+                runners.append(role)
+            elif role_id in playstyle_ids:
+                playstyles.append(role)
+        return MemberRoles(runners, playstyles)
+
+    def display_name(self, role: "discord.Role") -> str:
+        """Return the name of a role without its cool-looking prefix.
+
+        Parameters
+        ----------
+        role : discord.Role
+            The role to get the name of.
+
+        Returns
+        -------
+        str
+            The role's display name.
+        """
+        guild_names = self._names.get(role.guild.id)
+        if guild_names is None:
+            guild_names = self._names[role.guild.id] = {}
+        name = guild_names.get(role.id)
+        if name is None:
+            name = role.name
+            for prefix in ROLE_NAME_PREFIXES:
+                name = name.removeprefix(prefix)
+            guild_names[role.id] = name
+        return name
+
+    def display_names(self, roles: "list[discord.Role]") -> list[str]:
+        """Return the names of roles without their cool-looking prefix.
+
+        Parameters
+        ----------
+        roles : list[discord.Role]
+            The roles to get the names of.
+
+        Returns
+        -------
+        list[str]
+            The roles' display names.
+        """
+        return [self.display_name(role) for role in roles]
+
+    def invalidate_role(self, role: "discord.Role") -> None:
+        """Drop the cached display name of a role.
+
+        Parameters
+        ----------
+        role : discord.Role
+            The updated or deleted role.
+        """
+        guild_names = self._names.get(role.guild.id)
+        if guild_names is not None:
+            guild_names.pop(role.id, None)
+
+    def invalidate_guild(self, guild_id: "types.GuildID") -> None:
+        """Drop every cached display name of a guild.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild.
+        """
+        self._names.pop(guild_id, None)
+
+
+registry = RoleRegistry()
+"""The role registry shared by the cog."""
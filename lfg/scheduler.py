@@ -0,0 +1,170 @@
+import asyncio
+import typing
+
+import discord
+
+from .metrics import metrics
+from .rest import Priority, Superseded, channel_route
+from .utils import log
+
+if typing.TYPE_CHECKING:
+    from discord.types.embed import Embed as EmbedData
+
+    from . import types
+    from .objects import Request
+    from .rest import RestDispatcher
+
+
+DEFAULT_EDIT_DELAY = 1.0
+"""Default time window, in seconds, during which embed updates are coalesced."""
+
+
+class EmbedEditScheduler:
+    """Coalesce bursts of embed updates into a single message edit per request.
+
+    The first update scheduled for a request starts a timer of ``delay`` seconds. Any
+    update scheduled while the timer is pending is merged into it, and the embed is
+    only rebuilt once the timer fires, so the edit always carries the latest state.
+    Edits are skipped entirely when the rebuilt embed is identical to the last one sent.
+    """
+
+    delay: float
+    """The time window, in seconds, during which updates are coalesced."""
+
+    def __init__(
+        self, rest: "RestDispatcher", delay: float = DEFAULT_EDIT_DELAY
+    ) -> None:
+        self.rest = rest
+        self.delay = delay
+        self._pending: dict[
+            tuple["types.GuildID", "types.UserID"], asyncio.Task[None]
+        ] = {}
+        # Built and waiting for the REST dispatcher, or being sent.
+        self._editing: set[tuple["types.GuildID", "types.UserID"]] = set()
+        # The HTTP call has started.
+        self._sending: set[tuple["types.GuildID", "types.UserID"]] = set()
+        self._stale: set[tuple["types.GuildID", "types.UserID"]] = set()
+        self._last_sent: dict[tuple["types.GuildID", "types.UserID"], "EmbedData"] = {}
+
+    @staticmethod
+    def _key(request: "Request") -> tuple["types.GuildID", "types.UserID"]:
+        return (request.ctx.guild_id, request.ctx.author_id)
+
+    def record_sent(self, request: "Request", embed: "discord.Embed") -> None:
+        """Remember the embed that has been sent for a request.
+
+        Parameters
+        ----------
+        request : Request
+            The request the embed was sent for.
+        embed : discord.Embed
+            The embed that was sent.
+        """
+        self._last_sent[self._key(request)] = embed.to_dict()
+
+    def schedule(self, request: "Request") -> None:
+        """Schedule an embed update for a request.
+
+        Parameters
+        ----------
+        request : Request
+            The request to update.
+        """
+        key = self._key(request)
+        if key in self._editing:
+            # The embed being sent was built before this update, send another one after.
+            self._stale.add(key)
+            return
+        if key in self._pending:
+            return
+        self._pending[key] = asyncio.create_task(self._run(key, request))
+
+    async def cancel(self, request: "Request") -> None:
+        """Cancel any pending update for a request and forget its last embed.
+
+        An edit still waiting in the REST dispatcher is dropped. If it is already being
+        sent to Discord, wait for it to finish instead, so that a following edit (e.g.
+        completion) always lands last.
+
+        Parameters
+        ----------
+        request : Request
+            The request to cancel updates for.
+        """
+        key = self._key(request)
+        task = self._pending.pop(key, None)
+        if task is not None and not task.done():
+            if key not in self._sending:
+                task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._stale.discard(key)
+        self._last_sent.pop(key, None)
+
+    def cancel_all(self) -> None:
+        """Cancel every pending update. Used when the cog is unloaded."""
+        for task in self._pending.values():
+            task.cancel()
+        self._pending.clear()
+        self._editing.clear()
+        self._sending.clear()
+        self._stale.clear()
+        self._last_sent.clear()
+
+    async def _run(
+        self, key: tuple["types.GuildID", "types.UserID"], request: "Request"
+    ) -> None:
+        await asyncio.sleep(self.delay)
+        try:
+            await self._edit(key, request)
+        finally:
+            if self._pending.get(key) is asyncio.current_task():
+                del self._pending[key]
+                if key in self._stale:
+                    self._stale.discard(key)
+                    self.schedule(request)
+
+    async def _edit(
+        self, key: tuple["types.GuildID", "types.UserID"], request: "Request"
+    ) -> None:
+        message = request.ctx.notification
+        if message is None:
+            return
+
+        try:
+            embed = request.make_embed()
+        except LookupError:
+            # The author or the channel is gone, the request is being withdrawn.
+            log.debug("Request can't be rendered anymore, skipping edit.")
+            return
+        payload = embed.to_dict()
+        if self._last_sent.get(key) == payload:
+            log.debug("Embed unchanged, skipping edit.")
+            metrics.increment("edits_skipped")
+            return
+
+        async def send() -> discord.Message:
+            self._sending.add(key)
+            try:
+                return await message.edit(embed=embed)
+            finally:
+                self._sending.discard(key)
+
+        self._editing.add(key)
+        try:
+            await self.rest.submit(
+                Priority.UPDATE,
+                channel_route(message.channel.id),
+                send,
+                key=message.id,
+                metric="rest_edit",
+            )
+            self._last_sent[key] = payload
+        except Superseded:
+            pass
+        except discord.HTTPException:
+            log.exception("Could not edit LFG request message.")
+        finally:
+            self._editing.discard(key)
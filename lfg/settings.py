@@ -0,0 +1,158 @@
+import typing
+
+from .expiry import DEFAULT_REQUEST_TTL
+from .roles import PLAYSTYLE_ROLE_IDS, RUNNER_ROLE_IDS, registry
+
+if typing.TYPE_CHECKING:
+    from redbot.core.config import Config
+
+    from . import types
+
+
+class GuildSettings(typing.NamedTuple):
+    """The LFG settings of a guild."""
+
+    category_id: int | None
+    """The category containing the LFG voice channels."""
+
+    lfg_channel_id: int | None
+    """The channel the LFG requests are posted in."""
+
+    runner_role_ids: frozenset[int]
+    """IDs of the runner roles."""
+
+    playstyle_role_ids: frozenset[int]
+    """IDs of the playstyle roles."""
+
+    request_ttl: int
+    """Lifetime of a request before it expires, in seconds."""
+
+    board_mode: bool
+    """If new requests are listed on a shared board instead of their own message."""
+
+    pool_enabled: bool
+    """If warm voice channels are kept ready for new requests."""
+
+    pool_low_watermark: int
+    """Minimum number of idle channels kept ready for each squad size."""
+
+    pool_high_watermark: int
+    """Maximum number of idle channels kept ready for each squad size."""
+
+    def to_config(self) -> dict[str, typing.Any]:
+        """Convert the settings to the format stored in Config."""
+        return {
+            "category_id": self.category_id,
+            "lfg_channel_id": self.lfg_channel_id,
+            "runner_role_ids": sorted(self.runner_role_ids),
+            "playstyle_role_ids": sorted(self.playstyle_role_ids),
+            "request_ttl": self.request_ttl,
+            "board_mode": self.board_mode,
+            "pool_enabled": self.pool_enabled,
+            "pool_low_watermark": self.pool_low_watermark,
+            "pool_high_watermark": self.pool_high_watermark,
+        }
+
+    @classmethod
+    def from_config(cls, data: dict[str, typing.Any]) -> "GuildSettings":
+        """Build the settings from the format stored in Config."""
+        return cls(
+            category_id=data["category_id"],
+            lfg_channel_id=data["lfg_channel_id"],
+            runner_role_ids=frozenset(data["runner_role_ids"]),
+            playstyle_role_ids=frozenset(data["playstyle_role_ids"]),
+            request_ttl=data["request_ttl"],
+            board_mode=data["board_mode"],
+            pool_enabled=data["pool_enabled"],
+            pool_low_watermark=data["pool_low_watermark"],
+            pool_high_watermark=data["pool_high_watermark"],
+        )
+
+
+DEFAULT_SETTINGS = GuildSettings(
+    # The Marathon LFG server, where the cog was first deployed.
+    category_id=1364881154334789632,
+    lfg_channel_id=1364693332533575824,
+    runner_role_ids=RUNNER_ROLE_IDS,
+    playstyle_role_ids=PLAYSTYLE_ROLE_IDS,
+    request_ttl=int(DEFAULT_REQUEST_TTL.total_seconds()),
+    board_mode=False,
+    pool_enabled=False,
+    pool_low_watermark=1,
+    pool_high_watermark=4,
+)
+
+
+class SettingsCache:
+    """In-memory, write-through cache of the guild settings stored in Config.
+
+    Every guild's settings are loaded once with :meth:`load`, so reading them on a
+    command or a voice event never awaits Config. Changes go through :meth:`update`,
+    which writes them to Config and updates the cache immediately.
+    """
+
+    def __init__(self, config: "Config") -> None:
+        self.config = config
+        self._guilds: dict["types.GuildID", GuildSettings] = {}
+
+    async def load(self, all_guilds: dict[int, dict] | None = None) -> None:
+        """Load the settings of every guild from Config.
+
+        Parameters
+        ----------
+        all_guilds : dict[int, dict] | None
+            The guild data already read from Config, to avoid reading it again.
+        """
+        if all_guilds is None:
+            all_guilds = await self.config.all_guilds()
+        self._guilds = {
+            guild_id: GuildSettings.from_config(data)
+            for guild_id, data in all_guilds.items()
+        }
+        for guild_id, settings in self._guilds.items():
+            self._apply(guild_id, settings)
+
+    def get(self, guild_id: "types.GuildID") -> GuildSettings:
+        """Get the settings of a guild.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild.
+
+        Returns
+        -------
+        GuildSettings
+            The guild settings.
+        """
+        return self._guilds.get(guild_id, DEFAULT_SETTINGS)
+
+    async def update(self, guild_id: "types.GuildID", **changes) -> GuildSettings:
+        """Change some settings of a guild.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild.
+        **changes
+            The settings to change, by name.
+
+        Returns
+        -------
+        GuildSettings
+            The updated guild settings.
+        """
+        settings = self.get(guild_id)._replace(**changes)
+        stored = settings.to_config()
+        group = self.config.guild_from_id(guild_id)
+        for name in changes:
+            await group.get_attr(name).set(stored[name])
+        self._guilds[guild_id] = settings
+        self._apply(guild_id, settings)
+        return settings
+
+    @staticmethod
+    def _apply(guild_id: "types.GuildID", settings: GuildSettings) -> None:
+        registry.configure(
+            guild_id, settings.runner_role_ids, settings.playstyle_role_ids
+        )
@@ -0,0 +1,186 @@
+import pathlib
+import sqlite3
+import time
+import typing
+
+from .claims import ClaimKey, RegistryBusy, RegistryError, RequestRegistry
+from .utils import log
+
+if typing.TYPE_CHECKING:
+    from . import types
+
+
+DEFAULT_BUSY_TIMEOUT = 0.0
+"""Default time, in seconds, to wait for another process to release the database.
+
+Calls run on the event loop, so they fail at once by default and the claims are retried
+asynchronously, see :data:`~lfg.claims.CLAIM_RETRY_DELAYS`."""
+
+DEFAULT_CACHE_TTL = 5.0
+"""Default time, in seconds, lookups are served from the cache before checking for the
+writes of other processes."""
+
+
+class SQLiteRequestRegistry(RequestRegistry):
+    """Registry shared through a local SQLite database in WAL mode.
+
+    Claims are taken with a single upsert, which only overwrites the row of the same
+    owner or an expired one, so claiming is an atomic check-and-set across processes.
+    Claims expire with their request, so a crashed process cannot hold authors forever.
+
+    Queries run on the event loop: they only touch a small local file and are much
+    faster than a thread hop, and they never wait for the lock of another process.
+    A busy claim raises :class:`~lfg.claims.RegistryBusy`, and a busy release is
+    retried on the next write.
+
+    Lookups are cached. ``PRAGMA data_version`` changes when another connection
+    commits, it is read at most once every ``cache_ttl`` seconds to drop the cache
+    after another process wrote to the database. A claim taken by another process may
+    be missed for that long, the claim taken on creation still decides.
+
+    This module is only imported when a shared registry is used.
+    """
+
+    owner: str
+    """The name of this process in the database. It must be unique among the
+    processes sharing the database, and stable across restarts."""
+
+    cache_ttl: float
+    """Time, in seconds, lookups are served from the cache."""
+
+    def __init__(
+        self,
+        path: pathlib.Path,
+        owner: str,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT,
+        cache_ttl: float = DEFAULT_CACHE_TTL,
+    ) -> None:
+        self.owner = owner
+        self.cache_ttl = cache_ttl
+        self._connection = sqlite3.connect(
+            path, timeout=busy_timeout, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS claims ("
+            "guild_id INTEGER NOT NULL, "
+            "user_id INTEGER NOT NULL, "
+            "voice_channel_id INTEGER NOT NULL, "
+            "owner TEXT NOT NULL, "
+            "expires_at REAL NOT NULL, "
+            "PRIMARY KEY (guild_id, user_id)"
+            ") WITHOUT ROWID"
+        )
+        # Expiry of the claim on each author, None if there is no claim.
+        self._cache: dict[ClaimKey, float | None] = {}
+        self._data_version = self._read_data_version()
+        self._validated_at = time.monotonic()
+        # Claims whose release failed, released again on the next write.
+        self._unreleased: set[ClaimKey] = set()
+
+    def _read_data_version(self) -> int:
+        return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def _validate_cache(self) -> None:
+        now = time.monotonic()
+        if now - self._validated_at < self.cache_ttl:
+            return
+        version = self._read_data_version()
+        self._validated_at = now
+        if version != self._data_version:
+            self._data_version = version
+            self._cache.clear()
+
+    def _delete(self, guild_id: "types.GuildID", user_id: "types.UserID") -> None:
+        self._connection.execute(
+            "DELETE FROM claims WHERE guild_id = ? AND user_id = ? AND owner = ?",
+            (guild_id, user_id, self.owner),
+        )
+
+    def _flush_releases(self) -> None:
+        while self._unreleased:
+            key = next(iter(self._unreleased))
+            self._delete(*key)
+            self._unreleased.discard(key)
+
+    def claim(
+        self,
+        guild_id: "types.GuildID",
+        user_id: "types.UserID",
+        voice_channel_id: "types.ChannelID",
+        expires_at: float,
+    ) -> bool:
+        key = (guild_id, user_id)
+        try:
+            self._unreleased.discard(key)
+            self._flush_releases()
+            cursor = self._connection.execute(
+                "INSERT INTO claims VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (guild_id, user_id) DO UPDATE SET "
+                "voice_channel_id = excluded.voice_channel_id, "
+                "owner = excluded.owner, "
+                "expires_at = excluded.expires_at "
+                "WHERE claims.owner = excluded.owner OR claims.expires_at < ?",
+                (
+                    guild_id,
+                    user_id,
+                    voice_channel_id,
+                    self.owner,
+                    expires_at,
+                    time.time(),
+                ),
+            )
+        except sqlite3.OperationalError as e:
+            raise RegistryBusy(f"Could not claim author {user_id}.") from e
+        except sqlite3.Error as e:
+            raise RegistryError(f"Could not claim author {user_id}.") from e
+        finally:
+            # Our own writes do not change data_version, look the claim up again.
+            self._cache.pop(key, None)
+        return cursor.rowcount == 1
+
+    def release(self, guild_id: "types.GuildID", user_id: "types.UserID") -> None:
+        key = (guild_id, user_id)
+        self._cache.pop(key, None)
+        self._unreleased.add(key)
+        try:
+            self._flush_releases()
+        except sqlite3.OperationalError:
+            log.debug("LFG registry busy, %s is released on the next write.", user_id)
+        except sqlite3.Error:
+            log.exception("Could not release the LFG claim on %s.", user_id)
+
+    def is_claimed(self, guild_id: "types.GuildID", user_id: "types.UserID") -> bool:
+        key = (guild_id, user_id)
+        try:
+            self._validate_cache()
+            try:
+                expires_at = self._cache[key]
+            except KeyError:
+                row = self._connection.execute(
+                    "SELECT expires_at FROM claims WHERE guild_id = ? AND user_id = ?",
+                    key,
+                ).fetchone()
+                expires_at = self._cache[key] = row[0] if row else None
+        except sqlite3.Error:
+            log.exception("Could not check the LFG claim on %s.", user_id)
+            return False
+        return expires_at is not None and expires_at >= time.time()
+
+    def release_all(self) -> None:
+        self._cache.clear()
+        try:
+            self._connection.execute(
+                "DELETE FROM claims WHERE owner = ?", (self.owner,)
+            )
+        except sqlite3.Error:
+            log.exception("Could not release the LFG claims of %s.", self.owner)
+        else:
+            self._unreleased.clear()
+
+    def close(self) -> None:
+        try:
+            self._connection.close()
+        except sqlite3.Error:
+            log.exception("Could not close the LFG registry database.")
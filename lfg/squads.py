@@ -0,0 +1,489 @@
+import asyncio
+import bisect
+import collections
+import contextlib
+import time
+import typing
+
+import discord
+from redbot.core.utils.chat_formatting import humanize_list
+
+from .metrics import metrics
+from .objects import Colors
+from .rest import Priority, channel_route, guild_route
+from .roles import registry
+from .utils import BackgroundService, is_lfg_voice_channel, log
+
+if typing.TYPE_CHECKING:
+    from . import types
+    from .main import LFG
+    from .settings import GuildSettings
+
+
+DEFAULT_QUEUE_INTERVAL = 2.0
+"""Default time, in seconds, between two matching rounds."""
+
+PLAYSTYLE_RELAX_AFTER = 60.0
+"""Time, in seconds, after which a queued party may be matched with any playstyle."""
+
+SQUAD_COMBINATIONS: dict[int, tuple[tuple[int, ...], ...]] = {
+    2: ((1, 1),),
+    3: ((2, 1), (1, 1, 1)),
+}
+"""The party sizes that can be combined into a full squad, by squad size."""
+
+BucketKey: typing.TypeAlias = tuple[int, int | None]
+
+
+class QueueTicket:
+    __slots__ = (
+        "guild_id",
+        "leader_id",
+        "member_ids",
+        "squad_size",
+        "playstyle_id",
+        "from_voice",
+        "enqueued_at",
+    )
+
+    guild_id: "types.GuildID"
+    """The ID of the guild the party is queued in."""
+
+    leader_id: "types.UserID"
+    """The ID of the member who queued the party."""
+
+    member_ids: tuple["types.UserID", ...]
+    """The IDs of the party members, leader first."""
+
+    squad_size: int
+    """The size of the squad the party is looking for, itself included."""
+
+    playstyle_id: int | None
+    """The playstyle the party is matched on, or None to match any playstyle."""
+
+    from_voice: bool
+    """If the party was in voice when queued, it must still be to be matched."""
+
+    enqueued_at: float
+    """When the party was queued, from :func:`time.monotonic`."""
+
+    def __init__(
+        self,
+        guild_id: "types.GuildID",
+        member_ids: tuple["types.UserID", ...],
+        squad_size: int,
+        playstyle_id: int | None,
+        from_voice: bool,
+    ) -> None:
+        self.guild_id = guild_id
+        self.leader_id = member_ids[0]
+        self.member_ids = member_ids
+        self.squad_size = squad_size
+        self.playstyle_id = playstyle_id
+        self.from_voice = from_voice
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def party_size(self) -> int:
+        return len(self.member_ids)
+
+
+class SquadQueue(BackgroundService):
+    """Matchmaking queue forming full squads out of solo players and partial squads.
+
+    Parties are bucketed by squad size and playstyle, then by party size, in FIFO
+    queues. Every ``interval`` seconds, each bucket is matched: the party that waited
+    the longest is always part of the next squad, completed with the combination of
+    parties that waited the longest too. Parties that waited more than
+    :data:`PLAYSTYLE_RELAX_AFTER` seconds move to the bucket matching any playstyle.
+    A round only touches the heads of the queues, so its cost depends on the number of
+    squads formed, not on the number of queued players.
+    """
+
+    interval: float
+    """Time, in seconds, between two matching rounds."""
+
+    def __init__(self, cog: "LFG", interval: float = DEFAULT_QUEUE_INTERVAL) -> None:
+        self.cog = cog
+        self.interval = interval
+        self._buckets: dict[
+            "types.GuildID",
+            dict[BucketKey, dict[int, collections.deque[QueueTicket]]],
+        ] = {}
+        self._tickets: dict[tuple["types.GuildID", "types.UserID"], QueueTicket] = {}
+
+    def __len__(self) -> int:
+        return len(self._tickets)
+
+    def get_ticket(
+        self, guild_id: "types.GuildID", user_id: "types.UserID"
+    ) -> typing.Optional[QueueTicket]:
+        """Get the ticket of a queued member.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild.
+        user_id : types.UserID
+            The ID of the member, leader or not.
+
+        Returns
+        -------
+        typing.Optional[QueueTicket]
+            The ticket of the member's party, or None if they are not queued.
+        """
+        return self._tickets.get((guild_id, user_id))
+
+    def waiting(self, guild_id: "types.GuildID", squad_size: int) -> int:
+        """Return the number of parties queued for a squad size in a guild."""
+        return sum(
+            len(queue)
+            for (size, _), by_party_size in self._buckets.get(guild_id, {}).items()
+            if size == squad_size
+            for queue in by_party_size.values()
+        )
+
+    def _queue(self, ticket: QueueTicket) -> collections.deque[QueueTicket]:
+        by_bucket = self._buckets.setdefault(ticket.guild_id, {})
+        by_party_size = by_bucket.setdefault(
+            (ticket.squad_size, ticket.playstyle_id), {}
+        )
+        return by_party_size.setdefault(ticket.party_size, collections.deque())
+
+    def enqueue(
+        self, leader: discord.Member, member_ids: list["types.UserID"], squad_size: int
+    ) -> QueueTicket:
+        """Queue a party.
+
+        Parameters
+        ----------
+        leader : discord.Member
+            The member queuing the party.
+        member_ids : list[types.UserID]
+            The IDs of the other party members.
+        squad_size : int
+            The size of the squad to form, the party included.
+
+        Returns
+        -------
+        QueueTicket
+            The ticket of the party.
+        """
+        playstyles = registry.classify(leader).playstyles
+        ticket = QueueTicket(
+            leader.guild.id,
+            (leader.id, *(i for i in member_ids if i != leader.id)),
+            squad_size,
+            # Members with several playstyles are happy with any of them.
+            playstyles[0].id if len(playstyles) == 1 else None,
+            leader.voice is not None and leader.voice.channel is not None,
+        )
+        self._queue(ticket).append(ticket)
+        for member_id in ticket.member_ids:
+            self._tickets[(ticket.guild_id, member_id)] = ticket
+        return ticket
+
+    def dequeue(self, ticket: QueueTicket) -> None:
+        """Remove a party from the queue.
+
+        Parameters
+        ----------
+        ticket : QueueTicket
+            The ticket of the party.
+        """
+        queue = self._queue(ticket)
+        with contextlib.suppress(ValueError):
+            queue.remove(ticket)
+        self._forget(ticket)
+
+    def _forget(self, ticket: QueueTicket) -> None:
+        for member_id in ticket.member_ids:
+            if self._tickets.get((ticket.guild_id, member_id)) is ticket:
+                del self._tickets[(ticket.guild_id, member_id)]
+
+    def _relax(self, guild_id: "types.GuildID", now: float) -> None:
+        by_bucket = self._buckets.get(guild_id, {})
+        for (squad_size, playstyle_id), by_party_size in list(by_bucket.items()):
+            if playstyle_id is None:
+                continue
+            for queue in by_party_size.values():
+                while queue and now - queue[0].enqueued_at >= PLAYSTYLE_RELAX_AFTER:
+                    ticket = queue.popleft()
+                    ticket.playstyle_id = None
+                    # Keep the queue sorted by wait time.
+                    bisect.insort(
+                        self._queue(ticket), ticket, key=lambda t: t.enqueued_at
+                    )
+
+    def _drop_expired(self, guild_id: "types.GuildID", now: float, ttl: int) -> None:
+        for by_party_size in self._buckets.get(guild_id, {}).values():
+            for queue in by_party_size.values():
+                while queue and now - queue[0].enqueued_at >= ttl:
+                    self._forget(queue.popleft())
+                    metrics.increment("queue_expired")
+
+    @staticmethod
+    def match_bucket(
+        squad_size: int, by_party_size: dict[int, collections.deque[QueueTicket]]
+    ) -> list[list[QueueTicket]]:
+        """Form as many squads as possible out of a bucket.
+
+        Parameters
+        ----------
+        squad_size : int
+            The size of the squads to form.
+        by_party_size : dict[int, collections.deque[QueueTicket]]
+            The queued parties, by party size, oldest first. Matched parties are
+            removed.
+
+        Returns
+        -------
+        list[list[QueueTicket]]
+            The squads formed, as lists of parties.
+        """
+        squads: list[list[QueueTicket]] = []
+        combinations = SQUAD_COMBINATIONS.get(squad_size, ())
+        while True:
+            heads = [queue[0] for queue in by_party_size.values() if queue]
+            if not heads:
+                return squads
+            oldest = min(heads, key=lambda ticket: ticket.enqueued_at)
+            best: tuple[int, ...] | None = None
+            best_youngest = 0.0
+            for combination in combinations:
+                if oldest.party_size not in combination:
+                    continue
+                counts = collections.Counter(combination)
+                if any(
+                    len(by_party_size.get(size, ())) < count
+                    for size, count in counts.items()
+                ):
+                    continue
+                # Prefer the squad whose youngest party waited the longest.
+                youngest = max(
+                    by_party_size[size][count - 1].enqueued_at
+                    for size, count in counts.items()
+                )
+                if best is None or youngest < best_youngest:
+                    best, best_youngest = combination, youngest
+            if best is None:
+                # Every other combination needs a party like the oldest one.
+                return squads
+            squads.append([by_party_size[size].popleft() for size in best])
+
+    def is_valid(self, guild: discord.Guild, ticket: QueueTicket) -> bool:
+        """Check if a queued party can still be matched.
+
+        Its members must still be in the guild and, if it was queued from voice, in
+        voice. They must not have created a request nor joined a request's channel
+        since they were queued.
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            The guild of the ticket.
+        ticket : QueueTicket
+            The ticket of the party.
+
+        Returns
+        -------
+        bool
+            If the party can be matched.
+        """
+        requests = self.cog.requests
+        for member_id in ticket.member_ids:
+            member = guild.get_member(member_id)
+            if member is None or requests.has_request(guild.id, member_id):
+                return False
+            channel = member.voice.channel if member.voice else None
+            if channel is None:
+                if ticket.from_voice:
+                    return False
+            elif requests.get_request_by_voice_channel_id(guild.id, channel.id):
+                return False
+        return True
+
+    def _match_valid(
+        self,
+        guild: discord.Guild,
+        squad_size: int,
+        by_party_size: dict[int, collections.deque[QueueTicket]],
+    ) -> list[list[QueueTicket]]:
+        """Form squads out of a bucket, dropping the parties that can't be matched.
+
+        Only the matched parties are checked, so a round still only touches the heads
+        of the queues.
+        """
+        valid_squads: list[list[QueueTicket]] = []
+        while True:
+            squads = self.match_bucket(squad_size, by_party_size)
+            for index, squad in enumerate(squads):
+                invalid = [t for t in squad if not self.is_valid(guild, t)]
+                if not invalid:
+                    valid_squads.append(squad)
+                    continue
+                for ticket in invalid:
+                    self._forget(ticket)
+                    metrics.increment("queue_dropped")
+                # Put the other parties back in front of their queues, in their
+                # order, and match again.
+                for ticket in reversed(
+                    [t for later in squads[index:] for t in later if t not in invalid]
+                ):
+                    by_party_size[ticket.party_size].appendleft(ticket)
+                break
+            else:
+                return valid_squads
+
+    async def run_round(self) -> int:
+        """Run a matching round in every guild.
+
+        Returns
+        -------
+        int
+            The number of squads formed.
+        """
+        now = time.monotonic()
+        formed: list[typing.Coroutine[typing.Any, typing.Any, None]] = []
+        for guild_id, by_bucket in list(self._buckets.items()):
+            guild = self.cog.bot.get_guild(guild_id)
+            if guild is None:
+                # The bot left the guild.
+                for by_party_size in by_bucket.values():
+                    for queue in by_party_size.values():
+                        for ticket in queue:
+                            self._forget(ticket)
+                del self._buckets[guild_id]
+                continue
+            settings = self.cog.settings.get(guild_id)
+            self._drop_expired(guild_id, now, settings.request_ttl)
+            self._relax(guild_id, now)
+            for (squad_size, _), by_party_size in by_bucket.items():
+                for squad in self._match_valid(guild, squad_size, by_party_size):
+                    for ticket in squad:
+                        self._forget(ticket)
+                        metrics.observe("queue_wait", now - ticket.enqueued_at)
+                    formed.append(self.form_squad(squad, settings))
+            for key in [
+                key for key, value in by_bucket.items() if not any(value.values())
+            ]:
+                del by_bucket[key]
+            if not by_bucket:
+                del self._buckets[guild_id]
+        await asyncio.gather(*formed, return_exceptions=True)
+        return len(formed)
+
+    async def form_squad(
+        self, squad: list[QueueTicket], settings: "GuildSettings"
+    ) -> None:
+        """Gather a matched squad in a voice channel and announce it.
+
+        Parameters
+        ----------
+        squad : list[QueueTicket]
+            The matched parties, oldest first.
+        settings : GuildSettings
+            The guild settings.
+        """
+        metrics.increment("queue_matches")
+        guild = self.cog.bot.get_guild(squad[0].guild_id)
+        if guild is None:
+            return
+        squad_size = squad[0].squad_size
+        members = [
+            member
+            for ticket in squad
+            for member_id in ticket.member_ids
+            if (member := guild.get_member(member_id)) is not None
+        ]
+
+        channel = self._find_channel(guild, squad, settings)
+        if channel is None and settings.pool_enabled:
+            channel = await self.cog.voice_pool.take(guild, squad_size, settings)
+        if channel is not None:
+            await asyncio.gather(
+                *(
+                    self.cog.rest.submit(
+                        Priority.POST,
+                        guild_route(guild.id),
+                        # Bind the member now, the lambda runs later.
+                        lambda member=member: member.move_to(
+                            channel, reason="LFG queue match"
+                        ),
+                        metric="rest_move",
+                    )
+                    for member in members
+                    if member.voice
+                    and member.voice.channel
+                    and member.voice.channel != channel
+                ),
+                return_exceptions=True,
+            )
+
+        embed = discord.Embed(
+            title="LFG queue: Squad formed",
+            description=(
+                f"Runners {humanize_list([member.mention for member in members])} "
+                "have been matched together. Wish you luck, runners!"
+            ),
+            color=Colors.MARATHON.color,
+        )
+        embed.add_field(
+            name="Channel",
+            value=(
+                channel.mention
+                if channel
+                else "Meet in any free voice channel of the LFG category."
+            ),
+        )
+        lfg_channel = (
+            guild.get_channel(settings.lfg_channel_id)
+            if settings.lfg_channel_id
+            else None
+        )
+        if not isinstance(lfg_channel, discord.TextChannel):
+            log.error("Couldn't find LFG channel")
+            return
+        try:
+            await self.cog.rest.submit(
+                Priority.POST,
+                channel_route(lfg_channel.id),
+                lambda: lfg_channel.send(
+                    " ".join(member.mention for member in members),
+                    embed=embed,
+                    allowed_mentions=discord.AllowedMentions(users=True),
+                ),
+                metric="rest_send",
+            )
+        except discord.HTTPException:
+            log.exception("Could not announce a LFG queue match.")
+
+    def _find_channel(
+        self,
+        guild: discord.Guild,
+        squad: list[QueueTicket],
+        settings: "GuildSettings",
+    ) -> typing.Optional["discord.guild.VocalGuildChannel"]:
+        """Find the LFG voice channel of one of the parties that fits the squad."""
+        for ticket in squad:
+            leader = guild.get_member(ticket.leader_id)
+            channel = leader.voice.channel if leader and leader.voice else None
+            if (
+                channel is not None
+                and is_lfg_voice_channel(channel, settings.category_id)
+                and (channel.user_limit == 0 or channel.user_limit >= ticket.squad_size)
+                and not self.cog.requests.get_request_by_voice_channel_id(
+                    guild.id, channel.id
+                )
+            ):
+                return channel
+        return None
+
+    async def _run(self) -> None:
+        await self.cog.bot.wait_until_red_ready()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_round()
+            except Exception:
+                log.exception("Error while matching the LFG queue.")
@@ -0,0 +1,157 @@
+import asyncio
+import typing
+
+from .utils import BackgroundService, log
+
+if typing.TYPE_CHECKING:
+    from redbot.core.config import Config
+
+    from . import types
+    from .objects import Request
+
+
+DEFAULT_FLUSH_INTERVAL = 5.0
+"""Default time, in seconds, between two flushes of the pending writes."""
+
+
+class StoredRequest(typing.TypedDict):
+    voice_channel_id: int
+    looking_for: int
+    channel_id: int | None
+    message_id: int | None
+    created_at: float
+    on_board: bool
+
+
+class RequestStore(BackgroundService):
+    """Write-behind persistence of the live requests in Red's Config.
+
+    Changes are only recorded in memory by :meth:`save` and :meth:`remove`, and are
+    written to Config in batches (one write per guild) by a background task, so no
+    command has to wait for the storage backend.
+    """
+
+    enabled: bool
+    """If the requests are persisted. When disabled, changes are discarded."""
+
+    flush_interval: float
+    """Time, in seconds, between two flushes of the pending writes."""
+
+    def __init__(
+        self, config: "Config", flush_interval: float = DEFAULT_FLUSH_INTERVAL
+    ) -> None:
+        self.config = config
+        self.enabled = True
+        self.flush_interval = flush_interval
+        self._pending: dict[
+            tuple["types.GuildID", "types.UserID"], StoredRequest | None
+        ] = {}
+
+    @staticmethod
+    def serialize(request: "Request") -> StoredRequest:
+        """Convert a request to the format stored in Config.
+
+        Parameters
+        ----------
+        request : Request
+            The request to serialize.
+
+        Returns
+        -------
+        StoredRequest
+            The stored representation of the request.
+        """
+        return {
+            "voice_channel_id": request.ctx.voice_channel_id,
+            "looking_for": request.ctx.looking_for,
+            "channel_id": request.ctx.notification_channel_id,
+            "message_id": request.ctx.notification_id,
+            "on_board": request.ctx.on_board,
+            "created_at": request.ctx.created_at.timestamp(),
+        }
+
+    def save(self, request: "Request") -> None:
+        """Queue a request to be written.
+
+        Parameters
+        ----------
+        request : Request
+            The request to save.
+        """
+        if not self.enabled:
+            return
+        key = (request.ctx.guild_id, request.ctx.author_id)
+        self._pending[key] = self.serialize(request)
+
+    def remove(self, guild_id: "types.GuildID", user_id: "types.UserID") -> None:
+        """Queue a request to be removed.
+
+        Parameters
+        ----------
+        guild_id : types.GuildID
+            The ID of the guild where the request is located.
+        user_id : types.UserID
+            The ID of the request's author.
+        """
+        if not self.enabled:
+            return
+        self._pending[(guild_id, user_id)] = None
+
+    async def load(
+        self,
+    ) -> dict["types.GuildID", dict["types.UserID", StoredRequest]]:
+        """Load every stored request.
+
+        Returns
+        -------
+        dict[types.GuildID, dict[types.UserID, StoredRequest]]
+            The stored requests by guild ID and author ID.
+        """
+        all_guilds = await self.config.all_guilds()
+        return {
+            guild_id: {
+                int(user_id): stored for user_id, stored in data["requests"].items()
+            }
+            for guild_id, data in all_guilds.items()
+            if data.get("requests")
+        }
+
+    async def clear(self) -> None:
+        """Drop every pending write and every stored request."""
+        self._pending.clear()
+        for guild_id in await self.config.all_guilds():
+            await self.config.guild_from_id(guild_id).requests.clear()
+
+    async def flush(self) -> None:
+        """Write every pending change, with a single write per guild."""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+
+        by_guild: dict["types.GuildID", dict["types.UserID", StoredRequest | None]] = {}
+        for (guild_id, user_id), stored in pending.items():
+            by_guild.setdefault(guild_id, {})[user_id] = stored
+
+        for guild_id, changes in by_guild.items():
+            try:
+                async with self.config.guild_from_id(guild_id).requests() as requests:
+                    for user_id, stored in changes.items():
+                        if stored is None:
+                            requests.pop(str(user_id), None)
+                        else:
+                            requests[str(user_id)] = stored
+            except Exception:
+                log.exception("Could not persist LFG requests for guild %s.", guild_id)
+                # Retry on next flush, unless a newer change has been queued since.
+                for user_id, stored in changes.items():
+                    self._pending.setdefault((guild_id, user_id), stored)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def stop(self) -> None:
+        """Stop the background flush task and write the remaining changes."""
+        await super().stop()
+        await self.flush()
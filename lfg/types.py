@@ -2,3 +2,4 @@ from typing import TypeAlias
 
 GuildID: TypeAlias = int
 UserID: TypeAlias = int
+ChannelID: TypeAlias = int
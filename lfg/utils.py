@@ -1,3 +1,6 @@
+import abc
+import asyncio
+import contextlib
 import logging
 import typing
 
@@ -7,89 +10,58 @@ if typing.TYPE_CHECKING:
 
 log = logging.getLogger("red.marathon.lfg")
 
-RUNNER_ROLES = (
-    1365736777704276118,  # Locus
-    1365736778467901550,  # Glitch (my beloved)
-    1365736779134664704,  # Blackbird
-    1365736780078252257,  # Void, my second beloved
-)
 
-PLAYSTYLE_ROLES_IDS = (
-    1365736951323557980,  # PvP
-    1365736953676300388,  # PvE
-)
+class BackgroundService(abc.ABC):
+    """A component running a background task while the cog is loaded.
 
-
-def get_runners_roles_from_member(member: "discord.Member") -> list["discord.Role"]:
-    """Return the list of runner roles only.
-    This is mostly used when building an embed, and to allow to see which runners are played by a
-    member.
-
-    Parameters
-    ----------
-    member : discord.Member
-        The member to check.
-
-    Returns
-    -------
-    list[discord.Role]
-        The runner roles.
+    Subclasses implement :meth:`_run`, which :meth:`start` runs in a task and
+    :meth:`stop` cancels.
     """
-    return [role for role in member.roles if role.id in RUNNER_ROLES]
 
+    _task: asyncio.Task[None] | None = None
 
-def runner_role_names(roles: "list[discord.Role]") -> list[str]:
-    """Return the list of runner roles names without the cool-looking prefix.
+    @abc.abstractmethod
+    async def _run(self) -> None:
+        raise NotImplementedError()
 
-    Parameters
-    ----------
-    roles : list[discord.Role]
-        The runner roles.
+    def start(self) -> None:
+        """Start the background task, unless it is already running."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
 
-    Returns
-    -------
-    list[str]
-        The runner role names.
-    """
-    return [role.name.strip("RUNNER://") for role in roles]
+    async def stop(self) -> None:
+        """Cancel the background task and wait for it to finish."""
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
 
 
-def get_playstyle_roles_from_member(member: "discord.Member") -> list["discord.Role"]:
-    """Return the list of playstyle roles only.
-
-    Parameters
-    ----------
-    member : discord.Member
-        The member to check.
-
-    Returns
-    -------
-    list[discord.Role]
-        The playstyle roles.
-    """
-    return [role for role in member.roles if role.id in PLAYSTYLE_ROLES_IDS]
-
-
-def playstyle_role_names(roles: "list[discord.Role]") -> list[str]:
-    """Return the list of playstyle roles names without the cool-looking prefix.
+def has_joined_voice_channel(
+    state_before: "discord.VoiceState", state_after: "discord.VoiceState"
+) -> bool:
+    """Check if a member has joined a voice channel.
 
     Parameters
     ----------
-    roles : list[discord.Role]
-        The runner roles.
+    state_before : discord.VoiceState
+        Before state.
+    state_after : discord.VoiceState
+        After state.
 
     Returns
     -------
-    list[str]
-        The runner role names.
+    bool
+        If the member has joined a voice channel.
     """
-    return [role.name.strip("FOCUS://") for role in roles]
+    return (state_before.channel is None) and (state_after.channel is not None)
 
 
-def has_joined_voice_channel(
+def has_left_voice_channel(
     state_before: "discord.VoiceState", state_after: "discord.VoiceState"
 ) -> bool:
-    """Check if a member has joined a voice channel.
+    """Check between state if a member has left a voice channel.
 
     Parameters
     ----------
@@ -101,15 +73,15 @@ def has_joined_voice_channel(
     Returns
     -------
     bool
-        If the member has joined a voice channel.
+        If the member has left a voice channel.
     """
-    return (state_before.channel is None) and (state_after.channel is not None)
+    return (state_before.channel is not None) and (state_after.channel is None)
 
 
-def has_left_voice_channel(
+def has_moved_voice_channel(
     state_before: "discord.VoiceState", state_after: "discord.VoiceState"
 ) -> bool:
-    """Check between state if a member has left a voice channel.
+    """Check between state if a member has moved from a voice channel to another.
 
     Parameters
     ----------
@@ -121,26 +93,34 @@ def has_left_voice_channel(
     Returns
     -------
     bool
-        If the member has left a voice channel.
+        If the member has moved to another voice channel.
     """
-    return (state_before.channel is not None) and (state_after.channel is None)
+    return (
+        (state_before.channel is not None)
+        and (state_after.channel is not None)
+        and (state_before.channel.id != state_after.channel.id)
+    )
 
 
-def calculate_remaining_places(
-    channel: "discord.channel.VocalGuildChannel",
-) -> int | None:
-    """Calculates the remaining places availables in a voice channel.
+def is_lfg_voice_channel(
+    channel: "discord.channel.VocalGuildChannel | None", category_id: int | None
+) -> bool:
+    """Check if a voice channel is part of the LFG category.
 
     Parameters
     ----------
-    channel : discord.channel.VocalGuildChannel
-        The voice channel to calculate.
+    channel : discord.channel.VocalGuildChannel | None
+        The voice channel to check.
+    category_id : int | None
+        The ID of the guild's LFG category.
 
     Returns
     -------
-    int | None
-        The total remaining places, or None if there is no limit.
+    bool
+        If the channel is a LFG voice channel.
     """
-    if channel.user_limit == 0:
-        return None
-    return channel.user_limit - len(channel.members)
+    return (
+        channel is not None
+        and category_id is not None
+        and channel.category_id == category_id
+    )
@@ -0,0 +1,51 @@
+import asyncio
+import inspect
+
+import pytest
+from redbot.core import data_manager
+from redbot.core._drivers import json as json_driver
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmarks",
+        action="store_true",
+        help="Run the benchmarks, which assert on wall-clock timings.",
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmarks"):
+        return
+    skip = pytest.mark.skip(reason="Benchmarks only run with --benchmarks.")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
+
+@pytest.fixture(autouse=True)
+def red_data(tmp_path):
+    """Store the Config of each test in its own folder, with the JSON driver."""
+    data_manager.basic_config = {
+        "DATA_PATH": str(tmp_path),
+        "STORAGE_TYPE": "JSON",
+        "STORAGE_DETAILS": {},
+        "CORE_PATH_APPEND": "core",
+        "COG_PATH_APPEND": "cogs",
+    }
+    yield tmp_path
+    # The driver shares its data and locks per cog, across event loops.
+    json_driver._shared_datastore.clear()
+    json_driver._locks.clear()
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem):
+    """Run the coroutine tests on a new event loop."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+    arguments = {
+        name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames
+    }
+    asyncio.run(pyfuncitem.obj(**arguments))
+    return True
@@ -0,0 +1,316 @@
+"""Offline stand-ins for the discord objects the cog reads.
+
+They only implement what the cog touches, so a guild with thousands of members can be
+driven through :meth:`LFG.on_voice_state_update` and :meth:`LFG.lfg` without a gateway
+or HTTP connection.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import typing
+
+import discord
+
+from lfg.main import LFG
+from lfg.settings import DEFAULT_SETTINGS
+
+assert DEFAULT_SETTINGS.category_id and DEFAULT_SETTINGS.lfg_channel_id
+
+CATEGORY_ID = DEFAULT_SETTINGS.category_id
+"""ID of the LFG category of every fake guild."""
+
+LFG_CHANNEL_ID = DEFAULT_SETTINGS.lfg_channel_id
+"""ID of the LFG text channel of every fake guild."""
+
+_ids = itertools.count(1)
+
+
+def next_id() -> int:
+    """Return a new snowflake, unique in the test session.
+
+    discord.py hashes objects by the timestamp of their snowflake, so every ID gets
+    its own millisecond.
+    """
+    return next(_ids) << 22
+
+
+class FakeMessage:
+    """A message posted by the bot, recording its edits."""
+
+    def __init__(
+        self, channel: "FakeTextChannel", content: typing.Optional[str] = None, **kwargs
+    ) -> None:
+        self.id = next_id()
+        self.channel = channel
+        self.content = content
+        self.embed: typing.Optional[discord.Embed] = kwargs.get("embed")
+        self.view = kwargs.get("view")
+        self.kwargs = kwargs
+        self.edits: list[dict[str, typing.Any]] = []
+        self.deleted = False
+        self.jump_url = f"https://discord.com/channels/0/{channel.id}/{self.id}"
+
+    async def edit(self, **kwargs) -> "FakeMessage":
+        self.edits.append(kwargs)
+        self.embed = kwargs.get("embed", self.embed)
+        return self
+
+    async def delete(self, **kwargs) -> None:
+        self.deleted = True
+
+
+class FakeTextChannel(discord.TextChannel):
+    """A text channel keeping every message sent to it."""
+
+    def __init__(self, guild: "FakeGuild", channel_id: int) -> None:
+        self.id = channel_id
+        self.guild = typing.cast(typing.Any, guild)
+        self.name = "lfg"
+        self.category_id = None
+        self.messages: dict[int, FakeMessage] = {}
+
+    def __repr__(self) -> str:
+        return f"<FakeTextChannel id={self.id}>"
+
+    @property
+    def sent(self) -> list[FakeMessage]:
+        """The messages sent to the channel, oldest first."""
+        return list(self.messages.values())
+
+    async def send(self, content: typing.Optional[str] = None, **kwargs) -> typing.Any:
+        message = FakeMessage(self, content, **kwargs)
+        self.messages[message.id] = message
+        return message
+
+    def get_partial_message(self, message_id: int) -> typing.Any:
+        message = self.messages.get(message_id)
+        if message is None:
+            message = FakeMessage(self)
+            message.id = message_id
+        return message
+
+
+class FakeCategoryChannel(discord.CategoryChannel):
+    def __init__(self, guild: "FakeGuild", channel_id: int) -> None:
+        self.id = channel_id
+        self.guild = typing.cast(typing.Any, guild)
+        self.name = "LFG"
+        self.category_id = None
+
+    def __repr__(self) -> str:
+        return f"<FakeCategoryChannel id={self.id}>"
+
+
+class FakeRole:
+    """A role, only its ID and name are read."""
+
+    def __init__(self, guild: "FakeGuild", role_id: int, name: str) -> None:
+        self.id = role_id
+        self.guild = guild
+        self.name = name
+
+
+class FakeVoiceState:
+    """The voice state of a member, only its channel is read."""
+
+    def __init__(self, channel: typing.Optional["FakeVoiceChannel"]) -> None:
+        self.channel = channel
+
+
+class FakeVoiceChannel(discord.VoiceChannel):
+    """A voice channel, with the voice states of the members in it."""
+
+    def __init__(
+        self, guild: "FakeGuild", user_limit: int = 0, category_id: int = CATEGORY_ID
+    ) -> None:
+        self.id = next_id()
+        self.guild = typing.cast(typing.Any, guild)
+        self.category_id = category_id
+        self.user_limit = user_limit
+        self.name = f"Squad {self.id}"
+        self._voice_states: dict[int, FakeVoiceState] = {}
+
+    def __repr__(self) -> str:
+        return f"<FakeVoiceChannel id={self.id}>"
+
+    @property
+    def voice_states(self) -> dict[int, typing.Any]:
+        return self._voice_states
+
+    @property
+    def members(self) -> list[typing.Any]:
+        return [self.guild.get_member(member_id) for member_id in self._voice_states]
+
+
+class FakeMember:
+    """A guild member, without roles unless given some."""
+
+    def __init__(self, guild: "FakeGuild", roles: typing.Iterable[typing.Any] = ()):
+        self.id = next_id()
+        self.guild = guild
+        self.roles = list(roles)
+        self.mention = f"<@{self.id}>"
+        self.display_name = f"Runner {self.id}"
+        self.display_avatar = discord.Asset(
+            typing.cast(typing.Any, None), url=f"/avatars/{self.id}", key=str(self.id)
+        )
+        self.color = discord.Color.default()
+        self.voice: typing.Optional[FakeVoiceState] = None
+
+    def get_role(self, role_id: int) -> typing.Any:
+        return next((role for role in self.roles if role.id == role_id), None)
+
+
+class FakeGuild:
+    """A guild with the default LFG category and text channel."""
+
+    def __init__(self, guild_id: typing.Optional[int] = None) -> None:
+        self.id = guild_id or next_id()
+        self.members: dict[int, FakeMember] = {}
+        self.channels: dict[int, typing.Any] = {
+            CATEGORY_ID: FakeCategoryChannel(self, CATEGORY_ID),
+            LFG_CHANNEL_ID: FakeTextChannel(self, LFG_CHANNEL_ID),
+        }
+
+    @property
+    def lfg_channel(self) -> FakeTextChannel:
+        return self.channels[LFG_CHANNEL_ID]
+
+    def get_channel(self, channel_id: int) -> typing.Any:
+        return self.channels.get(channel_id)
+
+    get_channel_or_thread = get_channel
+
+    def get_member(self, member_id: int) -> typing.Optional[FakeMember]:
+        return self.members.get(member_id)
+
+    def add_member(self, roles: typing.Iterable[typing.Any] = ()) -> FakeMember:
+        member = FakeMember(self, roles)
+        self.members[member.id] = member
+        return member
+
+    def add_voice_channel(
+        self, user_limit: int = 0, category_id: int = CATEGORY_ID
+    ) -> FakeVoiceChannel:
+        channel = FakeVoiceChannel(self, user_limit, category_id)
+        self.channels[channel.id] = channel
+        return channel
+
+
+class FakeContext:
+    """A command context, keeping the replies sent to the author."""
+
+    def __init__(self, guild: FakeGuild, author: FakeMember) -> None:
+        self.guild = guild
+        self.author = author
+        self.channel = guild.lfg_channel
+        self.interaction = None
+        self.replies: list[typing.Optional[str]] = []
+
+    async def send(self, content: typing.Optional[str] = None, **kwargs) -> FakeMessage:
+        self.replies.append(content)
+        return FakeMessage(self.channel, content, **kwargs)
+
+    async def defer(self, **kwargs) -> None:
+        pass
+
+
+class FakeBot:
+    """The parts of Red the cog calls, for a single guild."""
+
+    def __init__(self, guild: FakeGuild) -> None:
+        self.guild = guild
+        self.guilds = [guild]
+        self.cog: typing.Optional[LFG] = None
+
+    async def wait_until_red_ready(self) -> None:
+        pass
+
+    async def wait_for(self, event: str, *, check=None, timeout=None) -> None:
+        pass
+
+    def get_guild(self, guild_id: int) -> typing.Optional[FakeGuild]:
+        return self.guild if guild_id == self.guild.id else None
+
+    def get_channel(self, channel_id: int) -> typing.Any:
+        return self.guild.get_channel(channel_id)
+
+    def get_cog(self, name: str) -> typing.Optional[LFG]:
+        return self.cog
+
+    async def add_cog(self, cog: LFG) -> None:
+        self.cog = cog
+        await cog.cog_load()
+
+    async def remove_cog(self, name: str) -> None:
+        if self.cog is not None:
+            await self.cog.cog_unload()
+            self.cog = None
+
+    def add_dynamic_items(self, *items: typing.Any) -> None:
+        pass
+
+    def remove_dynamic_items(self, *items: typing.Any) -> None:
+        pass
+
+
+@contextlib.asynccontextmanager
+async def running_cog(
+    guild: typing.Optional[FakeGuild] = None,
+) -> typing.AsyncIterator[LFG]:
+    """Load the cog on a fake bot, and unload it on exit."""
+    bot = FakeBot(guild or FakeGuild())
+    cog = bot.cog = LFG(typing.cast(typing.Any, bot))
+    await cog.cog_load()
+    try:
+        yield cog
+    finally:
+        await cog.cog_unload()
+
+
+async def move(
+    cog: LFG, member: FakeMember, channel: typing.Optional[FakeVoiceChannel]
+) -> None:
+    """Move a member to a voice channel, or out of voice, and notify the cog."""
+    before = member.voice or FakeVoiceState(None)
+    if before.channel is not None:
+        before.channel.voice_states.pop(member.id, None)
+    after = FakeVoiceState(channel)
+    if channel is not None:
+        channel.voice_states[member.id] = after
+    member.voice = after if channel is not None else None
+    await cog.on_voice_state_update(
+        typing.cast(typing.Any, member),
+        typing.cast(typing.Any, before),
+        typing.cast(typing.Any, after),
+    )
+
+
+async def lfg(cog: LFG, member: FakeMember, players: int) -> FakeContext:
+    """Run ``/lfg`` as a member, and return the context with the replies."""
+    ctx = FakeContext(member.guild, member)
+    await cog.lfg.callback(cog, typing.cast(typing.Any, ctx), players)
+    return ctx
+
+
+async def queue(cog: LFG, member: FakeMember, players: int) -> FakeContext:
+    """Run ``/lfg queue`` as a member, and return the context with the replies."""
+    ctx = FakeContext(member.guild, member)
+    command = typing.cast(typing.Any, cog.lfg_queue)
+    await command.callback(cog, ctx, players)
+    return ctx
+
+
+async def settle(cog: LFG, *channels: FakeVoiceChannel) -> None:
+    """Wait for the events already dispatched on some voice channels to be handled."""
+
+    async def noop() -> None:
+        pass
+
+    await asyncio.gather(
+        *(
+            cog.dispatcher.submit((channel.guild.id, channel.id), noop)
+            for channel in channels
+        )
+    )
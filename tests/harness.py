@@ -0,0 +1,311 @@
+"""Offline load test, replaying a scripted session of a busy LFG server.
+
+Members join, leave and move between the LFG voice channels, and create requests with
+``/lfg`` when they are alone in one. Every event goes through
+:meth:`LFG.on_voice_state_update` or :meth:`LFG.lfg` on fake discord objects, so runs
+are reproducible and need no connection.
+
+Run it directly to print a report::
+
+    python -m tests.harness --members 2000 --events 20000
+"""
+
+import argparse
+import asyncio
+import gc
+import random
+import tempfile
+import time
+import timeit
+import tracemalloc
+import typing
+
+from redbot.core import data_manager
+
+from lfg.metrics import Histogram
+from lfg.objects import Request, RequestCollection
+from lfg.roles import PLAYSTYLE_ROLE_IDS, RUNNER_ROLE_IDS, Roles
+
+from .fakes import (
+    FakeBot,
+    FakeGuild,
+    FakeRole,
+    FakeVoiceChannel,
+    FakeVoiceState,
+    lfg,
+    move,
+    next_id,
+    running_cog,
+    settle,
+)
+
+if typing.TYPE_CHECKING:
+    from lfg.main import LFG
+
+DEFAULT_MEMBERS = 2_000
+"""Default number of members in the replayed guild."""
+
+DEFAULT_EVENTS = 20_000
+"""Default number of events replayed."""
+
+DEFAULT_SEED = 0
+"""Default seed of the scripted session."""
+
+LFG_PROBABILITY = 0.8
+"""Chance that a member alone in a voice channel creates a request."""
+
+MOVE_PROBABILITY = 0.2
+"""Chance that a member in voice moves to another channel instead of leaving."""
+
+DEFAULT_REQUEST_TTL = 3600.0
+"""Lifetime, in seconds, of the synthetic requests."""
+
+UNTHROTTLED = 1e9
+"""REST rate and burst of the replays, which do not call Discord."""
+
+
+class ReplayReport:
+    """Measurements of a replay."""
+
+    events: int
+    """Number of events replayed."""
+
+    elapsed: float
+    """Time, in seconds, to replay every event and handle the dispatched work."""
+
+    voice_latency: Histogram
+    """Time, in seconds, spent in each call to ``on_voice_state_update``."""
+
+    lfg_latency: Histogram
+    """Time, in seconds, spent in each call to ``/lfg``."""
+
+    live_requests: int
+    """Number of requests still live at the end of the replay."""
+
+    traced_memory: typing.Optional[int]
+    """Bytes allocated during the replay and still alive at its end, if traced."""
+
+    def __init__(self, events: int) -> None:
+        self.events = events
+        self.elapsed = 0.0
+        self.voice_latency = Histogram(events)
+        self.lfg_latency = Histogram(events)
+        self.live_requests = 0
+        self.traced_memory = None
+
+    @property
+    def events_per_second(self) -> float:
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def memory_per_request(self) -> typing.Optional[float]:
+        """Traced memory divided by the number of live requests."""
+        if self.traced_memory is None or not self.live_requests:
+            return None
+        return self.traced_memory / self.live_requests
+
+    def render(self) -> str:
+        lines = [
+            f"{self.events} events in {self.elapsed:.2f}s "
+            f"({self.events_per_second:,.0f} events/s)",
+        ]
+        for name, histogram in (
+            ("on_voice_state_update", self.voice_latency),
+            ("/lfg", self.lfg_latency),
+        ):
+            p50, p95, p99 = (
+                value * 1e6 for value in histogram.percentiles(0.5, 0.95, 0.99)
+            )
+            lines.append(
+                f"{name}: {histogram.count} calls, p50 {p50:.0f}µs, "
+                f"p95 {p95:.0f}µs, p99 {p99:.0f}µs"
+            )
+        lines.append(f"{self.live_requests} live requests")
+        if self.memory_per_request is not None:
+            lines.append(f"{self.memory_per_request:,.0f} bytes per live request")
+        return "\n".join(lines)
+
+
+def time_per_call(
+    function: typing.Callable[[], object], number: int, repeat: int = 5
+) -> float:
+    """Time a function, best of ``repeat`` runs of ``number`` calls.
+
+    Returns
+    -------
+    float
+        The time of a call, in seconds.
+    """
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number
+
+
+def synthetic_roles(guild: FakeGuild, filler: int = 10) -> list[FakeRole]:
+    """Create the roles of a typical member.
+
+    A runner, a playstyle and a faction role, and ``filler`` roles the cog ignores.
+    """
+    return [
+        FakeRole(guild, next(iter(RUNNER_ROLE_IDS)), "RUNNER://Glitch"),
+        FakeRole(guild, next(iter(PLAYSTYLE_ROLE_IDS)), "FOCUS://PvP"),
+        FakeRole(guild, Roles.TRAXUS.value, "Traxus"),
+        *(FakeRole(guild, next_id(), f"Role {i}") for i in range(filler)),
+    ]
+
+
+def synthetic_requests(
+    guild: FakeGuild,
+    count: int,
+    looking_for: int = 2,
+    roles: typing.Sequence[FakeRole] = (),
+) -> list[Request]:
+    """Create requests, each with a new author alone in a new voice channel."""
+    client = typing.cast(typing.Any, FakeBot(guild))
+    requests = []
+    for _ in range(count):
+        author = guild.add_member(roles)
+        channel = guild.add_voice_channel()
+        author.voice = channel.voice_states[author.id] = FakeVoiceState(channel)
+        requests.append(
+            Request(
+                client,
+                typing.cast(typing.Any, author),
+                channel,
+                looking_for,
+            )
+        )
+    return requests
+
+
+def synthetic_collection(guild: FakeGuild, count: int) -> RequestCollection:
+    """Create a collection of synthetic requests, see :func:`synthetic_requests`."""
+    collection = RequestCollection()
+    for request in synthetic_requests(guild, count):
+        collection.push_request(
+            guild.id, request.ctx.author_id, request, DEFAULT_REQUEST_TTL
+        )
+    return collection
+
+
+async def replay(
+    cog: "LFG",
+    guild: FakeGuild,
+    events: int = DEFAULT_EVENTS,
+    seed: int = DEFAULT_SEED,
+    trace_memory: bool = False,
+) -> ReplayReport:
+    """Replay a scripted session on a loaded cog.
+
+    Parameters
+    ----------
+    cog : LFG
+        The cog, loaded on a fake bot for ``guild``.
+    guild : FakeGuild
+        The guild, with its members already added. One LFG voice channel is created
+        for each member.
+    events : int
+        The number of voice updates and commands to replay.
+    seed : int
+        The seed of the session, the same seed replays the same events.
+    trace_memory : bool
+        If the memory allocated during the replay is traced. Tracing slows every
+        allocation down, so the latencies of a traced replay are not meaningful.
+
+    Returns
+    -------
+    ReplayReport
+        The measurements.
+    """
+    rng = random.Random(seed)
+    members = list(guild.members.values())
+    channels = [guild.add_voice_channel() for _ in members]
+    touched: set[FakeVoiceChannel] = set()
+    report = ReplayReport(events)
+
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(events):
+        member = rng.choice(members)
+        current = member.voice.channel if member.voice else None
+        if current is None or rng.random() < MOVE_PROBABILITY:
+            channel = rng.choice(channels)
+            if channel is current:
+                channel = None
+        else:
+            channel = None
+        if current is not None:
+            touched.add(current)
+        if channel is not None:
+            touched.add(channel)
+
+        before = clock()
+        await move(cog, member, channel)
+        report.voice_latency.observe(clock() - before)
+
+        if (
+            channel is not None
+            and len(channel.voice_states) == 1
+            and rng.random() < LFG_PROBABILITY
+        ):
+            # Members run the command after their join was handled.
+            await settle(cog, channel)
+            before = clock()
+            await lfg(cog, member, rng.choice((1, 2)))
+            report.lfg_latency.observe(clock() - before)
+
+    await settle(cog, *touched)
+    report.elapsed = clock() - start
+    report.live_requests = sum(
+        len(requests) for requests in cog.requests.current_lfgs.values()
+    )
+    if trace_memory:
+        gc.collect()
+        report.traced_memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+    return report
+
+
+async def run(
+    members: int = DEFAULT_MEMBERS,
+    events: int = DEFAULT_EVENTS,
+    seed: int = DEFAULT_SEED,
+    trace_memory: bool = False,
+) -> ReplayReport:
+    """Load the cog on a new fake guild, and replay a session on it."""
+    guild = FakeGuild()
+    for _ in range(members):
+        guild.add_member()
+    async with running_cog(guild) as cog:
+        # Otherwise the replay measures the waits of the REST throttling.
+        cog.rest.rate = cog.rest.burst = UNTHROTTLED
+        return await replay(cog, guild, events, seed, trace_memory)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replay a scripted session of a busy LFG server."
+    )
+    parser.add_argument("--members", type=int, default=DEFAULT_MEMBERS)
+    parser.add_argument("--events", type=int, default=DEFAULT_EVENTS)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_path:
+        data_manager.basic_config = {
+            "DATA_PATH": data_path,
+            "STORAGE_TYPE": "JSON",
+            "STORAGE_DETAILS": {},
+            "CORE_PATH_APPEND": "core",
+            "COG_PATH_APPEND": "cogs",
+        }
+        report = asyncio.run(run(args.members, args.events, args.seed))
+        # Replayed again with tracing, the first run gives the undisturbed timings.
+        traced = asyncio.run(run(args.members, args.events, args.seed, True))
+    report.traced_memory = traced.traced_memory
+    print(report.render())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""Micro-benchmarks of the hot paths, run on synthetic data.
+
+The bounds are loose, so they only fail on a change of complexity, but they depend on
+the load of the machine. They are skipped unless pytest runs with ``--benchmarks``, add
+``-s`` to see the measurements.
+"""
+
+import gc
+import itertools
+import pathlib
+import subprocess
+import sys
+import time
+import tracemalloc
+import typing
+
+import pytest
+
+import lfg
+from lfg import checks
+from lfg.matchmaking import MatchmakingIndex
+from lfg.objects import Request
+
+from . import harness
+from .fakes import FakeBot, FakeGuild, FakeVoiceState, running_cog
+
+LOOKUPS = 10_000
+BUILDS = 2_000
+QUERIES = 1_000
+REQUESTS = 100_000
+VALIDATIONS = 10_000
+SETUPS = 5
+
+pytestmark = pytest.mark.benchmark
+
+
+def test_voice_channel_lookup_is_flat():
+    timings = {}
+    for count in (10, 1_000, 50_000):
+        guild = FakeGuild()
+        collection = harness.synthetic_collection(guild, count)
+        channel_ids = itertools.cycle(
+            [key[1] for key in collection.requests_by_voice_channel][:1_000]
+        )
+        timings[count] = harness.time_per_call(
+            lambda: collection.get_request_by_voice_channel_id(
+                guild.id, next(channel_ids)
+            ),
+            LOOKUPS,
+        )
+        print(f"lookup among {count} requests: {timings[count] * 1e9:.0f}ns")
+    assert timings[50_000] < 4 * timings[10]
+
+
+def test_build_with_cached_static_parts():
+    guild = FakeGuild()
+    (request,) = harness.synthetic_requests(
+        guild, 1, roles=harness.synthetic_roles(guild)
+    )
+    builder, ctx = request.ctx.embed_builder, request.ctx
+
+    def build_uncached():
+        ctx.invalidate_static_parts()
+        builder.build(ctx)
+
+    uncached = harness.time_per_call(build_uncached, BUILDS)
+    cached = harness.time_per_call(lambda: builder.build(ctx), BUILDS)
+    print(
+        f"build: {1 / uncached:,.0f}/s uncached, {1 / cached:,.0f}/s cached "
+        f"({uncached / cached:.1f}x)"
+    )
+    assert cached < uncached
+
+
+def test_find_in_large_pools():
+    timings = {}
+    for count in (100, 10_000, 50_000):
+        guild = FakeGuild()
+        roles = harness.synthetic_roles(guild)
+        index = MatchmakingIndex()
+        for looking_for, request_roles in itertools.product((1, 2), ((), roles)):
+            for request in harness.synthetic_requests(
+                guild, count // 4, looking_for, request_roles
+            ):
+                index.add(request)
+        member = typing.cast(typing.Any, guild.add_member(roles))
+        timings[count] = harness.time_per_call(lambda: index.find(member), QUERIES)
+        print(f"find among {count} open requests: {timings[count] * 1e6:.1f}µs")
+    assert timings[50_000] < 1e-3
+    assert timings[50_000] < 4 * timings[100]
+
+
+def test_memory_per_request():
+    guild = FakeGuild()
+    client = typing.cast(typing.Any, FakeBot(guild))
+    authors = [guild.add_member() for _ in range(REQUESTS)]
+    channels = [guild.add_voice_channel() for _ in range(REQUESTS)]
+    gc.collect()
+    tracemalloc.start()
+    try:
+        requests = [
+            Request(client, typing.cast(typing.Any, author), channel, 2)
+            for author, channel in zip(authors, channels)
+        ]
+        gc.collect()
+        traced = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    print(f"{traced / len(requests):.0f} bytes per request, at {len(requests)}")
+    assert traced / len(requests) < 1024
+
+
+async def test_lfg_validation_cost():
+    guild = FakeGuild()
+    async with running_cog(guild) as cog:
+        requests = harness.synthetic_requests(guild, 10_000)
+        for request in requests:
+            cog.requests.push_request(
+                guild.id, request.ctx.author_id, request, harness.DEFAULT_REQUEST_TTL
+            )
+        author = guild.add_member()
+        channel = guild.add_voice_channel()
+
+        def validate():
+            settings = cog.settings.get(guild.id)
+            channels = cog.channel_lookups.get(typing.cast(typing.Any, guild), settings)
+            return checks.run_prechecks(
+                checks.Precheck(
+                    typing.cast(typing.Any, author),
+                    2,
+                    cog.requests,
+                    cog.squad_queue,
+                    settings,
+                    channels,
+                )
+            )
+
+        author.voice = channel.voice_states[author.id] = FakeVoiceState(channel)
+        assert validate() is None
+        accepted = harness.time_per_call(validate, VALIDATIONS)
+
+        # In the channel of another request, refused after the voice checks.
+        channel.voice_states.pop(author.id)
+        channel = guild.get_channel(requests[0].ctx.voice_channel_id)
+        author.voice = channel.voice_states[author.id] = FakeVoiceState(channel)
+        assert validate() is not None
+        refused = harness.time_per_call(validate, VALIDATIONS)
+    print(
+        f"/lfg validation: {accepted * 1e6:.1f}µs accepted, "
+        f"{refused * 1e6:.1f}µs refused, among {len(requests)} requests"
+    )
+    assert accepted < 1e-4
+    assert refused < 1e-4
+
+
+async def test_setup_time():
+    timings = []
+    for _ in range(SETUPS):
+        bot = FakeBot(FakeGuild())
+        start = time.perf_counter()
+        await lfg.setup(typing.cast(typing.Any, bot))
+        timings.append(time.perf_counter() - start)
+        await bot.remove_cog("LFG")
+    print(f"setup(): {min(timings) * 1e3:.1f}ms")
+    assert min(timings) < 0.5
+
+
+def test_import_time():
+    # A new interpreter, as the modules are already imported here.
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import lfg"],
+        cwd=pathlib.Path(__file__).parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        name = name.strip()
+        if name == "lfg" or name.startswith("lfg."):
+            timings[name] = (int(self_us), int(cumulative_us))
+    for name, (self_us, cumulative_us) in sorted(timings.items()):
+        print(f"{name}: {self_us}µs self, {cumulative_us}µs cumulative")
+    own = sum(self_us for self_us, _ in timings.values())
+    print(
+        f"lfg modules: {own / 1e3:.1f}ms, with dependencies: {timings['lfg'][1] / 1e3:.1f}ms"
+    )
+    assert own < 250_000
@@ -0,0 +1,31 @@
+import pytest
+
+from . import harness
+
+MEMBERS = 500
+EVENTS = 5_000
+
+
+async def test_replay_is_reproducible():
+    first = await harness.run(MEMBERS, EVENTS)
+    second = await harness.run(MEMBERS, EVENTS)
+    assert first.voice_latency.count == second.voice_latency.count == EVENTS
+    assert first.lfg_latency.count == second.lfg_latency.count > 0
+    assert first.live_requests == second.live_requests > 0
+
+
+@pytest.mark.benchmark
+async def test_replay_throughput():
+    report = await harness.run(MEMBERS, EVENTS)
+    print(report.render())
+    # Far below what the cog sustains, only catches an accidental quadratic path.
+    assert report.events_per_second > 500
+
+
+@pytest.mark.benchmark
+async def test_replay_memory_per_request():
+    report = await harness.run(MEMBERS, EVENTS, trace_memory=True)
+    print(report.render())
+    assert report.memory_per_request is not None
+    # Includes the fake messages and history, a request alone is a few KiB.
+    assert report.memory_per_request < 256 * 1024
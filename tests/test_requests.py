@@ -0,0 +1,289 @@
+import asyncio
+import gc
+import json
+import typing
+import weakref
+
+import pytest
+
+from lfg.claims import LocalRequestRegistry, RegistryBusy, RegistryError
+
+from .fakes import (
+    FakeBot,
+    FakeContext,
+    FakeGuild,
+    FakeMessage,
+    FakeRole,
+    lfg,
+    move,
+    next_id,
+    queue,
+    running_cog,
+    settle,
+)
+from .harness import synthetic_requests
+
+
+class FailingRegistry(LocalRequestRegistry):
+    def claim(self, guild_id, user_id, voice_channel_id, expires_at):
+        raise RegistryError("unreachable")
+
+
+class BusyOnceRegistry(LocalRequestRegistry):
+    busy = True
+
+    def claim(self, guild_id, user_id, voice_channel_id, expires_at):
+        if self.busy:
+            self.busy = False
+            raise RegistryBusy("locked")
+        return super().claim(guild_id, user_id, voice_channel_id, expires_at)
+
+
+async def test_request_completes_once_the_squad_is_full():
+    guild = FakeGuild()
+    author, first, second = (guild.add_member() for _ in range(3))
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        ctx = await lfg(cog, author, 2)
+        assert ctx.replies == []
+        request = cog.requests.get_request(guild.id, author.id)
+        assert request is not None
+        assert request.ctx.notification is guild.lfg_channel.sent[-1]
+
+        await move(cog, first, channel)
+        await settle(cog, channel)
+        assert request.ctx.remaining_places == 1
+
+        await move(cog, second, channel)
+        await settle(cog, channel)
+        assert not cog.requests.has_request(guild.id, author.id)
+        assert (
+            cog.requests.get_request_by_voice_channel_id(guild.id, channel.id) is None
+        )
+
+
+async def test_author_leaving_completes_the_request():
+    guild = FakeGuild()
+    author = guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 1)
+        await move(cog, author, None)
+        await settle(cog, channel)
+        assert not cog.requests.has_request(guild.id, author.id)
+
+
+async def test_second_request_in_the_same_channel_is_refused():
+    guild = FakeGuild()
+    author, other = guild.add_member(), guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        await move(cog, other, channel)
+        ctx = await lfg(cog, other, 2)
+        assert len(ctx.replies) == 1
+        assert not cog.requests.has_request(guild.id, other.id)
+
+
+async def test_request_closed_while_posting_is_not_kept():
+    guild = FakeGuild()
+    author = guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        send = guild.lfg_channel.send
+
+        async def send_after_leaving(*args, **kwargs):
+            await cog.forget_request(guild.id, author.id)
+            return await send(*args, **kwargs)
+
+        guild.lfg_channel.send = send_after_leaving
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        await settle(cog, channel)
+        assert guild.lfg_channel.sent[-1].deleted
+        assert not cog.requests.has_request(guild.id, author.id)
+        await cog.request_store.flush()
+        assert not await cog.config.guild_from_id(guild.id).requests()
+
+
+async def test_unreachable_registry_refuses_the_request():
+    guild = FakeGuild()
+    author = guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        cog.requests.registry = FailingRegistry()
+        await move(cog, author, channel)
+        ctx = await lfg(cog, author, 2)
+        assert ctx.replies == [
+            "I couldn't register your LFG request, please retry later."
+        ]
+        assert not cog.requests.has_request(guild.id, author.id)
+        assert guild.lfg_channel.sent == []
+
+
+async def test_busy_registry_is_retried():
+    guild = FakeGuild()
+    author = guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        cog.requests.registry = registry = BusyOnceRegistry()
+        await move(cog, author, channel)
+        ctx = await lfg(cog, author, 2)
+        assert ctx.replies == []
+        assert not registry.busy
+        assert cog.requests.has_request(guild.id, author.id)
+
+
+async def test_stale_update_is_ignored():
+    guild = FakeGuild()
+    author, member = guild.add_member(), guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        request = cog.requests.get_request(guild.id, author.id)
+        assert request is not None
+        await cog.forget_request(guild.id, author.id)
+
+        request.ctx.member_joined(member.id)
+        await cog.update_request_embed(request)
+        message = request.ctx.notification
+        assert isinstance(message, FakeMessage)
+        assert message.edits == []
+
+
+async def test_request_of_a_missing_guild_raises_lookup_error():
+    guild = FakeGuild()
+    author = guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        request = cog.requests.get_request(guild.id, author.id)
+        assert request is not None
+        bot = typing.cast(FakeBot, cog.bot)
+        bot.guilds.clear()
+        bot.guild = FakeGuild()
+        with pytest.raises(LookupError):
+            request.ctx.guild
+
+
+async def test_member_of_a_request_cannot_queue():
+    guild = FakeGuild()
+    author, member = guild.add_member(), guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        await move(cog, member, channel)
+        ctx = await queue(cog, member, 2)
+        assert len(ctx.replies) == 1
+        assert cog.squad_queue.get_ticket(guild.id, member.id) is None
+
+
+async def test_refused_author_is_not_moved_to_the_pool():
+    guild = FakeGuild()
+    author = guild.add_member()
+    outside = guild.add_voice_channel(category_id=next_id())
+    async with running_cog(guild) as cog:
+        await cog.settings.update(guild.id, pool_enabled=True)
+        await queue(cog, author, 2)
+        assert cog.squad_queue.get_ticket(guild.id, author.id) is not None
+        await move(cog, author, outside)
+        ctx = await lfg(cog, author, 2)
+        assert len(ctx.replies) == 1
+        assert author.voice is not None and author.voice.channel is outside
+        assert cog.voice_pool.idle_count(guild.id, 3) == 0
+
+
+async def test_find_ignores_a_channel_outside_lfg():
+    guild = FakeGuild()
+    author, finder, *others = (guild.add_member() for _ in range(4))
+    channel = guild.add_voice_channel()
+    outside = guild.add_voice_channel(category_id=next_id())
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 1)
+        for member in (finder, *others):
+            await move(cog, member, outside)
+        ctx = FakeContext(guild, finder)
+        command = typing.cast(typing.Any, cog.lfg_find)
+        await command.callback(cog, ctx)
+        assert ctx.replies == [None]
+
+
+async def test_request_view_is_not_stored():
+    guild = FakeGuild()
+    author = guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        view = guild.lfg_channel.sent[-1].view
+        assert view is not None and len(view.children) == 2
+        # discord.py only stores the views that are not finished.
+        assert view.is_finished()
+
+
+async def test_only_fill_changes_are_recorded():
+    guild = FakeGuild()
+    author, member = guild.add_member(), guild.add_member()
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        await cog.refresh_request_author(typing.cast(typing.Any, author))
+        await move(cog, member, channel)
+        await settle(cog, channel)
+        events = [json.loads(line)["e"] for line in cog.history._pending]
+        assert events == ["created", "update"]
+
+
+async def test_runner_roles_change_refreshes_the_requests():
+    guild = FakeGuild()
+    role = FakeRole(guild, next_id(), "RUNNER://Rook")
+    author = guild.add_member([role])
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        request = cog.requests.get_request(guild.id, author.id)
+        assert request is not None
+        ctx = request.ctx
+        assert ctx.embed_builder.get_static_parts(ctx).runners is None
+
+        command = typing.cast(typing.Any, cog.lfgset_runners)
+        await command.callback(cog, FakeContext(guild, author), role)
+        await settle(cog, channel)
+        assert ctx.embed_builder.get_static_parts(ctx).runners == "Rook"
+
+
+async def test_completion_drops_the_queued_update():
+    guild = FakeGuild()
+    author, first, second = (guild.add_member() for _ in range(3))
+    channel = guild.add_voice_channel()
+    async with running_cog(guild) as cog:
+        cog.edit_scheduler.delay = 0
+        # The post takes the only token, the update waits in the dispatcher.
+        cog.rest.burst, cog.rest.rate = 1, 2
+        await move(cog, author, channel)
+        await lfg(cog, author, 2)
+        message = guild.lfg_channel.sent[-1]
+
+        await move(cog, first, channel)
+        await settle(cog, channel)
+        await asyncio.sleep(0)
+        await move(cog, second, channel)
+        await settle(cog, channel)
+        assert [edit.get("view", "update") for edit in message.edits] == [None]
+
+
+def test_request_does_not_keep_its_author_alive():
+    guild = FakeGuild()
+    (request,) = synthetic_requests(guild, 1)
+    author = weakref.ref(guild.members.pop(request.ctx.author_id))
+    gc.collect()
+    assert author() is None
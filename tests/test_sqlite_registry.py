@@ -0,0 +1,33 @@
+import sqlite3
+
+import pytest
+
+from lfg.claims import RegistryBusy
+from lfg.sqlite_registry import SQLiteRequestRegistry
+
+EXPIRES_AT = 2**40
+
+
+def test_locked_database_does_not_wait(tmp_path):
+    path = tmp_path / "claims.sqlite3"
+    registry = SQLiteRequestRegistry(path, "first")
+    other = SQLiteRequestRegistry(path, "second")
+    assert registry.claim(1, 1, 1, EXPIRES_AT)
+
+    lock = sqlite3.connect(path, isolation_level=None)
+    lock.execute("BEGIN IMMEDIATE")
+    with pytest.raises(RegistryBusy):
+        other.claim(1, 2, 2, EXPIRES_AT)
+    registry.release(1, 1)
+    # Reads are not blocked by the writer.
+    assert other.is_claimed(1, 1)
+    lock.execute("ROLLBACK")
+
+    # The busy release is done by the next write.
+    assert registry.claim(1, 3, 3, EXPIRES_AT)
+    other.cache_ttl = 0
+    assert not other.is_claimed(1, 1)
+    assert other.claim(1, 1, 1, EXPIRES_AT)
+    for connection in (registry, other):
+        connection.close()
+    lock.close()